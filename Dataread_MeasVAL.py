@@ -2,10 +2,31 @@
 # Requires: pip install openpyxl
 import re
 import os
-# 确保安装了兼容 Python 3 的 openpyxl 版本
-# pip install openpyxl (推荐) 或 pip install openpyxl==2.6.4 (如果必须用旧版)
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+import sys
+import copy
+import time
+import itertools
+import functools
+
+from datareader.batch import iter_batch, iter_paired, BatchReport, PARALLEL_MIN_FILES
+from datareader.prefetch import ReadAhead
+from datareader.chunked import use_chunks, parse_chunked
+from datareader.scanner import SectionScanner
+from datareader.mmap_reader import MappedSectionReader
+from datareader.xlsx_stream import ColumnWidthTracker, StreamingWorkbook
+from datareader.cache import open_cache, iter_cached, make_signature
+from datareader.watch import FolderWatcher
+from datareader.delimited import write_delimited, DELIMITERS
+from datareader.archive import source_exists, source_name, feed_source
+from datareader.store import open_store, iter_stored, iter_readings
+from datareader.shards import SheetNameRegistry, INDEX_SHEET_NAME, write_sharded, write_index
+from datareader.summary import FleetSummary, summary_path
+from datareader.limits import LimitChecker, load_limits, iter_checked, write_report
+from datareader.metrics import RunMetrics, measure_call, record_extract, metrics_path
+from datareader.cli import build_arg_parser, discover_inputs, describe_sources, default_output_dir, resolve_output
+from datareader.discover import SourceWalker, first_source
+from datareader.app import sanitize_sheet_name, prompt_loop
+
 #python -m venv myenv
 #需要在虚拟环境下运行 myenv\Scripts\activate
 
@@ -18,227 +39,616 @@ TARGET_SECTIONS = [
     r'8\.4\s+60Hz\s+Verification2'
 ]
 
-# 编译章节匹配的正则表达式
-SECTION_PATTERNS = [re.compile(pattern) for pattern in TARGET_SECTIONS]
-
-
-def sanitize_sheet_name(name, max_len=31):
-    """Excel sheet names have limitations. Sanitize the filename for use as a sheet name."""
-    # 移除或替换非法字符: \ / ? * [ ]
-    illegal_chars = r'\/?*[]:'
-    for char in illegal_chars:
-        name = name.replace(char, '_')
-    # 限制长度 (Excel 限制为 31 个字符)
-    if len(name) > max_len:
-        name = name[:max_len]
-    # 移除首尾空格
-    name = name.strip()
-    # 确保名称不为空
-    if not name:
-        name = "Sheet"
-    return name
-
-
-def extract_data(filepath):
-    """Extract Meas VAL and ANGLE data from file for specific sections."""
-    all_section_data = []
-
-    if not os.path.exists(filepath):
-        print("  Error: File not found '%s'" % filepath)
-        return all_section_data
-
-    print("  Reading file: %s" % os.path.basename(filepath))
-
-    current_section = None
-    current_section_data = []
-    in_target_section = False
-    temp_channel_data = {}
-
-    # Python 3: 默认使用 utf-8 编码打开文件，无需 decode
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            # Python 3: line 本身就是字符串，无需 decode
-            line_u = line
-            line_stripped = line_u.strip()
-
-            # 检查是否进入新的目标章节
-            for i, pattern in enumerate(SECTION_PATTERNS):
-                if pattern.search(line_stripped):
-                    # 如果之前在目标章节并且有数据，则保存之前的章节数据
-                    if in_target_section and (current_section_data or temp_channel_data):
-                        # 保存上一节未保存的临时数据（如果有的话）
-                        if temp_channel_data: # 修正: 添加了条件判断
-                            current_section_data.append(temp_channel_data)
-                            temp_channel_data = {}
-                        all_section_data.append({
-                            'section_name': current_section,
-                            'data': current_section_data
-                        })
-
-                    # 开始新的章节
-                    current_section = TARGET_SECTIONS[i].replace(r'\s+', ' ').replace(r'\.', '.')
-                    current_section_data = []
-                    in_target_section = True
-                    temp_channel_data = {}
-                    # print("  Found target section: %s" % current_section) # 可选：打印找到的章节
-                    break  # 找到匹配就跳出循环
-
-            # 如果不在目标章节，继续读取下一行
-            if not in_target_section:
-                continue
-
-            # 检查是否进入下一个类似 "数字.数字.数字" 或 "数字.数字" 开头的章节
-            if re.match(r'^\d+\.\d+(?:\.\d+)?\s', line_stripped):
-                # 保存当前章节数据
-                if current_section_data or temp_channel_data: # 修正: 添加了条件判断
-                    # 保存最后一组未保存的临时数据（如果有的话）
-                    if temp_channel_data: # 修正: 添加了条件判断
-                        current_section_data.append(temp_channel_data)
-                        temp_channel_data = {}
-                    all_section_data.append({
-                        'section_name': current_section,
-                        'data': current_section_data
-                    })
-                    # 重置状态
-                    current_section = None
-                    current_section_data = []
-                    in_target_section = False
-                continue
-
-            # 在目标章节内，匹配 Meas VAL Check pattern
-            val_match = re.search(
-                r'Meas VAL Check<<C>> CH(\d+):\s*([-\d.]+)',
-                line_u
-            )
-            if val_match:
-                ch_num = int(val_match.group(1))
-                try:
-                    val = float(val_match.group(2))
-                    # 如果是 CH0 且 temp_channel_data 已经有数据，说明上一组结束了
-                    if ch_num == 0 and temp_channel_data:
-                        current_section_data.append(temp_channel_data)
-                        temp_channel_data = {}
-
-                    # 初始化或更新当前通道数据
-                    temp_channel_data['CH{}'.format(ch_num)] = {'VAL': val, 'ANGLE': None}
-                except (ValueError, IndexError):
-                    print("  Warning: Could not parse VAL data in line: %s" % line_stripped) # Python 3: 无需 encode
-                continue  # 处理完 VAL 后继续下一行
-
-            # 在目标章节内，匹配 Meas ANGLE Check pattern
-            angle_match = re.search(
-                r'Meas ANGLE Check<<C>> CH(\d+):\s*([-\d.]+)',
-                line_u
-            )
-            if angle_match:
-                ch_num = int(angle_match.group(1))
-                try:
-                    angle = float(angle_match.group(2))
-                    # 更新对应通道的 ANGLE 数据
-                    ch_key = 'CH{}'.format(ch_num)
-                    if ch_key in temp_channel_data: # 修正: 添加了条件判断
-                        temp_channel_data[ch_key]['ANGLE'] = angle
-                    else:
-                        # 如果 ANGLE 先于 VAL 出现（理论上不太可能，但做一下容错）
-                        temp_channel_data[ch_key] = {'VAL': None, 'ANGLE': angle}
-                except (ValueError, IndexError):
-                    print("  Warning: Could not parse ANGLE data in line: %s" % line_stripped) # Python 3: 无需 encode
-                continue  # 处理完 ANGLE 后继续下一行
-
-    # 文件读取结束后，处理最后一个目标章节（如果有的话）
-    if in_target_section and (current_section_data or temp_channel_data):
-        # 保存最后一组未保存的临时数据（如果有的话）
-        if temp_channel_data: # 修正: 添加了条件判断
-            current_section_data.append(temp_channel_data)
-        all_section_data.append({
-            'section_name': current_section,
-            'data': current_section_data
+# 编译章节标题、章节边界和数据行预过滤的合并扫描器（"Check<<C>> CH" 作为数据行的字面量预过滤）
+SCANNER = SectionScanner(TARGET_SECTIONS, data_literals=('Check<<C>> CH',))
+SECTION_PATTERNS = SCANNER.patterns
+
+# 数据行的正则表达式
+VAL_PATTERN = re.compile(r'Meas VAL Check<<C>> CH(\d+):\s*([-\d.]+)')
+ANGLE_PATTERN = re.compile(r'Meas ANGLE Check<<C>> CH(\d+):\s*([-\d.]+)')
+
+# 并行批处理的进程数 (None 表示使用全部 CPU 核心, 1 表示强制串行)
+BATCH_WORKERS = None
+
+# 串行提取时用线程预读后续文件，使网络共享上的读取与解析重叠（预读文件数，0 表示关闭；最多占用的内存 MB；读取线程数）
+PREFETCH_DEPTH = 4
+PREFETCH_MAX_MB = 256
+PREFETCH_THREADS = 2
+
+# 大文件按目标章节标题拆分成约 INTRA_FILE_CHUNK_MB 的块，在 INTRA_FILE_WORKERS 个进程上并行解析
+# （只用于不小于 INTRA_FILE_MIN_MB 的普通 .txt 文件且 USE_MMAP 为 True 时；0 表示关闭）
+INTRA_FILE_MIN_MB = 256
+INTRA_FILE_CHUNK_MB = 64
+INTRA_FILE_WORKERS = None
+
+# 使用 mmap 按字节跳转到目标章节，只解码含数据的行；MMAP_STOP_EARLY 为 True 时
+# 所有目标章节都出现并结束后即停止读取（之后重复出现的同名章节将被忽略，结果可能比读完整个文件少）
+USE_MMAP = True
+MMAP_STOP_EARLY = False
+
+# 章节索引：第一次 mmap 读取日志时在旁边保存所有编号章节标题的位置（.<日志名>.sections.json），
+# 之后换一组 TARGET_SECTIONS 重新运行时直接跳到匹配的章节，不再搜索整个文件（日志修改后自动重建）。
+# 只在 TARGET_SECTIONS 都以章节编号开头时使用；章节标题出现在行中间（而不是行首）时不会被索引。
+# 索引文件写在日志所在的文件夹中（输入文件夹会被修改），所以默认关闭
+USE_SECTION_INDEX = False
+
+# 使用 openpyxl 只写模式流式生成工作簿（行按产生顺序追加，内存占用与文件数量无关）
+EXCEL_WRITE_ONLY = True
+
+# 提取结果缓存（保存在所选文件夹中）：未修改的文件直接读取缓存，只重新解析新增或修改过的文件
+USE_CACHE = True
+CACHE_FILENAME = '.measval_cache.sqlite3'
+
+# watch 模式：轮询间隔（秒）和断点文件名（保存每个日志的读取位置和解析状态）
+WATCH_INTERVAL = 2.0
+WATCH_CHECKPOINT = '.measval_watch.json'
+
+# 交互模式查找日志的方式（命令行模式见 -r/--recursive、--include、--exclude、--since、--until）：
+# DISCOVER_RECURSIVE 为 True 时也查找子文件夹（例如 日期/工位/序列号 目录树），在后台线程中边查找边交给提取；
+# DISCOVER_INCLUDE / DISCOVER_EXCLUDE 为通配符列表（按名称或相对路径，例如 ['*_final.txt']、['ST09', '*/tmp/*']），
+# DISCOVER_SINCE / DISCOVER_UNTIL（'YYYY-MM-DD'）跳过名称中的日期在范围之外的文件夹和文件。都不设置时只列出文件夹本身的日志
+DISCOVER_RECURSIVE = False
+DISCOVER_INCLUDE = []
+DISCOVER_EXCLUDE = []
+DISCOVER_SINCE = None
+DISCOVER_UNTIL = None
+
+# 输出的工作簿文件名（在所选文件夹内）
+OUTPUT_FILENAME = 'ALL_VAL_ANGLE_By_Section.xlsx'
+
+# 输出的列
+OUTPUT_HEADERS = ['Source_File', 'Section', 'CH_Label', 'VAL', 'ANGLE']
+
+# 运行指标：WRITE_METRICS 为 True 时在输出文件旁写入 <输出文件名>.metrics.json；
+# METRICS_TRACE_MEMORY 记录每个文件的 tracemalloc 内存峰值（会变慢），METRICS_PROFILE 用 cProfile 统计解析热点
+WRITE_METRICS = True
+METRICS_TRACE_MEMORY = False
+METRICS_PROFILE = False
+TOOL_NAME = 'measval'
+
+# 分片输出（仅 xlsx）：SHARD_MAX_SHEETS > 0 时每 SHARD_MAX_SHEETS 个 sheet（或约 SHARD_MAX_MB 的数据）写入一个
+# <输出文件名>_part001.xlsx, _part002.xlsx ...，由 SHARD_WORKERS 个进程并行生成和保存（None 表示全部 CPU 核心）；
+# 输出文件本身成为索引工作簿（每个文件链接到所在的分片和 sheet，并包含汇总 sheet）。0 表示只写一个工作簿
+SHARD_MAX_SHEETS = 0
+SHARD_MAX_MB = 100
+SHARD_WORKERS = None
+
+# 汇总 sheet：所有文件的读数按 章节/通道/字段 汇总（数量、均值、标准差、最小/最大值和近似百分位数），
+# 追加在工作簿末尾（CSV/TSV 输出时写入 <输出文件名>.summary.csv/tsv）；内存占用与文件数量无关
+WRITE_SUMMARY = True
+SUMMARY_SHEET_NAME = 'Fleet_Summary'
+SUMMARY_METRICS = ['count', 'avg', 'std', 'min', 'max', 'p5', 'p50', 'p95']
+
+# 结果数据库（SQLite，见 datareader/store.py）：设置为一个固定路径（例如 r'D:\calibration\results.sqlite3'）后，
+# 每次运行都把提取的读数追加到该数据库，便于跨多次运行查询某个通道的变化；None 表示不写入
+RESULTS_DB = None
+
+# 限值检查：设置为限值表路径（CSV/TSV/xlsx，格式见 datareader/limits.py，例如 r'D:\calibration\limits.csv'）后，
+# 每次运行都按 章节/通道 检查 LIMIT_FIELDS 的所有读数，在输出文件旁写入 <输出文件名>.limits.xlsx（CSV/TSV 输出时为
+# .limits.csv/tsv 及其汇总），只列出超限的读数；None 表示不检查
+LIMITS_FILE = None
+LIMIT_FIELDS = ['VAL', 'ANGLE']
+
+# 命令行模式的说明
+CLI_DESCRIPTION = "Extract Meas VAL/ANGLE data of the target sections from .txt logs into xlsx, csv or tsv."
+
+
+class MeasValParser(object):
+    """Line-by-line state machine collecting Meas VAL/ANGLE CH groups per target section."""
+
+    # 可跨多次读取保存/恢复的解析状态（watch 模式的断点）
+    STATE_FIELDS = ('all_section_data', 'current_section', 'current_section_data', 'in_target_section',
+                    'temp_channel_data')
+
+    def __init__(self, scanner=None):
+        self.scanner = scanner or SCANNER
+        # 计数（写入运行指标）：送入解析器的行数、命中的数据行数
+        self.lines_fed = 0
+        self.data_lines = 0
+        self.all_section_data = []
+        self.current_section = None
+        self.current_section_data = []
+        self.in_target_section = False
+        self.temp_channel_data = {}
+
+    def _save_section(self):
+        """保存当前章节（包括最后一组未保存的临时数据）"""
+        if self.temp_channel_data:
+            self.current_section_data.append(self.temp_channel_data)
+            self.temp_channel_data = {}
+        self.all_section_data.append({
+            'section_name': self.current_section,
+            'data': self.current_section_data
         })
 
-    # 将结构化的数据转换为扁平化的列表，用于输出
-    flattened_data = []
-    for section_info in all_section_data: # 修正: 添加了条件判断
-        section_name = section_info['section_name']
-        section_datasets = section_info['data']
-
-        # 添加章节标题行
-        flattened_data.append(
-            {'Source_File': os.path.basename(filepath), 'Section': section_name, 'CH_Label': '', 'VAL': '',
-             'ANGLE': ''})
+    def feed(self, line_u):
+        """Process one line of the log."""
+        self.lines_fed += 1
+        scanner = self.scanner
+        # 不在目标章节时，只有可能是章节标题的行才需要进一步检查
+        if not self.in_target_section and scanner.header_gate not in line_u:
+            return
+        line_stripped = line_u.strip()
+
+        # 检查是否进入新的目标章节
+        section_index = scanner.match_section(line_stripped)
+        if section_index is not None:
+            # 如果之前在目标章节并且有数据，则保存之前的章节数据
+            if self.in_target_section and (self.current_section_data or self.temp_channel_data):
+                self._save_section()
+
+            # 开始新的章节
+            self.current_section = scanner.titles[section_index]
+            self.current_section_data = []
+            self.in_target_section = True
+            self.temp_channel_data = {}
+
+        # 如果不在目标章节，继续读取下一行
+        if not self.in_target_section:
+            return
+
+        # 检查是否进入下一个类似 "数字.数字.数字" 或 "数字.数字" 开头的章节
+        if scanner.is_boundary(line_stripped):
+            # 保存当前章节数据
+            if self.current_section_data or self.temp_channel_data:
+                self._save_section()
+                # 重置状态
+                self.current_section = None
+                self.current_section_data = []
+                self.in_target_section = False
+            return
+
+        # 不含 "Check<<C>> CH" 的行不可能是数据行
+        if not scanner.maybe_data(line_u):
+            return
+
+        # 在目标章节内，匹配 Meas VAL Check pattern
+        val_match = VAL_PATTERN.search(line_u)
+        if val_match:
+            self.data_lines += 1
+            ch_num = int(val_match.group(1))
+            try:
+                val = float(val_match.group(2))
+                # 如果是 CH0 且 temp_channel_data 已经有数据，说明上一组结束了
+                if ch_num == 0 and self.temp_channel_data:
+                    self.current_section_data.append(self.temp_channel_data)
+                    self.temp_channel_data = {}
+
+                # 初始化或更新当前通道数据
+                self.temp_channel_data['CH{}'.format(ch_num)] = {'VAL': val, 'ANGLE': None}
+            except (ValueError, IndexError):
+                print("  Warning: Could not parse VAL data in line: %s" % line_stripped)
+            return  # 处理完 VAL 后继续下一行
+
+        # 在目标章节内，匹配 Meas ANGLE Check pattern
+        angle_match = ANGLE_PATTERN.search(line_u)
+        if angle_match:
+            self.data_lines += 1
+            ch_num = int(angle_match.group(1))
+            try:
+                angle = float(angle_match.group(2))
+                # 更新对应通道的 ANGLE 数据
+                ch_key = 'CH{}'.format(ch_num)
+                if ch_key in self.temp_channel_data:
+                    self.temp_channel_data[ch_key]['ANGLE'] = angle
+                else:
+                    # 如果 ANGLE 先于 VAL 出现（理论上不太可能，但做一下容错）
+                    self.temp_channel_data[ch_key] = {'VAL': None, 'ANGLE': angle}
+            except (ValueError, IndexError):
+                print("  Warning: Could not parse ANGLE data in line: %s" % line_stripped)
+
+    def get_state(self):
+        """Return a copy of the parser state as plain data (JSON serialisable)."""
+        return copy.deepcopy(dict((name, getattr(self, name)) for name in self.STATE_FIELDS))
+
+    def set_state(self, state):
+        """Restore a state returned by get_state()."""
+        for name in self.STATE_FIELDS:
+            setattr(self, name, copy.deepcopy(state[name]))
+
+    def close(self):
+        """Flush the last open section and return all section data."""
+        # 文件读取结束后，处理最后一个目标章节（如果有的话）
+        if self.in_target_section and (self.current_section_data or self.temp_channel_data):
+            self._save_section()
+        self.current_section = None
+        self.current_section_data = []
+        self.in_target_section = False
+        return self.all_section_data
+
+
+def store_rows(data):
+    """结果数据库中一个文件的 (读数, 统计) 行（MeasVAL 没有统计）"""
+    return iter_readings(data, ('VAL', 'ANGLE')), ()
+
+
+def cache_signature():
+    """Identify the sections, patterns and read options that shape extract_data results."""
+    # 'sections'：缓存的是按章节组织的解析结果（输出行在写入时才逐行生成）
+    return make_signature('measval', 'sections', TARGET_SECTIONS, VAL_PATTERN.pattern, ANGLE_PATTERN.pattern, SCANNER.data_literals,
+                          USE_MMAP and MMAP_STOP_EARLY)
+
+
+def extract_data(filepath, metrics=None, stop_early=None, section_index=None):
+    """Extract Meas VAL and ANGLE data from file for specific sections.
+
+    返回 [{'section_name': ..., 'data': [CH 数据组, ...]}, ...]；输出行由 iter_file_rows 在写入时逐行生成。
+    整个文件的章节数据在解析结束后一次返回（结果要经过进程池、缓存、结果数据库和汇总），不是按章节逐个交给写入。
+
+    metrics 为可选的 dict，用于记录读取的字节数、行数、章节和数据行命中数及各阶段耗时（见 datareader.metrics）。
+    stop_early / section_index 覆盖 MMAP_STOP_EARLY / USE_SECTION_INDEX（None 表示使用脚本中的设置）。
+    """
+    if stop_early is None:
+        stop_early = MMAP_STOP_EARLY
+    if section_index is None:
+        section_index = USE_SECTION_INDEX
+    if not source_exists(filepath):
+        print("  Error: File not found '%s'" % filepath)
+        return []
+
+    print("  Reading file: %s" % source_name(filepath))
+
+    start = time.perf_counter()
+    if USE_MMAP and use_chunks(filepath, INTRA_FILE_MIN_MB * 1024 * 1024, INTRA_FILE_WORKERS):
+        # 大文件：按目标章节标题拆分成块并行解析，结果按文件顺序拼接（与整文件读取相同）
+        all_section_data, parser, bytes_scanned = parse_chunked(
+            filepath, MeasValParser, INTRA_FILE_WORKERS, int(INTRA_FILE_CHUNK_MB * 1024 * 1024), stop_early=stop_early,
+            section_index=section_index)
+    else:
+        parser = MeasValParser()
+        # 普通 .txt 文件用 mmap 读取（USE_MMAP），压缩文件和 zip 包中的文件以流的方式边解压边解析
+        reader = MappedSectionReader(parser.scanner, section_index=section_index) if USE_MMAP else None
+        bytes_scanned = feed_source(filepath, parser, reader, stop_early=stop_early)
+        all_section_data = parser.close()
+    if metrics is not None:
+        record_extract(metrics, filepath, parser, bytes_scanned, time.perf_counter() - start, len(all_section_data))
+    return all_section_data
+
+
+def iter_file_rows(filename, all_section_data):
+    """按输出顺序逐行生成一个文件的数据（sheet 和 CSV/TSV 输出共用）
+
+    直接从章节数据逐行生成，每次只展开一个 CH 数据组，不再先构建整个文件的扁平化行列表
+    （章节数据本身仍是整个文件的，见 extract_data）。
+    """
+    if not all_section_data:
+        # 如果没有数据，可以写入提示或留空
+        yield ["No data found for this section."]
+        return
+    for section_info in all_section_data:
+        # 章节标题行
+        yield [filename, section_info['section_name'], '', '', '']
 
-        # 添加表头行
-        header_row = {'Source_File': '', 'Section': 'CH_Label', 'CH_Label': 'CH_Label', 'VAL': 'VAL', 'ANGLE': 'ANGLE'}
-        flattened_data.append(header_row)
+        # 表头行
+        yield ['', 'CH_Label', 'CH_Label', 'VAL', 'ANGLE']
 
-        # 添加数据行
-        for dataset in section_datasets:
+        # 数据行
+        for dataset in section_info['data']:
             for ch_label in sorted(dataset.keys(), key=lambda x: int(x[2:])):  # 按 CH 数字排序
                 ch_data = dataset[ch_label]
-                data_row = {
-                    'Source_File': '',
-                    'Section': '',
-                    'CH_Label': ch_label,
-                    'VAL': ch_data.get('VAL', ''),
-                    'ANGLE': ch_data.get('ANGLE', '')
-                }
-                flattened_data.append(data_row)
+                yield ['', '', ch_label, ch_data.get('VAL', ''), ch_data.get('ANGLE', '')]
 
             # 在每组数据后添加一个空行
-            flattened_data.append({'Source_File': '', 'Section': '', 'CH_Label': '', 'VAL': '', 'ANGLE': ''})
+            yield ['', '', '', '', '']
 
-    return flattened_data
 
+def write_sheet_to_excel(sheet, data, widths=None, filename=''):
+    """将数据逐行追加到给定的 Excel sheet（普通 sheet 或只写模式的 StreamingSheet）
 
-def write_sheet_to_excel(sheet, data, start_row=1):
-    """将数据写入给定的 Excel sheet"""
-    if not data: # 修正: 添加了条件判断
+    data 为 extract_data 的结果，filename 写入每个章节标题行的 Source_File 列。
+    """
+    if not data:
         # 如果没有数据，可以写入提示或留空
-        sheet.cell(row=start_row, column=1, value="No data found for this section.")
-        return start_row + 1
+        sheet.append(["No data found for this section."])
+        return 1
+
+    # 写入数据，同时记录每列最长内容用于自动列宽（无需回读单元格）
+    apply_widths = widths is None
+    if widths is None:
+        widths = ColumnWidthTracker()
+    rows_written = 0
+    for row in iter_file_rows(filename, data):
+        sheet.append(row)
+        widths.observe(row)
+        rows_written += 1
 
-    # 定义列名和对应的列索引
-    headers = ['Source_File', 'Section', 'CH_Label', 'VAL', 'ANGLE']
+    # 自动调整列宽 (简单处理)
+    if apply_widths:
+        widths.apply(sheet, len(OUTPUT_HEADERS))
+
+    return rows_written  # 返回写入的行数
+
+
+def new_summary():
+    """跨文件汇总（WRITE_SUMMARY 为 False 时返回 None）"""
+    return FleetSummary(('VAL', 'ANGLE'), SUMMARY_METRICS) if WRITE_SUMMARY else None
+
+
+def new_checker(limits_file=None):
+    """读数限值检查（limits_file 默认为 LIMITS_FILE，都没有设置时返回 None）"""
+    limits_file = limits_file or LIMITS_FILE
+    return LimitChecker(load_limits(limits_file, TOOL_NAME), LIMIT_FIELDS) if limits_file else None
+
+
+def write_summary_sheet(wb, summary, sheet_names):
+    """在工作簿末尾追加跨文件汇总 sheet（sheet_names 为该工作簿的 SheetNameRegistry）"""
+    sheet_name = sheet_names.claim(SUMMARY_SHEET_NAME)
+    ws = wb.create_sheet(title=sheet_name)
+    widths = ColumnWidthTracker()
+    for row in summary.rows():
+        ws.append(row)
+        widths.observe(row)
+    widths.apply(ws, len(summary.headers))
+    print("  Summary of %d file(s) written to sheet '%s'." % (summary.files, sheet_name))
+
+
+def write_workbook(output_file, named_results, metrics=None, summary=None):
+    """将 (文件名, 提取结果) 逐个写入新工作簿（每个文件一个 sheet）并保存，返回写入的 sheet 数（保存失败时为 0）
+
+    metrics 为可选的 RunMetrics，记录每个 sheet 的写入时间和保存时间；
+    summary 为可选的 FleetSummary，写入每个文件时更新，最后追加为汇总 sheet。
+    """
+    if metrics is None:
+        metrics = RunMetrics('write')
+    # 创建一个新的 Excel 工作簿
+    if EXCEL_WRITE_ONLY:
+        wb = StreamingWorkbook()
+    else:
+        # 确保安装了兼容 Python 3 的 openpyxl 版本（只在写 xlsx 时导入）
+        # pip install openpyxl (推荐) 或 pip install openpyxl==2.6.4 (如果必须用旧版)
+        from openpyxl import Workbook
+        wb = Workbook()
+        # 删除默认创建的 'Sheet'
+        default_sheet = wb.active
+        wb.remove(default_sheet)
 
-    # 写入数据
-    current_row = start_row
-    for row_data in data: # 修正: 添加了条件判断
-        for col_idx, header in enumerate(headers, 1):
-            cell_value = row_data.get(header, '')
-            sheet.cell(row=current_row, column=col_idx, value=cell_value)
-        current_row += 1
+    # 按文件顺序写入每个 sheet
+    processed_files_count = 0
+    sheet_names = SheetNameRegistry(sanitize_sheet_name)
+    for filename, file_data in named_results:
+        # 如果提取到数据或未提取到数据，都为该文件创建一个 sheet
+        # 获取不带扩展名的文件名作为 sheet 名，清理后登记（同名时添加后缀，Excel 不允许同名 sheet）
+        sheet_name = sheet_names.claim(os.path.splitext(filename)[0])
+
+        # 创建新的 sheet
+        ws = wb.create_sheet(title=sheet_name)
+
+        # 写入数据到 sheet
+        with metrics.timed('write_sheet', filename):
+            write_sheet_to_excel(ws, file_data, filename=filename)
+        processed_files_count += 1
+        if summary is not None:
+            with metrics.timed('summary', filename):
+                summary.add_file(file_data)
+        if not file_data: # 修正: 更明确的条件判断
+            print("  Note: No target data found in %s. Empty sheet created." % filename)
+        else:
+            print("  Data for %s written to sheet '%s'." % (filename, sheet_name))
+
+    if summary is not None:
+        with metrics.timed('write_summary'):
+            write_summary_sheet(wb, summary, sheet_names)
+
+    # 保存 Excel 文件
+    try:
+        with metrics.timed('save'):
+            wb.save(output_file)
+        print("\nSuccess: All data saved to '%s' with %d sheet(s).\n" % (output_file, processed_files_count))
+    except Exception as e:
+        print("\nError: Failed to save Excel file '%s'. Reason: %s\n" % (output_file, str(e)))
+        return 0
+    return processed_files_count
+
+
+def write_sharded_workbooks(output_file, named_results, metrics=None, summary=None, max_sheets=None):
+    """将 sheet 分片写入多个工作簿（每个最多 max_sheets 个 sheet，默认 SHARD_MAX_SHEETS），各分片由进程池并行保存；
+    output_file 为带链接的索引工作簿（汇总 sheet 也写在这里）。返回写入的 sheet 数（保存失败时为 0）
+    """
+    if metrics is None:
+        metrics = RunMetrics('write')
+    if max_sheets is None:
+        max_sheets = SHARD_MAX_SHEETS
+
+    def summarized():
+        for filename, file_data in named_results:
+            if summary is not None:
+                with metrics.timed('summary', filename):
+                    summary.add_file(file_data)
+            yield filename, file_data
+
+    written, entries = write_sharded(write_workbook, output_file, summarized(), sanitize_sheet_name, max_sheets,
+                                     SHARD_MAX_MB * 1024 * 1024, SHARD_WORKERS, metrics)
+
+    def add_summary(wb):
+        sheet_names = SheetNameRegistry(sanitize_sheet_name)
+        sheet_names.claim(INDEX_SHEET_NAME)
+        write_summary_sheet(wb, summary, sheet_names)
+
+    with metrics.timed('save'):
+        saved = write_index(output_file, entries, add_summary if summary is not None else None)
+    if not saved or not written:
+        return 0
+    shard_count = len(set(shard_file for _, shard_file, _ in entries))
+    print("Success: %d sheet(s) saved in %d workbook(s), index saved to '%s'.\n" % (written, shard_count, output_file))
+    return written
+
+
+def write_delimited_output(output_file, named_results, output_format, metrics=None, summary=None):
+    """将 (文件名, 提取结果) 逐行流式写入一个 CSV/TSV 文件（内容与各 sheet 相同），返回写入的文件数
+
+    summary 为可选的 FleetSummary，全部写完后另存为 <输出文件名>.summary.csv/tsv。
+    """
+    if metrics is None:
+        metrics = RunMetrics('write')
+
+    def named_rows():
+        for filename, file_data in named_results:
+            if not file_data:
+                print("  Note: No target data found in %s." % filename)
+            if summary is not None:
+                with metrics.timed('summary', filename):
+                    summary.add_file(file_data)
+            yield filename, metrics.timed_iter(iter_file_rows(filename, file_data), 'write_rows', filename)
 
-    # 自动调整列宽 (简单处理)
-    for col_idx, header in enumerate(headers, 1):
-        max_length = 0
-        column = get_column_letter(col_idx)
-        for row_num in range(1, current_row):
-            cell_value = sheet.cell(row=row_num, column=col_idx).value
-            if cell_value:
-                try:
-                    cell_len = len(str(cell_value))
-                except:
-                    cell_len = 0
-                if cell_len > max_length:
-                    max_length = cell_len
-        adjusted_width = min(max_length + 2, 50)  # 限制最大宽度
-        sheet.column_dimensions[column].width = adjusted_width
-
-    return current_row  # 返回下一个可用行号
-
-
-# 修改 get_input 函数以兼容 Python 3
-def get_input(prompt):
-    """Safe input function for Python 3"""
-    # 移除 Python 2 的编码处理部分
     try:
-        # Python 3 的 input() 返回字符串，无需 decode
-        return input(prompt).strip()
-    except (EOFError, KeyboardInterrupt):
-        # 处理 Ctrl+C 或意外的 EOF
-        print("\nOperation cancelled by user.")
-        return 'quit'
-
-def main():
+        written = write_delimited(output_file, named_rows(), DELIMITERS[output_format])
+        if summary is not None:
+            with metrics.timed('write_summary'):
+                write_delimited(summary_path(output_file), [(SUMMARY_SHEET_NAME, summary.rows())],
+                                DELIMITERS[output_format])
+    except OSError as e:
+        print("\nError: Failed to write '%s'. Reason: %s\n" % (output_file, str(e)))
+        return 0
+    print("\nSuccess: All data saved to '%s' (%d file(s)).\n" % (output_file, written))
+    return written
+
+
+def watch_folder(folder_path):
+    """跟踪文件夹中不断增长的 .txt 日志，只解析新追加的内容，并在有更新时重新生成工作簿"""
+    output_file = os.path.join(folder_path, OUTPUT_FILENAME)
+    watcher = FolderWatcher(folder_path, MeasValParser,
+                            checkpoint_path=os.path.join(folder_path, WATCH_CHECKPOINT),
+                            signature=cache_signature(), interval=WATCH_INTERVAL)
+
+    def on_update(snapshots):
+        write_workbook(output_file, [(os.path.basename(filepath), sections)
+                                     for filepath, sections in snapshots])
+
+    watcher.run(on_update)
+
+
+def process_files(filepaths, output_file, output_format='xlsx', workers=None, use_cache=None,
+                  write_metrics=None, trace_memory=None, profile=None, results_db=None, shard_sheets=None,
+                  prefetch=None, limits=None, names=None):
+    """提取 filepaths 中所有文件的数据并写入 output_file（xlsx/csv/tsv），返回写入的文件数
+
+    write_metrics 为 True 时在输出文件旁写入 <输出文件名>.metrics.json（各阶段耗时、读取量和命中数），
+    trace_memory / profile 分别开启每个文件的 tracemalloc 峰值和 cProfile 热点统计。
+    results_db（默认 RESULTS_DB）为结果数据库路径，提取结果在写入输出的同时批量插入该数据库。
+    shard_sheets（默认 SHARD_MAX_SHEETS）大于 0 时 xlsx 输出分片写入多个工作簿，output_file 为索引工作簿。
+    prefetch（默认 PREFETCH_DEPTH）为串行提取时预读的文件数，0 表示不预读。
+    limits（默认 LIMITS_FILE）为限值表路径，写入输出的同时检查所有读数，最后写入 <输出文件名>.limits.* 报告。
+    names(路径) 给出 sheet 名、Source_File 和限值报告中使用的文件名（默认 source_name，即日志文件名）。
+    """
+    if workers is None:
+        workers = BATCH_WORKERS
+    if use_cache is None:
+        use_cache = USE_CACHE
+    if write_metrics is None:
+        write_metrics = WRITE_METRICS
+    if trace_memory is None:
+        trace_memory = METRICS_TRACE_MEMORY
+    if profile is None:
+        profile = METRICS_PROFILE
+    if results_db is None:
+        results_db = RESULTS_DB
+    if prefetch is None:
+        prefetch = PREFETCH_DEPTH
+    if shard_sheets is None:
+        shard_sheets = SHARD_MAX_SHEETS
+    if names is None:
+        names = source_name
+    try:
+        checker = new_checker(limits)
+    except (OSError, ValueError) as e:
+        print("\nError: Failed to read limits table '%s'. Reason: %s\n" % (limits or LIMITS_FILE, str(e)))
+        return 0
+
+    # 并行提取所有文件的数据（文件数较少时自动退回串行），结果按文件顺序逐个返回
+    batch_report = BatchReport()
+    read_ahead = functools.partial(ReadAhead, depth=prefetch, max_bytes=PREFETCH_MAX_MB * 1024 * 1024,
+                                   threads=PREFETCH_THREADS) if prefetch > 0 else None
+    run_extract = functools.partial(iter_batch, workers=workers,
+                                    min_parallel=PARALLEL_MIN_FILES, report=batch_report, read_ahead=read_ahead)
+    # 已缓存且未修改的文件直接从缓存读取，其余文件交给进程池解析（缓存保存在输出文件所在的文件夹）
+    cache_path = os.path.join(os.path.dirname(os.path.abspath(output_file)), CACHE_FILENAME)
+    cache = open_cache(cache_path, cache_signature()) if use_cache else None
+    # 每个文件在工作进程中计时并记录读取量和命中数，随结果一起返回
+    metrics = RunMetrics(TOOL_NAME)
+    extract = functools.partial(measure_call, extract_data, trace_memory=trace_memory, profile=profile)
+    run_measured = metrics.wrap_batch(run_extract)
+    # filepaths 可以是边查找边产生的 SourceStream：提取、结果数据库和输出各自按顺序读取同一串路径
+    extract_paths, store_paths, name_paths = itertools.tee(filepaths, 3)
+    if cache is not None:
+        all_results = iter_cached(extract, extract_paths, cache, run_measured)
+    else:
+        all_results = run_measured(extract, extract_paths)
+    # 写入输出的同时把新增或修改过的文件的结果插入结果数据库
+    store = open_store(results_db) if results_db else None
+    if store is not None:
+        all_results = iter_stored(store, TOOL_NAME, cache_signature(), store_paths, all_results, store_rows)
+
+    named_results = iter_paired((metrics.name_file(filepath, names(filepath)) for filepath in name_paths),
+                                all_results)
+    if checker is not None:
+        # 写入每个文件时收集其读数，按块批量与限值比较
+        named_results = iter_checked(checker, named_results)
+    if output_format == 'xlsx' and shard_sheets > 0:
+        written = write_sharded_workbooks(output_file, named_results, metrics, new_summary(), shard_sheets)
+    elif output_format == 'xlsx':
+        written = write_workbook(output_file, named_results, metrics, new_summary())
+    else:
+        written = write_delimited_output(output_file, named_results, output_format, metrics, new_summary())
+
+    if checker is not None:
+        with metrics.timed('limits'):
+            write_report(checker, output_file, output_format)
+        print("  %s" % checker.format())
+    print("  %s" % batch_report.format())
+    if cache is not None:
+        cache.evict()
+        print("  %s" % cache.format())
+        cache.close()
+    if store is not None:
+        print("  %s" % store.format())
+        store.close()
+    if write_metrics:
+        metrics.save(metrics_path(output_file), output=os.path.abspath(output_file), output_format=output_format,
+                      batch=batch_report.as_dict(), cache=cache.as_dict() if cache is not None else None,
+                      store=store.as_dict() if store is not None else None,
+                      limits=checker.as_dict() if checker is not None else None)
+    return written
+
+
+def new_walker():
+    """交互模式查找日志用的 SourceWalker（DISCOVER_* 都未设置时返回 None）"""
+    if not (DISCOVER_RECURSIVE or DISCOVER_INCLUDE or DISCOVER_EXCLUDE or DISCOVER_SINCE or DISCOVER_UNTIL):
+        return None
+    return SourceWalker(DISCOVER_INCLUDE, DISCOVER_EXCLUDE, DISCOVER_SINCE, DISCOVER_UNTIL,
+                        recursive=DISCOVER_RECURSIVE)
+
+
+def run_cli(argv):
+    """命令行（非交互）模式：python <脚本> <文件夹|文件|通配符>... [-o 输出] [-f xlsx|csv|tsv]"""
+    args = build_arg_parser(CLI_DESCRIPTION).parse_args(argv)
+    walker, filepaths = discover_inputs(args)
+    if first_source(filepaths) is None:
+        print("No .txt files found in: %s" % ', '.join(args.inputs))
+        return 1
+    try:
+        output_file, output_format = resolve_output(args.output, args.format,
+                                                    default_output_dir(args.inputs, filepaths), OUTPUT_FILENAME)
+    except (ValueError, OSError) as e:
+        print("Error: %s" % str(e))
+        return 1
+    print("%s Writing %s output to '%s'...\n" % (describe_sources(filepaths), output_format, output_file))
+    written = process_files(filepaths, output_file, output_format,
+                            workers=args.workers, use_cache=not args.no_cache, write_metrics=not args.no_metrics,
+                            trace_memory=args.trace_memory, profile=args.profile, results_db=args.store,
+                            shard_sheets=args.shard_sheets, prefetch=args.prefetch, limits=args.limits,
+                            names=walker.source_name if walker is not None else None)
+    if walker is not None:
+        print("  %s" % walker.format())
+    return 0 if written else 1
+
+
+def main(argv=None):
+    """带参数运行时为命令行模式，否则进入交互模式"""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        return run_cli(argv)
+
     print("Meas VAL/ANGLE Data Extractor for Specific Sections (Batch Mode - Excel Multi-Sheet - Python 3)")
     print("Processes all .txt files in a given folder.")
     print("Extracts CHx VAL and ANGLE from lines like:")
@@ -249,86 +659,16 @@ def main():
         print("  - %s" % sec.replace(r'\s+', ' ').replace(r'\.', '.'))
     print("Data is grouped by sections and CH groups, separated by blank lines in output.")
     print("Output is a single .xlsx file with one sheet per .txt file.")
+    print("Enter 'watch <folder>' to follow growing logs and refresh the workbook as they change.")
     print("-" * 20)
 
-    while True:
-        folder_path = get_input("Enter folder path containing .txt files (or 'quit' to exit): ")
-
-        if folder_path.lower() in ('quit', 'exit', 'q'):
-            print("Goodbye!")
-            break
-
-        if not folder_path:
-            print("Please enter a folder path, or 'quit' to exit.\n")
-            continue
-
-        if not os.path.isdir(folder_path):
-            print("Error: Path is not a directory or does not exist: %s\n" % folder_path)
-            continue
-
-        # 查找文件夹下所有 .txt 文件
-        txt_files = [f for f in os.listdir(folder_path) if
-                     f.lower().endswith('.txt') and os.path.isfile(os.path.join(folder_path, f))]
+    def process_folder(filepaths, folder_path):
+        # 提取所有文件的数据，按文件顺序写入每个 sheet 并保存到指定文件夹（子文件夹中的日志以相对路径命名）
+        process_files(filepaths, os.path.join(folder_path, OUTPUT_FILENAME),
+                      names=functools.partial(source_name, root=folder_path))
 
-        if not txt_files:
-            print("No .txt files found in directory: %s\n" % folder_path)
-            continue
-
-        print("\nFound %d .txt file(s) in '%s'. Starting processing...\n" % (len(txt_files), folder_path))
-
-        # 创建一个新的 Excel 工作簿
-        wb = Workbook()
-        # 删除默认创建的 'Sheet'
-        default_sheet = wb.active
-        wb.remove(default_sheet)
-
-        # 处理每个 .txt 文件
-        processed_files_count = 0
-        for filename in txt_files:
-            filepath = os.path.join(folder_path, filename)
-
-            # Extract data
-            file_data = extract_data(filepath)
-
-            # 如果提取到数据或未提取到数据，都为该文件创建一个 sheet
-            # 获取不带扩展名的文件名作为 sheet 名
-            sheet_name_base = os.path.splitext(filename)[0]
-            # 清理 sheet 名以符合 Excel 规范
-            sheet_name = sanitize_sheet_name(sheet_name_base)
-
-            # 处理 sheet 名冲突（Excel 不允许同名 sheet）
-            original_sheet_name = sheet_name
-            counter = 1
-            while sheet_name in [s.title for s in wb.worksheets]:
-                # 如果名称已存在，则添加后缀
-                new_name = "{}_{}".format(original_sheet_name, counter)
-                sheet_name = sanitize_sheet_name(new_name)
-                counter += 1
-                # 防止无限循环（虽然极不可能）
-                if counter > 1000:
-                    sheet_name = sanitize_sheet_name("File_{}".format(counter))
-
-            # 创建新的 sheet
-            ws = wb.create_sheet(title=sheet_name)
-
-            # 写入数据到 sheet
-            write_sheet_to_excel(ws, file_data)
-            processed_files_count += 1
-            if not file_data: # 修正: 更明确的条件判断
-                print("  Note: No target data found in %s. Empty sheet created." % filename)
-            else:
-                print("  Data for %s written to sheet '%s'." % (filename, sheet_name))
-
-        # 生成合并的输出 Excel 文件名 (在指定文件夹内)
-        output_file = os.path.join(folder_path, 'ALL_VAL_ANGLE_By_Section.xlsx')
-
-        # 保存 Excel 文件
-        try:
-            wb.save(output_file)
-            print("\nSuccess: All data saved to '%s' with %d sheet(s).\n" % (output_file, processed_files_count))
-        except Exception as e:
-            print("\nError: Failed to save Excel file '%s'. Reason: %s\n" % (output_file, str(e)))
+    prompt_loop(process_folder, watch_folder, new_walker)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+# Requires: pip install openpyxl
+import os
+import sys
+import time
+import itertools
+import functools
+
+import Dataread_MeasVAL as measval
+import Datareader_ReadBack_statistic as readback
+from datareader.batch import iter_batch, iter_paired, BatchReport, PARALLEL_MIN_FILES
+from datareader.prefetch import ReadAhead
+from datareader.chunked import use_chunks, parse_chunked, new_reader
+from datareader.cache import open_cache, iter_cached, make_signature
+from datareader.combined import CombinedParser, ResultSpool
+from datareader.archive import source_exists, source_name, feed_source
+from datareader.store import open_store
+from datareader.limits import iter_checked, write_report
+from datareader.metrics import RunMetrics, measure_call, record_extract
+from datareader.cli import build_arg_parser, discover_inputs, describe_sources, default_output_dir, is_directory_output
+from datareader.discover import SourceWalker, first_source
+from datareader.app import prompt_loop
+
+# python -m venv myenv
+# 需要在虚拟环境下运行 myenv\Scripts\activate
+
+# 一次读取同时提取 Meas VAL/ANGLE 和 Readback 数据（章节、匹配规则和统计设置沿用两个脚本中的配置）
+
+# 并行批处理的进程数 (None 表示使用全部 CPU 核心, 1 表示强制串行)
+BATCH_WORKERS = None
+
+# 串行提取时用线程预读后续文件，使网络共享上的读取与解析重叠（预读文件数，0 表示关闭；最多占用的内存 MB；读取线程数）
+PREFETCH_DEPTH = 4
+PREFETCH_MAX_MB = 256
+PREFETCH_THREADS = 2
+
+# 大文件按目标章节标题拆分成约 INTRA_FILE_CHUNK_MB 的块，在 INTRA_FILE_WORKERS 个进程上并行解析
+# （只用于不小于 INTRA_FILE_MIN_MB 的普通 .txt 文件且 USE_MMAP 为 True 时；0 表示关闭）
+INTRA_FILE_MIN_MB = 256
+INTRA_FILE_CHUNK_MB = 64
+INTRA_FILE_WORKERS = None
+
+# 使用 mmap 按字节跳转到目标章节；MMAP_STOP_EARLY 为 True 时所有目标章节都出现并结束后即停止读取
+# （之后重复出现的同名章节将被忽略）
+USE_MMAP = True
+MMAP_STOP_EARLY = False
+
+# 章节索引：第一次 mmap 读取日志时在旁边保存所有编号章节标题的位置（.<日志名>.sections.json），
+# 之后换一组 TARGET_SECTIONS 重新运行时直接跳到匹配的章节，不再搜索整个文件（日志修改后自动重建）。
+# 只在 TARGET_SECTIONS 都以章节编号开头时使用；章节标题出现在行中间（而不是行首）时不会被索引。
+# 索引文件写在日志所在的文件夹中（输入文件夹会被修改），所以默认关闭
+USE_SECTION_INDEX = False
+
+# 提取结果缓存（保存在输出文件夹中）
+USE_CACHE = True
+CACHE_FILENAME = '.combined_cache.sqlite3'
+
+# 交互模式查找日志的方式（命令行模式见 -r/--recursive、--include、--exclude、--since、--until）：
+# DISCOVER_RECURSIVE 为 True 时也查找子文件夹（例如 日期/工位/序列号 目录树），在后台线程中边查找边交给提取；
+# DISCOVER_INCLUDE / DISCOVER_EXCLUDE 为通配符列表（按名称或相对路径，例如 ['*_final.txt']、['ST09', '*/tmp/*']），
+# DISCOVER_SINCE / DISCOVER_UNTIL（'YYYY-MM-DD'）跳过名称中的日期在范围之外的文件夹和文件。都不设置时只列出文件夹本身的日志
+DISCOVER_RECURSIVE = False
+DISCOVER_INCLUDE = []
+DISCOVER_EXCLUDE = []
+DISCOVER_SINCE = None
+DISCOVER_UNTIL = None
+
+# 输出文件名（在所选文件夹内），两个工作簿分开保存
+MEASVAL_OUTPUT_FILENAME = 'ALL_MeasVAL_By_Section.xlsx'
+READBACK_OUTPUT_FILENAME = 'ALL_Readback_By_Section.xlsx'
+
+# 运行指标（见两个脚本中的同名设置），保存在输出文件夹中
+WRITE_METRICS = True
+METRICS_TRACE_MEMORY = False
+METRICS_PROFILE = False
+METRICS_FILENAME = 'ALL_Combined_By_Section.metrics.json'
+
+# 结果数据库（见两个脚本中的 RESULTS_DB），两类结果分别以 measval / readback 写入同一个数据库
+RESULTS_DB = None
+
+# 限值表（见两个脚本中的 LIMITS_FILE）：两类读数都按同一个表检查（表中的 Tool 列可把一行限定为 measval 或 readback），
+# 报告分别写在两个输出文件旁；None 表示沿用两个脚本中的设置
+LIMITS_FILE = None
+
+# 命令行模式的说明
+CLI_DESCRIPTION = "Extract Meas VAL/ANGLE and Readback data of the target sections from .txt logs " \
+                  "in a single read per file (two outputs, written to the --output directory)."
+
+
+def cache_signature():
+    """Identify the configuration of both extractors and the read options."""
+    return make_signature('combined', measval.cache_signature(), readback.cache_signature(),
+                          USE_MMAP and MMAP_STOP_EARLY)
+
+
+def new_parser():
+    """同时运行两个解析器的 CombinedParser（模块级函数，可在工作进程中调用）"""
+    return CombinedParser([measval.MeasValParser(), readback.ReadbackParser()])
+
+
+def extract_data(filepath, metrics=None):
+    """Extract Meas VAL/ANGLE and Readback data from file in one pass; return (measval, readback)."""
+    if not source_exists(filepath):
+        print("  Error: File not found '%s'" % filepath)
+        return [], []
+
+    print("  Reading file: %s" % source_name(filepath))
+
+    start = time.perf_counter()
+    if USE_MMAP and use_chunks(filepath, INTRA_FILE_MIN_MB * 1024 * 1024, INTRA_FILE_WORKERS):
+        # 大文件：按目标章节标题拆分成块并行解析，结果按文件顺序拼接（与整文件读取相同）
+        (measval_sections, readback_sections), parser, bytes_scanned = parse_chunked(
+            filepath, new_parser, INTRA_FILE_WORKERS, int(INTRA_FILE_CHUNK_MB * 1024 * 1024), stop_early=MMAP_STOP_EARLY,
+            section_index=USE_SECTION_INDEX)
+    else:
+        parser = new_parser()
+        # 普通 .txt 文件用 mmap 读取（USE_MMAP），压缩文件和 zip 包中的文件以流的方式边解压边解析
+        reader = new_reader(parser, USE_SECTION_INDEX) if USE_MMAP else None
+        bytes_scanned = feed_source(filepath, parser, reader, stop_early=MMAP_STOP_EARLY)
+        measval_sections, readback_sections = parser.close()
+    if metrics is not None:
+        record_extract(metrics, filepath, parser, bytes_scanned, time.perf_counter() - start,
+                       len(measval_sections) + len(readback_sections))
+    return measval_sections, readback_sections
+
+
+def iter_stored_pairs(store, filepaths, all_results):
+    """逐个返回 (measval, readback) 结果，同时把两类结果插入结果数据库"""
+    for filepath, pair in iter_paired(filepaths, all_results):
+        for module, data in zip((measval, readback), pair):
+            store.update(module.TOOL_NAME, filepath, module.cache_signature(), data, module.store_rows)
+        yield pair
+
+
+def write_outputs(module, output_file, named_results, output_format, metrics=None, shard_sheets=None,
+                  checker=None):
+    """用 module（measval 或 readback）的写入函数保存一个输出文件，返回写入的文件数
+
+    shard_sheets 为 None 时使用 module.SHARD_MAX_SHEETS；checker 为可选的 LimitChecker，
+    写入的同时检查读数，最后在输出文件旁写入限值报告。
+    """
+    if metrics is None:
+        metrics = RunMetrics('write')
+    if shard_sheets is None:
+        shard_sheets = module.SHARD_MAX_SHEETS
+    if checker is not None:
+        named_results = iter_checked(checker, named_results)
+    if output_format == 'xlsx' and shard_sheets > 0:
+        written = module.write_sharded_workbooks(output_file, named_results, metrics, module.new_summary(),
+                                                 shard_sheets)
+    elif output_format == 'xlsx':
+        written = module.write_workbook(output_file, named_results, metrics, module.new_summary())
+    else:
+        written = module.write_delimited_output(output_file, named_results, output_format, metrics,
+                                                module.new_summary())
+    if checker is not None:
+        with metrics.timed('limits'):
+            write_report(checker, output_file, output_format)
+        print("  %s" % checker.format())
+    return written
+
+
+def process_files(filepaths, output_dir, output_format='xlsx', workers=None, use_cache=None,
+                  write_metrics=None, trace_memory=None, profile=None, results_db=None, shard_sheets=None,
+                  prefetch=None, limits=None, names=None):
+    """每个文件只读取一次，提取两类数据并分别写入 output_dir 下的两个输出文件，返回是否都写入成功
+
+    limits（默认 LIMITS_FILE，其次为两个脚本中的 LIMITS_FILE）为限值表路径。
+    names(路径) 给出 sheet 名、Source_File 和限值报告中使用的文件名（默认 source_name，即日志文件名）。
+    """
+    if workers is None:
+        workers = BATCH_WORKERS
+    if use_cache is None:
+        use_cache = USE_CACHE
+    if write_metrics is None:
+        write_metrics = WRITE_METRICS
+    if trace_memory is None:
+        trace_memory = METRICS_TRACE_MEMORY
+    if profile is None:
+        profile = METRICS_PROFILE
+    if results_db is None:
+        results_db = RESULTS_DB
+    if prefetch is None:
+        prefetch = PREFETCH_DEPTH
+    if names is None:
+        names = source_name
+    limits = limits or LIMITS_FILE
+    try:
+        checkers = [module.new_checker(limits) for module in (measval, readback)]
+    except (OSError, ValueError) as e:
+        print("\nError: Failed to read limits table '%s'. Reason: %s\n" % (limits, str(e)))
+        return False
+
+    batch_report = BatchReport()
+    read_ahead = functools.partial(ReadAhead, depth=prefetch, max_bytes=PREFETCH_MAX_MB * 1024 * 1024,
+                                   threads=PREFETCH_THREADS) if prefetch > 0 else None
+    run_extract = functools.partial(iter_batch, workers=workers,
+                                    min_parallel=PARALLEL_MIN_FILES, report=batch_report, read_ahead=read_ahead)
+    cache = open_cache(os.path.join(output_dir, CACHE_FILENAME), cache_signature()) if use_cache else None
+    metrics = RunMetrics('combined')
+    extract = functools.partial(measure_call, extract_data, trace_memory=trace_memory, profile=profile)
+    run_measured = metrics.wrap_batch(run_extract)
+    # filepaths 可以是边查找边产生的 SourceStream：提取、结果数据库和输出各自按顺序读取同一串路径
+    extract_paths, store_paths, name_paths = itertools.tee(filepaths, 3)
+    if cache is not None:
+        all_results = iter_cached(extract, extract_paths, cache, run_measured)
+    else:
+        all_results = run_measured(extract, extract_paths)
+    store = open_store(results_db) if results_db else None
+    if store is not None:
+        all_results = iter_stored_pairs(store, store_paths, all_results)
+
+    # 第一个输出写入时记下文件名，第二个输出重放时使用
+    filenames = []
+
+    def recorded_names():
+        for filepath in name_paths:
+            filenames.append(metrics.name_file(filepath, names(filepath)))
+            yield filenames[-1]
+
+    measval_file = os.path.join(output_dir, '%s.%s' % (os.path.splitext(MEASVAL_OUTPUT_FILENAME)[0], output_format))
+    readback_file = os.path.join(output_dir, '%s.%s' % (os.path.splitext(READBACK_OUTPUT_FILENAME)[0], output_format))
+
+    # 写第一个输出时，Readback 结果暂存到临时文件，随后再写第二个输出（不在内存中保留所有结果）
+    spool = ResultSpool()
+    measval_written = write_outputs(measval, measval_file, iter_paired(recorded_names(), spool.split(all_results)),
+                                    output_format, metrics, shard_sheets, checkers[0])
+    readback_written = write_outputs(readback, readback_file, iter_paired(filenames, spool.replay()), output_format,
+                                     metrics, shard_sheets, checkers[1])
+
+    print("  %s" % batch_report.format())
+    if cache is not None:
+        cache.evict()
+        print("  %s" % cache.format())
+        cache.close()
+    if store is not None:
+        print("  %s" % store.format())
+        store.close()
+    if write_metrics:
+        metrics.save(os.path.join(output_dir, METRICS_FILENAME),
+                     output=[os.path.abspath(measval_file), os.path.abspath(readback_file)],
+                     output_format=output_format, batch=batch_report.as_dict(),
+                     cache=cache.as_dict() if cache is not None else None,
+                     store=store.as_dict() if store is not None else None,
+                     limits=[checker.as_dict() if checker is not None else None for checker in checkers])
+    return bool(measval_written and readback_written)
+
+
+def new_walker():
+    """交互模式查找日志用的 SourceWalker（DISCOVER_* 都未设置时返回 None）"""
+    if not (DISCOVER_RECURSIVE or DISCOVER_INCLUDE or DISCOVER_EXCLUDE or DISCOVER_SINCE or DISCOVER_UNTIL):
+        return None
+    return SourceWalker(DISCOVER_INCLUDE, DISCOVER_EXCLUDE, DISCOVER_SINCE, DISCOVER_UNTIL,
+                        recursive=DISCOVER_RECURSIVE)
+
+
+def run_cli(argv):
+    """命令行（非交互）模式：python Datareader_Combined.py <文件夹|文件|通配符>... [-o 输出文件夹] [-f xlsx|csv|tsv]"""
+    args = build_arg_parser(CLI_DESCRIPTION).parse_args(argv)
+    walker, filepaths = discover_inputs(args)
+    if first_source(filepaths) is None:
+        print("No .txt files found in: %s" % ', '.join(args.inputs))
+        return 1
+    output_dir = args.output or default_output_dir(args.inputs, filepaths)
+    if is_directory_output(output_dir) and not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    if not os.path.isdir(output_dir):
+        print("Error: --output must be an existing directory for the combined extractor: %s" % output_dir)
+        return 1
+    output_format = args.format or 'xlsx'
+    print("%s Writing %s output to '%s'...\n" % (describe_sources(filepaths), output_format, output_dir))
+    ok = process_files(filepaths, output_dir, output_format, workers=args.workers, use_cache=not args.no_cache,
+                       write_metrics=not args.no_metrics, trace_memory=args.trace_memory, profile=args.profile,
+                       results_db=args.store, shard_sheets=args.shard_sheets, prefetch=args.prefetch,
+                       limits=args.limits, names=walker.source_name if walker is not None else None)
+    if walker is not None:
+        print("  %s" % walker.format())
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    """带参数运行时为命令行模式，否则进入交互模式"""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        return run_cli(argv)
+
+    print("Combined Meas VAL/ANGLE + Readback Data Extractor (Batch Mode - Excel Multi-Sheet - Python 3)")
+    print("Processes all .txt files in a given folder, reading each file only once.")
+    print("Only processes data under these sections:")
+    for sec in measval.TARGET_SECTIONS:
+        print("  - %s" % sec.replace(r'\s+', ' ').replace(r'\.', '.'))
+    print("Output is two .xlsx files (%s, %s) with one sheet per .txt file." % (
+        MEASVAL_OUTPUT_FILENAME, READBACK_OUTPUT_FILENAME))
+    print("-" * 20)
+
+    def process_folder(filepaths, folder_path):
+        # 两个输出文件写入该文件夹（子文件夹中的日志以相对路径命名）
+        process_files(filepaths, folder_path, names=functools.partial(source_name, root=folder_path))
+
+    prompt_loop(process_folder, new_walker=new_walker)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
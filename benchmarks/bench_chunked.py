@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Benchmark intra-file chunked parsing (datareader.chunked) against a serial mmap read of one large log.
+
+Usage: python benchmarks/bench_chunked.py [size_mb] [workers] [chunk_mb]
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Dataread_MeasVAL
+import Datareader_ReadBack_statistic
+from datareader.chunked import parse_chunked, new_reader
+from loggen import write_sample_log
+from bench_scanner import best_of, section_data_only
+
+
+def serial_read(parser_cls, path):
+    parser = parser_cls()
+    new_reader(parser).feed_file(path, parser, stop_early=False)
+    return parser.close()
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    chunk_mb = float(sys.argv[3]) if len(sys.argv) > 3 else 16
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.txt')
+        write_sample_log(path, size_mb, target_share=0.3)
+        print("Log: %.1f MB, chunks of %.1f MB" % (size_mb, chunk_mb))
+        for name, parser_cls in (('measval', Dataread_MeasVAL.MeasValParser),
+                                 ('readback', Datareader_ReadBack_statistic.ReadbackParser)):
+            serial_time, serial_result = best_of(lambda: serial_read(parser_cls, path))
+            chunked_time, (chunked_result, run, _) = best_of(
+                lambda: parse_chunked(path, parser_cls, workers, int(chunk_mb * 1024 * 1024), stop_early=False))
+            same = 'identical' if section_data_only(serial_result) == section_data_only(chunked_result) \
+                else 'MISMATCH'
+            print("%-9s serial %7.3fs  chunked %7.3fs (%d chunks)  x%.2f  %s"
+                  % (name, serial_time, chunked_time, run.chunks, serial_time / chunked_time, same))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Benchmark recursive log discovery (datareader.discover) on a generated date/station/serial tree.
+
+Usage: python benchmarks/bench_discover.py [days] [stations] [serials] [logs_per_serial]
+
+The tree holds empty .txt logs plus a few other files per serial folder.
+It is walked with os.walk plus an os.path.isfile check per entry (the
+listdir/isfile approach of the folder prompt, extended to subfolders), and
+with SourceWalker, without and with a date range that keeps a third of the
+days. The time until the first log is available is reported for the walk
+and for a SourceStream.
+"""
+import os
+import sys
+import time
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datareader.archive import expand_file
+from datareader.discover import SourceWalker, SourceStream
+
+OTHER_FILES = ('report.pdf', 'fixture.json', 'photo.jpg')
+
+
+def make_tree(root, days, stations, serials, logs):
+    start = datetime.date(2026, 1, 1)
+    for day in range(days):
+        day_name = (start + datetime.timedelta(days=day)).isoformat()
+        for station in range(stations):
+            for serial in range(serials):
+                folder = os.path.join(root, day_name, 'ST%02d' % station, 'SN%06d' % (day * 1000 + serial))
+                os.makedirs(folder)
+                for name in ['run_%d.txt' % log for log in range(logs)] + list(OTHER_FILES):
+                    open(os.path.join(folder, name), 'w').close()
+    return start
+
+
+def walk_isfile(root):
+    """os.walk with one isfile() per entry, as a recursive version of the listdir/isfile listing."""
+    sources = []
+    for folder, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            filepath = os.path.join(folder, name)
+            if os.path.isfile(filepath):
+                sources.extend(expand_file(filepath))
+    return sources
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    stations = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    serials = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    logs = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+    with tempfile.TemporaryDirectory() as root:
+        start = make_tree(root, days, stations, serials, logs)
+        total = days * stations * serials * (logs + len(OTHER_FILES))
+        print("Tree: %d day(s) x %d station(s) x %d serial(s), %d files" % (days, stations, serials, total))
+        isfile_time, expected = timed(lambda: walk_isfile(root))
+        print("%-26s %7.3fs  %d log(s)" % ('os.walk + isfile', isfile_time, len(expected)))
+        walker = SourceWalker()
+        walk_time, found = timed(lambda: list(walker.walk(root)))
+        print("%-26s %7.3fs  %d log(s)  x%.2f  %s" % ('SourceWalker', walk_time, len(found), isfile_time / walk_time,
+                                                     'same order' if found == expected else 'DIFFERENT'))
+        since = start + datetime.timedelta(days=days // 3)
+        until = start + datetime.timedelta(days=2 * days // 3 - 1)
+        ranged = SourceWalker(since=since, until=until)
+        range_time, in_range = timed(lambda: list(ranged.walk(root)))
+        print("%-26s %7.3fs  %d log(s)  x%.2f  (%d folder(s) pruned)"
+              % ('SourceWalker since/until', range_time, len(in_range), isfile_time / range_time, ranged.pruned))
+        first_time, stream = timed(lambda: SourceStream(SourceWalker().walk(root)))
+        rest_time, rest = timed(lambda: sum(1 for _ in stream))
+        print("%-26s %7.3fs to the first log, %.3fs for all %d" % ('SourceStream', first_time,
+                                                                   first_time + rest_time, rest))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the bulk limit check (datareader.limits) against a per-reading loop.
+
+Usage: python benchmarks/bench_limits.py [million_readings] [channels]
+
+Generated Readback results (VAL, ANGLE, DG, OANG per channel) are checked
+against a table with one all-channel limit per section and field plus a few
+per-channel overrides, once with a per-reading lookup and comparison loop,
+and with LimitChecker with and without NumPy. The out-of-limit rows of all
+three are compared.
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datareader.columnar as columnar
+from datareader.limits import LimitTable, LimitChecker
+
+FIELDS = ['VAL', 'ANGLE', 'DG', 'OANG']
+SECTIONS = ['8.4 50Hz Verification2', '8.4 60Hz Verification1', '8.4 60Hz Verification2',
+            '8.1.6 P3Y CTVT Cali 1A', '8.1.3 P3Y CTVT Cali 10A']
+GROUPS_PER_SECTION = 20
+
+
+def make_files(readings, channels):
+    """(filename, section data) pairs holding about readings readings."""
+    rng = random.Random(1)
+    per_file = len(SECTIONS) * GROUPS_PER_SECTION * channels * len(FIELDS)
+    files = []
+    for file_index in range(max(readings // per_file, 1)):
+        sections = []
+        for section_name in SECTIONS:
+            groups = []
+            for _ in range(GROUPS_PER_SECTION):
+                groups.append(dict(('CH%d' % ch, {'VAL': rng.uniform(50, 60), 'ANGLE': rng.uniform(-1, 1),
+                                                  'DG': rng.randint(0, 3), 'OANG': rng.uniform(-1, 1)})
+                                   for ch in range(channels)))
+            sections.append({'section_name': section_name, 'data': groups})
+        files.append(('log_%04d.txt' % file_index, sections))
+    return files
+
+
+def make_table():
+    table = LimitTable()
+    for section_name in SECTIONS:
+        table.add(section_name, None, 'VAL', 50.1, 59.9)
+        table.add(section_name, None, 'ANGLE', -0.99, 0.99)
+        table.add(section_name, None, 'OANG', -0.99, 0.99)
+        table.add(section_name, None, 'DG', float('-inf'), 3)
+        table.add(section_name, 5, 'VAL', 50.5, 59.5)
+    return table
+
+
+def loop_check(table, files):
+    """The per-reading check: one lookup and comparison per value."""
+    failures = []
+    for filename, sections in files:
+        for section_info in sections:
+            for ch_group, dataset in enumerate(section_info['data']):
+                for ch_label, ch_data in dataset.items():
+                    for field in FIELDS:
+                        limit_id = table.lookup(section_info['section_name'], int(ch_label[2:]), field)
+                        if limit_id < 0:
+                            continue
+                        value = ch_data[field]
+                        if not table.low[limit_id] <= value <= table.high[limit_id]:
+                            failures.append([filename, section_info['section_name'], ch_group + 1, ch_label,
+                                             field, value])
+    return failures
+
+
+def checker_check(table, files, use_numpy):
+    # LimitChecker 使用 datareader.columnar 中惰性导入的 NumPy
+    saved = columnar._numpy()
+    if not use_numpy:
+        columnar.np = None
+    try:
+        checker = LimitChecker(table, FIELDS, max_reported=sys.maxsize)
+        for filename, sections in files:
+            checker.add_file(filename, sections)
+        checker.finish()
+        return [row[:6] for row in list(checker.failure_rows())[1:]]
+    finally:
+        columnar.np = saved
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    millions = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    channels = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    files = make_files(int(millions * 1000000), channels)
+    readings = len(files) * len(SECTIONS) * GROUPS_PER_SECTION * channels * len(FIELDS)
+    table = make_table()
+    print("%d readings in %d file(s), %d channels, %d limits" % (readings, len(files), channels, len(table)))
+    loop_time, expected = timed(lambda: loop_check(table, files))
+    print("%-22s %7.3fs  %8.0f readings/s  %d out of limits" % ('per-reading loop', loop_time,
+                                                                  readings / loop_time, len(expected)))
+    variants = [('LimitChecker (Python)', False)]
+    if columnar._numpy() is not None:
+        variants.append(('LimitChecker (NumPy)', True))
+    for name, use_numpy in variants:
+        elapsed, failures = timed(lambda: checker_check(table, files, use_numpy))
+        print("%-22s %7.3fs  %8.0f readings/s  x%.2f  %s" % (name, elapsed, readings / elapsed, loop_time / elapsed,
+                                                            'identical' if failures == expected else 'MISMATCH'))
+
+
+if __name__ == '__main__':
+    main()
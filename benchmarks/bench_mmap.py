@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Benchmark mmap extraction (MappedSectionReader) against line-by-line text reads.
+
+Usage: python benchmarks/bench_mmap.py [size_mb] [target_share]
+"""
+import io
+import os
+import sys
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Dataread_MeasVAL
+import Datareader_ReadBack_statistic
+from datareader.mmap_reader import MappedSectionReader
+from loggen import write_sample_log
+from bench_scanner import best_of
+
+
+def text_read(parser_cls, path):
+    parser = parser_cls()
+    feed = parser.feed
+    with io.open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            feed(line)
+    return parser.close()
+
+
+def mapped_read(parser_cls, path, stop_early):
+    parser = parser_cls()
+    MappedSectionReader(parser.scanner).feed_file(path, parser, stop_early=stop_early)
+    return parser.close()
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    target_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.txt')
+        write_sample_log(path, size_mb, target_share=target_share)
+        print("Log: %.1f MB, target share %.0f%%" % (size_mb, target_share * 100))
+        for name, parser_cls in (('measval', Dataread_MeasVAL.MeasValParser),
+                                 ('readback', Datareader_ReadBack_statistic.ReadbackParser)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                text_time, text_result = best_of(lambda: text_read(parser_cls, path))
+                mmap_time, mmap_result = best_of(lambda: mapped_read(parser_cls, path, False))
+                early_time, _ = best_of(lambda: mapped_read(parser_cls, path, True))
+            same = 'identical' if text_result == mmap_result else 'MISMATCH'
+            print("%-9s text %7.3fs (%6.1f MB/s)  mmap %7.3fs (%6.1f MB/s) %s  mmap+stop_early %7.3fs"
+                  % (name, text_time, size_mb / text_time, mmap_time, size_mb / mmap_time, same, early_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the bulk Readback line conversion against the original per-channel loop.
+
+Usage: python benchmarks/bench_readback_parse.py [size_mb]
+
+For each channel count and line format, the 'Readback values' lines of a
+generated log are converted with the original loop (one try/except and
+'CH{}'.format per channel), with readback_parse.parse_group (the CH group
+dicts the scripts use) and with ReadbackColumns.add_lines (typed arrays).
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Datareader_ReadBack_statistic import CHANNEL_PATTERN
+from datareader.readback_parse import parse_group
+from datareader.columnar import ReadbackColumns
+from loggen import write_sample_log
+
+SCENARIOS = [(12, 'compact'), (24, 'compact'), (24, 'wide'), (24, 'stamped')]
+
+
+def legacy_groups(lines):
+    """原始 ReadbackParser.feed 中的逐通道转换"""
+    groups = []
+    for line_u in lines:
+        temp_channel_data = {}
+        for match in CHANNEL_PATTERN.findall(line_u):
+            try:
+                ch_num = int(match[0])
+                val = float(match[1])
+                ang = float(match[2])
+                dg = int(match[3])
+                oang = float(match[4])
+                temp_channel_data['CH{}'.format(ch_num)] = {'VAL': val, 'ANGLE': ang, 'DG': dg, 'OANG': oang}
+            except (ValueError, IndexError):
+                continue
+        if temp_channel_data:
+            groups.append(temp_channel_data)
+    return groups
+
+
+def bulk_groups(lines):
+    groups = []
+    for line_u in lines:
+        temp_channel_data = parse_group(CHANNEL_PATTERN, line_u)
+        if temp_channel_data:
+            groups.append(temp_channel_data)
+    return groups
+
+
+def bulk_columns(lines):
+    columns = ReadbackColumns()
+    columns.add_lines(columns.add_section(''), lines, CHANNEL_PATTERN)
+    return columns
+
+
+def best_of(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def readback_lines(size_mb, channels, readback_format):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.txt')
+        write_sample_log(path, size_mb, channels=channels, readback_format=readback_format)
+        with io.open(path, 'r', encoding='utf-8') as f:
+            return [line for line in f if 'Readback values' in line]
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for channels, readback_format in SCENARIOS:
+        lines = readback_lines(size_mb, channels, readback_format)
+        legacy_time, legacy_result = best_of(lambda: legacy_groups(lines))
+        dict_time, dict_result = best_of(lambda: bulk_groups(lines))
+        columns_time, columns_result = best_of(lambda: bulk_columns(lines))
+        same = dict_result == legacy_result and columns_result.to_sections() == \
+            ReadbackColumns.from_datasets(legacy_result).to_sections()
+        print("%2d ch %-8s %6d lines  legacy %6.3fs  parse_group %6.3fs x%.2f  add_lines %6.3fs x%.2f  %s"
+              % (channels, readback_format, len(lines), legacy_time, dict_time, legacy_time / dict_time,
+                 columns_time, legacy_time / columns_time, 'identical' if same else 'MISMATCH'))
+
+
+if __name__ == '__main__':
+    main()
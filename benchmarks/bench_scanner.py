@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the compiled SectionScanner parsers against the original per-line SECTION_PATTERNS loop.
+
+Usage: python benchmarks/bench_scanner.py [size_mb]
+"""
+import io
+import os
+import re
+import sys
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Dataread_MeasVAL
+import Datareader_ReadBack_statistic
+from loggen import write_sample_log
+
+
+def legacy_meas_loop(lines, target_sections):
+    """原始 Dataread_MeasVAL.extract_data 的逐行循环（仅保留解析部分）"""
+    section_patterns = [re.compile(p) for p in target_sections]
+    all_section_data = []
+    current_section = None
+    current_section_data = []
+    in_target_section = False
+    temp_channel_data = {}
+    for line_u in lines:
+        line_stripped = line_u.strip()
+        for i, pattern in enumerate(section_patterns):
+            if pattern.search(line_stripped):
+                if in_target_section and (current_section_data or temp_channel_data):
+                    if temp_channel_data:
+                        current_section_data.append(temp_channel_data)
+                        temp_channel_data = {}
+                    all_section_data.append({'section_name': current_section, 'data': current_section_data})
+                current_section = target_sections[i].replace(r'\s+', ' ').replace(r'\.', '.')
+                current_section_data = []
+                in_target_section = True
+                temp_channel_data = {}
+                break
+        if not in_target_section:
+            continue
+        if re.match(r'^\d+\.\d+(?:\.\d+)?\s', line_stripped):
+            if current_section_data or temp_channel_data:
+                if temp_channel_data:
+                    current_section_data.append(temp_channel_data)
+                    temp_channel_data = {}
+                all_section_data.append({'section_name': current_section, 'data': current_section_data})
+                current_section = None
+                current_section_data = []
+                in_target_section = False
+            continue
+        val_match = re.search(r'Meas VAL Check<<C>> CH(\d+):\s*([-\d.]+)', line_u)
+        if val_match:
+            ch_num = int(val_match.group(1))
+            try:
+                val = float(val_match.group(2))
+                if ch_num == 0 and temp_channel_data:
+                    current_section_data.append(temp_channel_data)
+                    temp_channel_data = {}
+                temp_channel_data['CH{}'.format(ch_num)] = {'VAL': val, 'ANGLE': None}
+            except (ValueError, IndexError):
+                pass
+            continue
+        angle_match = re.search(r'Meas ANGLE Check<<C>> CH(\d+):\s*([-\d.]+)', line_u)
+        if angle_match:
+            ch_num = int(angle_match.group(1))
+            try:
+                angle = float(angle_match.group(2))
+                ch_key = 'CH{}'.format(ch_num)
+                if ch_key in temp_channel_data:
+                    temp_channel_data[ch_key]['ANGLE'] = angle
+                else:
+                    temp_channel_data[ch_key] = {'VAL': None, 'ANGLE': angle}
+            except (ValueError, IndexError):
+                pass
+            continue
+    if in_target_section and (current_section_data or temp_channel_data):
+        if temp_channel_data:
+            current_section_data.append(temp_channel_data)
+        all_section_data.append({'section_name': current_section, 'data': current_section_data})
+    return all_section_data
+
+
+def legacy_readback_loop(lines, target_sections):
+    """原始 Datareader_ReadBack_statistic.extract_data 的逐行循环"""
+    section_patterns = [re.compile(p) for p in target_sections]
+    all_section_data = []
+    current_section = None
+    current_section_data = []
+    in_target_section = False
+    for line_u in lines:
+        line_stripped = line_u.strip()
+        for i, pattern in enumerate(section_patterns):
+            if pattern.search(line_stripped):
+                if in_target_section and current_section_data:
+                    all_section_data.append({'section_name': current_section, 'data': current_section_data})
+                current_section = target_sections[i].replace(r'\s+', ' ').replace(r'\.', '.')
+                current_section_data = []
+                in_target_section = True
+                break
+        if not in_target_section:
+            continue
+        if re.match(r'^\d+\.\d+(?:\.\d+)?\s', line_stripped):
+            if current_section_data:
+                all_section_data.append({'section_name': current_section, 'data': current_section_data})
+                current_section = None
+                current_section_data = []
+                in_target_section = False
+            continue
+        if "Readback values" in line_stripped and "ch:" in line_stripped:
+            temp_channel_data = {}
+            channel_matches = re.findall(
+                r'ch:\s*(\d+)\s+Val:\s*([-\d.]+)\s+Ang:\s*([-\d.]+)\s+DG:\s*(\d+)\s+OAng:\s*([-\d.]+)',
+                line_u)
+            for match in channel_matches:
+                try:
+                    temp_channel_data['CH{}'.format(int(match[0]))] = {
+                        'VAL': float(match[1]), 'ANGLE': float(match[2]),
+                        'DG': int(match[3]), 'OANG': float(match[4])}
+                except (ValueError, IndexError):
+                    continue
+            if temp_channel_data:
+                current_section_data.append(temp_channel_data)
+    if in_target_section and current_section_data:
+        all_section_data.append({'section_name': current_section, 'data': current_section_data})
+    return all_section_data
+
+
+def best_of(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def section_data_only(all_section_data):
+    """去掉解析时附带计算的统计结果（'stats'），只比较原始结构"""
+    return [{'section_name': s['section_name'], 'data': s['data']} for s in all_section_data]
+
+
+def run_parser(parser_cls, lines):
+    parser = parser_cls()
+    feed = parser.feed
+    for line in lines:
+        feed(line)
+    return parser.close()
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    target_sections = Dataread_MeasVAL.TARGET_SECTIONS
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.txt')
+        write_sample_log(path, size_mb)
+        with io.open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    print("Log: %.1f MB, %d lines" % (size_mb, len(lines)))
+
+    cases = [
+        ('measval', lambda: legacy_meas_loop(lines, target_sections),
+         lambda: run_parser(Dataread_MeasVAL.MeasValParser, lines)),
+        ('readback', lambda: legacy_readback_loop(lines, target_sections),
+         lambda: run_parser(Datareader_ReadBack_statistic.ReadbackParser, lines)),
+    ]
+    for name, legacy, scanner in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_time, legacy_result = best_of(legacy)
+            scanner_time, scanner_result = best_of(scanner)
+        same = 'identical' if legacy_result == section_data_only(scanner_result) else 'MISMATCH'
+        print("%-9s legacy %7.3fs (%9.0f lines/s)  scanner %7.3fs (%9.0f lines/s)  x%.2f  %s"
+              % (name, legacy_time, len(lines) / legacy_time, scanner_time, len(lines) / scanner_time,
+                 legacy_time / scanner_time, same))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Benchmark reads through the section index sidecar (datareader.section_index) against plain mmap reads.
+
+Usage: python benchmarks/bench_section_index.py [size_mb] [target_share]
+
+For each script the log is read without the index, once more building the
+index, and then with the saved index, first with the script's own
+TARGET_SECTIONS and then with a different selection (as when a section is
+added to the list and the logs are run again).
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Dataread_MeasVAL
+import Datareader_ReadBack_statistic
+from datareader.mmap_reader import MappedSectionReader
+from datareader.scanner import SectionScanner
+from datareader.section_index import index_path
+from loggen import write_sample_log
+from bench_scanner import best_of
+
+# 重新运行时换用的一组章节
+OTHER_SECTIONS = [r'8\.1\.6\s+P3Y\s+CTVT\s+Cali\s+1A', r'8\.4\s+60Hz\s+Verification2']
+
+
+def mapped_read(parser, path, section_index):
+    MappedSectionReader(parser.scanner, section_index=section_index).feed_file(path, parser, stop_early=False)
+    return parser.close()
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+    target_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.txt')
+        write_sample_log(path, size_mb, target_share=target_share)
+        print("Log: %.1f MB, target share %.0f%%" % (size_mb, target_share * 100))
+        for name, module, parser_cls in (('measval', Dataread_MeasVAL, Dataread_MeasVAL.MeasValParser),
+                                         ('readback', Datareader_ReadBack_statistic,
+                                          Datareader_ReadBack_statistic.ReadbackParser)):
+            other = SectionScanner(OTHER_SECTIONS, module.SCANNER.data_literals)
+            with contextlib.redirect_stdout(io.StringIO()):
+                plain_time, plain_result = best_of(lambda: mapped_read(parser_cls(), path, False))
+                if os.path.exists(index_path(path)):
+                    os.remove(index_path(path))
+                start = time.perf_counter()
+                build_result = mapped_read(parser_cls(), path, True)
+                build_time = time.perf_counter() - start
+                index_time, index_result = best_of(lambda: mapped_read(parser_cls(), path, True))
+                other_plain_time, other_plain = best_of(lambda: mapped_read(parser_cls(other), path, False))
+                other_time, other_result = best_of(lambda: mapped_read(parser_cls(other), path, True))
+            same = 'identical' if plain_result == build_result == index_result and other_plain == other_result \
+                else 'MISMATCH'
+            print("%-9s mmap %7.3fs  first read+index %7.3fs  indexed %7.3fs (x%.1f)  "
+                  "other sections: mmap %7.3fs  indexed %7.3fs (x%.1f)  %s"
+                  % (name, plain_time, build_time, index_time, plain_time / index_time,
+                     other_plain_time, other_time, other_plain_time / other_time, same))
+        print("Index size: %.1f KB" % (os.path.getsize(index_path(path)) / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Time quick single-file runs of python -m datareader against a startup budget.
+
+Usage: python benchmarks/bench_startup.py [budget_s] [size_mb]
+
+Each subcommand extracts one small generated log to csv and to xlsx in a
+fresh interpreter. The best wall time of a few runs is compared with the
+budget; the exit status is 1 when any run is over it. The csv runs also
+report whether openpyxl was imported (it should not be).
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loggen import write_sample_log
+
+REPEAT = 5
+
+# 在子进程中运行入口，退出时报告 openpyxl 是否被导入
+RUNNER = ("import sys, atexit, runpy; "
+          "atexit.register(lambda: sys.stderr.write('openpyxl=%d\\n' % ('openpyxl' in sys.modules))); "
+          "sys.argv = ['datareader'] + sys.argv[1:]; runpy.run_module('datareader', run_name='__main__')")
+
+
+def timed_run(args):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', RUNNER] + args, cwd=ROOT, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError("%s failed:\n%s" % (' '.join(args), proc.stderr))
+    return elapsed, 'openpyxl=1' in proc.stderr
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    size_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    over = 0
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'small.txt')
+        write_sample_log(path, size_mb, target_share=0.3)
+        print("Log: %.1f MB, budget %.2fs, best of %d" % (size_mb, budget, REPEAT))
+        for command in ('measval', 'readback'):
+            for output_format in ('csv', 'xlsx'):
+                output = os.path.join(tmpdir, '%s.%s' % (command, output_format))
+                args = [command, path, '-o', output, '--no-cache', '--no-metrics']
+                runs = [timed_run(args) for _ in range(REPEAT)]
+                best = min(elapsed for elapsed, _ in runs)
+                imported = runs[0][1]
+                status = 'ok' if best <= budget else 'OVER BUDGET'
+                if best > budget:
+                    over += 1
+                print("%-9s %-5s %7.3fs  openpyxl %-8s %s"
+                      % (command, output_format, best, 'imported' if imported else 'skipped', status))
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
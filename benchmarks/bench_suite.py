@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Stage and end-to-end benchmarks of both scripts on synthetic logs, with stored baselines.
+
+Usage: python benchmarks/bench_suite.py [--size 20] [--scenario NAME ...] [--repeat 3] [--stop-early]
+                                        [--baseline benchmarks/baseline.json] [--save-baseline]
+                                        [--tolerance 0.25]
+
+Each stage is timed (best of --repeat) and run once more under tracemalloc
+for its peak Python memory. Results are compared with the baseline file;
+stages slower or bigger than baseline * (1 + tolerance) are flagged and the
+exit status is 1.
+"""
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Dataread_MeasVAL
+import Datareader_ReadBack_statistic
+import Datareader_Combined
+from datareader.xlsx_stream import StreamingWorkbook
+from loggen import write_sample_log
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# 场景: 名称 -> write_sample_log 的参数（文件大小由 --size 决定）
+SCENARIOS = {
+    'default': {},
+    'channels24': {'channels': 24},
+    'targets50': {'target_share': 0.5},
+    'sections40': {'sections': 40},
+    'wide_readback': {'readback_format': 'wide'},
+    'stamped_readback': {'readback_format': 'stamped'},
+}
+
+
+def best_of(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(func):
+    """Peak traced Python memory (bytes) of one call."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def write_measval_sheet(data, tmpdir):
+    wb = StreamingWorkbook()
+    Dataread_MeasVAL.write_sheet_to_excel(wb.create_sheet(title='bench'), data)
+    wb.save(os.path.join(tmpdir, 'measval_sheet.xlsx'))
+
+
+def write_readback_sheet(sections, tmpdir):
+    wb = StreamingWorkbook()
+    ws = wb.create_sheet(title='bench')
+    for section_info in sections:
+        Datareader_ReadBack_statistic.write_sheet_to_excel(ws, section_info)
+    wb.save(os.path.join(tmpdir, 'readback_sheet.xlsx'))
+
+
+def build_stages(path, tmpdir):
+    """(stage name, callable) in run order; later stages reuse earlier extraction results."""
+    measval = Dataread_MeasVAL
+    readback = Datareader_ReadBack_statistic
+    measval_data = measval.extract_data(path)
+    readback_sections = readback.extract_data(path)
+    return [
+        ('measval.extract_data', lambda: measval.extract_data(path)),
+        ('measval.write_sheet', lambda: write_measval_sheet(measval_data, tmpdir)),
+        ('measval.end_to_end', lambda: measval.process_files(
+            [path], os.path.join(tmpdir, 'measval.xlsx'), workers=1, use_cache=False)),
+        ('readback.extract_data', lambda: readback.extract_data(path)),
+        ('readback.calculate_statistics', lambda: [readback.calculate_statistics(s['data'])
+                                                   for s in readback_sections]),
+        ('readback.write_sheet', lambda: write_readback_sheet(readback_sections, tmpdir)),
+        ('readback.end_to_end', lambda: readback.process_files(
+            [path], os.path.join(tmpdir, 'readback.xlsx'), workers=1, use_cache=False)),
+        ('combined.end_to_end', lambda: Datareader_Combined.process_files(
+            [path], tmpdir, workers=1, use_cache=False)),
+    ]
+
+
+def run_scenario(name, size_mb, repeat):
+    """Return {stage: {'seconds', 'lines_per_s', 'mb_per_s', 'peak_mb'}} for one scenario."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench_%s.txt' % name)
+        write_sample_log(path, size_mb, **SCENARIOS[name])
+        with open(path, 'rb') as f:
+            line_count = sum(block.count(b'\n') for block in iter(lambda: f.read(1024 * 1024), b''))
+        file_mb = os.path.getsize(path) / (1024.0 * 1024.0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stages = build_stages(path, tmpdir)
+            for stage, func in stages:
+                seconds, _ = best_of(func, repeat)
+                peak = peak_memory(func)
+                results[stage] = {
+                    'seconds': seconds,
+                    'lines_per_s': line_count / seconds if seconds else 0.0,
+                    'mb_per_s': file_mb / seconds if seconds else 0.0,
+                    'peak_mb': peak / (1024.0 * 1024.0),
+                }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of (scenario, stage, metric, baseline value, value) regressions."""
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, metrics in stages.items():
+            base = baseline.get(scenario, {}).get(stage)
+            if not base:
+                continue
+            for metric in ('seconds', 'peak_mb'):
+                if metrics[metric] > base[metric] * (1 + tolerance):
+                    regressions.append((scenario, stage, metric, base[metric], metrics[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark extraction, statistics and output stages.')
+    parser.add_argument('--size', type=float, default=20, help='log size in MB (default 20)')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run (repeatable, default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown/growth (default 0.25)')
+    parser.add_argument('--stop-early', action='store_true',
+                        help='stop reading once every target section was seen (MMAP_STOP_EARLY = True in all scripts)')
+    args = parser.parse_args()
+    if args.stop_early:
+        for module in (Dataread_MeasVAL, Datareader_ReadBack_statistic, Datareader_Combined):
+            module.MMAP_STOP_EARLY = True
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('size_mb') == args.size and bool(saved.get('stop_early')) == args.stop_early:
+            baseline = saved.get('results', {})
+        else:
+            print("Baseline '%s' was recorded with other settings (%s MB logs, stop_early %s); not comparing."
+                  % (args.baseline, saved.get('size_mb'), saved.get('stop_early')))
+
+    results = {}
+    for name in args.scenario or sorted(SCENARIOS):
+        results[name] = run_scenario(name, args.size, args.repeat)
+        print("\n[%s] %.1f MB log" % (name, args.size))
+        for stage, metrics in results[name].items():
+            base = baseline.get(name, {}).get(stage)
+            change = ' (%+.0f%%)' % ((metrics['seconds'] / base['seconds'] - 1) * 100) if base and base['seconds'] else ''
+            print("  %-30s %8.3fs%-8s %10.0f lines/s %7.1f MB/s  peak %7.1f MB"
+                  % (stage, metrics['seconds'], change, metrics['lines_per_s'], metrics['mb_per_s'],
+                     metrics['peak_mb']))
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions (tolerance %.0f%%):" % (args.tolerance * 100))
+        for scenario, stage, metric, base_value, value in regressions:
+            print("  REGRESSION %s %s %s: %.3f -> %.3f" % (scenario, stage, metric, base_value, value))
+
+    if args.save_baseline:
+        saved = {
+            'size_mb': args.size,
+            'stop_early': args.stop_early,
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'results': dict(baseline, **results),
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+        print("\nBaseline saved to '%s'." % args.baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Synthetic calibration-log generator for the benchmarks.
+
+Usage: python benchmarks/loggen.py out.txt [size_mb] [--target-share 0.1] [--channels 12]
+                                   [--sections 4] [--groups 20] [--readback-format compact]
+"""
+import io
+import random
+import argparse
+
+# 目标章节（与两个脚本的 TARGET_SECTIONS 对应）
+TARGET_TITLES = ['8.1.3 P3Y CTVT Cali 10A', '8.1.6 P3Y CTVT Cali 1A', '8.4 50Hz Verification2',
+                 '8.4 60Hz Verification1', '8.4 60Hz Verification2']
+# 原来固定使用的非目标章节
+DEFAULT_OTHER_TITLES = ['8.1.4 P3Y CTVT Cali 5A', '8.2 Relay Self Test', '8.3 Burn In', '9.1 Power Cycle']
+
+# Readback 行的格式：compact（单空格）、wide（多空格和制表符）、stamped（带时间戳和冒号）
+READBACK_FORMATS = {
+    'compact': (u'[INFO] Readback values ', u'ch: %d Val: %.4f Ang: %.3f DG: %d OAng: %.3f', u' '),
+    'wide': (u'[INFO]  Readback values\t', u'ch:  %d   Val:  %.4f\tAng: %.3f  DG: %d\tOAng:  %.3f', u'\t'),
+    'stamped': (u'2024-03-01 12:00:00.125 [RB] Readback values: ', u'ch:%d Val:%.4f Ang:%.3f DG:%d OAng:%.3f',
+                u' | '),
+}
+
+
+def other_titles(count):
+    """count 个非目标章节标题（count <= 4 时使用原来的固定标题）"""
+    if count <= len(DEFAULT_OTHER_TITLES):
+        return DEFAULT_OTHER_TITLES[:max(count, 1)]
+    return DEFAULT_OTHER_TITLES + ['8.%d.%d Aux Test %d' % (5 + i // 9, i % 9 + 1, i)
+                                   for i in range(count - len(DEFAULT_OTHER_TITLES))]
+
+
+def write_sample_log(path, size_mb, target_share=0.1, channels=12, seed=0, sections=4, groups=20,
+                     readback_format='compact'):
+    """写入一个大约 size_mb 大小的模拟校准日志
+
+    target_share 为目标章节所占比例，sections 为非目标 8.x 章节标题的数量，
+    groups 为每个章节中的数据组数，readback_format 为 READBACK_FORMATS 中的一种。
+    """
+    rng = random.Random(seed)
+    others = other_titles(sections)
+    prefix, channel_format, separator = READBACK_FORMATS[readback_format]
+    limit = int(size_mb * 1024 * 1024)
+    with io.open(path, 'w', encoding='utf-8') as f:
+        while f.tell() < limit:
+            title = rng.choice(TARGET_TITLES) if rng.random() < target_share else rng.choice(others)
+            f.write(u'%s\n' % title)
+            for _ in range(groups):
+                for ch in range(channels):
+                    f.write(u'[INFO] Meas VAL Check<<C>> CH%d: %.5f V\n' % (ch, rng.uniform(50, 60)))
+                    f.write(u'[INFO] Meas ANGLE Check<<C>> CH%d: %.3f deg\n' % (ch, rng.uniform(-1, 1)))
+                f.write(prefix + separator.join(
+                    channel_format
+                    % (ch, rng.uniform(50, 60), rng.uniform(-1, 1), rng.randint(0, 3), rng.uniform(-1, 1))
+                    for ch in range(channels)) + u'\n')
+                f.write(u'[DEBUG] relay state 0x3F temperature 41.25 C\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic calibration log.')
+    parser.add_argument('path')
+    parser.add_argument('size_mb', nargs='?', type=float, default=20)
+    parser.add_argument('--target-share', type=float, default=0.1)
+    parser.add_argument('--channels', type=int, default=12)
+    parser.add_argument('--sections', type=int, default=4, help='number of non-target section titles')
+    parser.add_argument('--groups', type=int, default=20, help='data groups per section')
+    parser.add_argument('--readback-format', choices=sorted(READBACK_FORMATS), default='compact')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_sample_log(args.path, args.size_mb, target_share=args.target_share, channels=args.channels,
+                     seed=args.seed, sections=args.sections, groups=args.groups,
+                     readback_format=args.readback_format)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Shared helpers for the Meas VAL/ANGLE and Readback data extractor scripts."""
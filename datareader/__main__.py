@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""python -m datareader measval|readback|combined|serve [inputs...] (see datareader.app)"""
+import sys
+
+from datareader.app import main
+
+sys.exit(main())
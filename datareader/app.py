@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Entry point and interactive helpers shared by the extractor scripts.
+
+python -m datareader measval|readback|combined [inputs...] runs one
+extractor; without inputs it starts that extractor's folder prompt.
+python -m datareader serve starts the query service (datareader.service).
+The module of a subcommand (and through it every output backend) is
+imported only once the subcommand is chosen.
+"""
+import os
+import sys
+import importlib
+
+from datareader.archive import list_sources
+from datareader.discover import SourceStream
+
+# 子命令 -> 模块（选定子命令后才导入）
+SUBCOMMANDS = {
+    'measval': 'Dataread_MeasVAL',
+    'readback': 'Datareader_ReadBack_statistic',
+    'combined': 'Datareader_Combined',
+    'serve': 'datareader.service',
+}
+
+USAGE = """usage: python -m datareader {measval,readback,combined,serve} [inputs ...] [options]
+
+  measval    Meas VAL/ANGLE data of the target sections
+  readback   Readback VAL/ANGLE/DG/OANG data and statistics
+  combined   both, reading every log once
+  serve      local HTTP/JSON query service over the extracted data
+
+Run a subcommand with -h for its options, or without inputs for the folder prompt."""
+
+
+def sanitize_sheet_name(name, max_len=31):
+    """Excel sheet names have limitations. Sanitize the filename for use as a sheet name.
+
+    A name with folders ('2026-07-15/ST01/log_001') that is too long loses
+    its leading folders first, so the end naming the log is kept.
+    """
+    # 带相对路径的名称过长时，从前面逐级去掉文件夹
+    while len(name) > max_len and '/' in name:
+        name = name.split('/', 1)[1]
+    # 移除或替换非法字符: \ / ? * [ ]
+    illegal_chars = r'\/?*[]:'
+    for char in illegal_chars:
+        name = name.replace(char, '_')
+    # 限制长度 (Excel 限制为 31 个字符)
+    if len(name) > max_len:
+        name = name[:max_len]
+    # 移除首尾空格
+    name = name.strip()
+    # 确保名称不为空
+    if not name:
+        name = "Sheet"
+    return name
+
+
+def get_input(prompt):
+    """Safe input function for Python 3"""
+    try:
+        # Python 3 的 input() 返回字符串，无需 decode
+        return input(prompt).strip()
+    except (EOFError, KeyboardInterrupt):
+        # 处理 Ctrl+C 或意外的 EOF
+        print("\nOperation cancelled by user.")
+        return 'quit'
+
+
+def prompt_loop(process_folder, watch_folder=None, new_walker=None):
+    """交互模式：反复询问文件夹路径，调用 process_folder(日志列表, 文件夹) 处理其中的日志，输入 quit 退出
+
+    watch_folder 不为 None 时支持 "watch <文件夹>" 跟踪模式（按 Ctrl+C 返回）。
+    new_walker() 返回 SourceWalker 时用它在后台查找日志（可递归），日志列表为边查找边产生的 SourceStream；
+    返回 None 时只列出文件夹本身的日志。
+    """
+    while True:
+        folder_path = get_input("Enter folder path containing .txt files (or 'quit' to exit): ")
+
+        if folder_path.lower() in ('quit', 'exit', 'q'):
+            print("Goodbye!")
+            break
+
+        if not folder_path:
+            print("Please enter a folder path, or 'quit' to exit.\n")
+            continue
+
+        # "watch <文件夹>" 进入跟踪模式，按 Ctrl+C 返回
+        if watch_folder is not None and folder_path.lower().startswith('watch '):
+            watch_path = folder_path[6:].strip()
+            if not os.path.isdir(watch_path):
+                print("Error: Path is not a directory or does not exist: %s\n" % watch_path)
+            else:
+                watch_folder(watch_path)
+            continue
+
+        if not os.path.isdir(folder_path):
+            print("Error: Path is not a directory or does not exist: %s\n" % folder_path)
+            continue
+
+        # 查找文件夹下所有日志（.txt、.txt.gz/.txt.xz 以及 zip 包中的 .txt）
+        walker = new_walker() if new_walker is not None else None
+        if walker is not None:
+            filepaths = SourceStream(walker.walk(folder_path))
+            if filepaths.first is None:
+                print("No .txt files found under directory: %s\n" % folder_path)
+                continue
+            print("\nSearching '%s', extracting logs as they are found...\n" % folder_path)
+            process_folder(filepaths, folder_path)
+            print("  %s" % walker.format())
+            continue
+
+        filepaths = list_sources(folder_path)
+
+        if not filepaths:
+            print("No .txt files found in directory: %s\n" % folder_path)
+            continue
+
+        print("\nFound %d .txt file(s) in '%s'. Starting processing...\n" % (len(filepaths), folder_path))
+
+        process_folder(filepaths, folder_path)
+
+
+def main(argv=None):
+    """python -m datareader <子命令> [参数...]：导入对应的提取脚本并运行其 main()"""
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in SUBCOMMANDS:
+        print(USAGE)
+        if argv and argv[0] in ('-h', '--help'):
+            return 0
+        if argv:
+            print("\nUnknown command: %s" % argv[0])
+        return 2
+    command = argv[0]
+    module = importlib.import_module(SUBCOMMANDS[command])
+    # 让子命令的 --help 和错误信息显示 "datareader <子命令>"
+    sys.argv[0] = 'datareader %s' % command
+    return module.main(argv[1:])
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Log sources: plain .txt files, .txt.gz/.txt.xz files and .txt members of zip bundles.
+
+A source is a plain string so it can be passed to worker processes and used
+as a cache key: a file path, or 'bundle.zip::dir/log.txt' for a zip member.
+Compressed files and zip members are decompressed as a stream while they are
+parsed; nothing is extracted to disk.
+"""
+import io
+import os
+import gzip
+import lzma
+import zipfile
+import contextlib
+
+from datareader.prefetch import take_prefetched
+
+# zip 包路径与包内文件名之间的分隔符
+MEMBER_SEP = '::'
+
+# 压缩后缀 -> 打开方式
+_COMPRESSED = {'.gz': gzip.open, '.xz': lzma.open}
+
+
+def split_source(source):
+    """'bundle.zip::log.txt' -> ('bundle.zip', 'log.txt'); a file path -> (path, None)."""
+    if MEMBER_SEP in source:
+        container, member = source.split(MEMBER_SEP, 1)
+        return container, member
+    return source, None
+
+
+def container_path(source):
+    """The file on disk holding the source (the zip for a member)."""
+    return split_source(source)[0]
+
+
+def is_plain_file(source):
+    """True for uncompressed files on disk (these can be memory-mapped)."""
+    container, member = split_source(source)
+    return member is None and os.path.splitext(container)[1].lower() not in _COMPRESSED
+
+
+def is_log_name(name):
+    """.txt, .txt.gz and .txt.xz names."""
+    name = name.lower()
+    root, ext = os.path.splitext(name)
+    if ext in _COMPRESSED:
+        name = root
+    return name.endswith('.txt')
+
+
+def source_name(source, root=None):
+    """Name used for sheets and the Source_File column: the log name without compression suffix.
+
+    With root (the folder the source was found under), the name is prefixed
+    with the folder path relative to root ('2026-07-15/ST01/log.txt'), so
+    logs of the same name in different folders stay apart.
+    """
+    container, member = split_source(source)
+    name = os.path.basename(member if member is not None else container)
+    base, ext = os.path.splitext(name)
+    if ext.lower() in _COMPRESSED:
+        name = base
+    if root is not None:
+        folder = os.path.relpath(os.path.dirname(os.path.abspath(container)), os.path.abspath(root))
+        if folder != os.curdir:
+            name = '%s/%s' % (folder.replace(os.sep, '/'), name)
+    return name
+
+
+def source_exists(source):
+    container, member = split_source(source)
+    if not os.path.isfile(container):
+        return False
+    if member is None:
+        return True
+    try:
+        with zipfile.ZipFile(container) as zf:
+            zf.getinfo(member)
+    except (KeyError, zipfile.BadZipFile):
+        return False
+    return True
+
+
+def source_size(source):
+    """Stored size of the source in bytes (compressed size for archives)."""
+    container, member = split_source(source)
+    if member is None:
+        return os.path.getsize(container)
+    with zipfile.ZipFile(container) as zf:
+        return zf.getinfo(member).compress_size
+
+
+def zip_members(zip_path):
+    """Sources for the .txt members of a zip bundle, sorted by member name."""
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            names = [info.filename for info in zf.infolist()
+                     if not info.is_dir() and info.filename.lower().endswith('.txt')]
+    except zipfile.BadZipFile as e:
+        print("  Warning: Skipping unreadable zip '%s': %s" % (zip_path, str(e)))
+        return []
+    return [zip_path + MEMBER_SEP + name for name in sorted(names)]
+
+
+def expand_file(filepath):
+    """Sources in one file: the file itself for logs, its .txt members for zip bundles."""
+    if filepath.lower().endswith('.zip'):
+        return zip_members(filepath)
+    if is_log_name(filepath):
+        return [filepath]
+    return []
+
+
+def list_sources(folder_path):
+    """Sorted sources directly inside folder_path (logs, compressed logs and zip members).
+
+    The entry types come from the directory listing (os.scandir), so only
+    zip bundles are opened and no file is stat'ed.
+    """
+    with os.scandir(folder_path) as it:
+        names = sorted(entry.name for entry in it if entry.is_file())
+    sources = []
+    for name in names:
+        sources.extend(expand_file(os.path.join(folder_path, name)))
+    return sources
+
+
+@contextlib.contextmanager
+def open_text(source, encoding='utf-8', data=None):
+    """Open any source as a text stream (universal newlines, like open(path, 'r')).
+
+    data is the file's content when it is already in memory (prefetched).
+    """
+    with _open_stream(source, encoding, data) as (f, _):
+        yield f
+
+
+@contextlib.contextmanager
+def _open_stream(source, encoding='utf-8', data=None):
+    """open_text that also yields a function returning the stored bytes read so far.
+
+    The count is taken from the position in the file on disk (the zip for a
+    member), so a read that stops early reports less than source_size().
+    """
+    container, member = split_source(source)
+    if member is not None and data is None:
+        with open(container, 'rb') as raw, zipfile.ZipFile(raw) as zf:
+            info = zf.getinfo(member)
+            with zf.open(info) as stream:
+                # 打开成员后文件位置就在压缩数据的开头
+                start = raw.tell()
+                yield (io.TextIOWrapper(stream, encoding=encoding),
+                       lambda: min(raw.tell() - start, info.compress_size))
+        return
+    raw = io.BytesIO(data) if data is not None else open(container, 'rb')
+    with raw:
+        opener = _COMPRESSED.get(os.path.splitext(container)[1].lower())
+        if opener is not None:
+            with opener(raw, 'rt', encoding=encoding) as f:
+                yield f, raw.tell
+        else:
+            yield io.TextIOWrapper(raw, encoding=encoding), raw.tell
+
+
+def feed_source(source, parser, reader=None, stop_early=False):
+    """Feed source to parser and return the number of bytes scanned.
+
+    Plain files go through reader (a MappedSectionReader) when one is given;
+    compressed files and zip members are streamed line by line. With
+    stop_early both stop once every target section has been seen and the
+    parser has left the last one, so the results do not depend on the format.
+    A file prefetched by datareader.prefetch is parsed from memory the same way.
+    """
+    with take_prefetched(source) as data:
+        return _feed(source, parser, reader, stop_early, data)
+
+
+def _feed(source, parser, reader, stop_early, data):
+    if reader is not None and is_plain_file(source):
+        before = reader.bytes_scanned
+        reader.feed_file(source, parser, stop_early=stop_early, data=data)
+        return reader.bytes_scanned - before
+    feed = parser.feed
+    # 与 mmap 读取保持一致：只有在 USE_MMAP（传入 reader）时才提前停止
+    stop_early = stop_early and reader is not None
+    seen_sections = set()
+    all_sections = set(parser.scanner.titles)
+    with _open_stream(source, data=data) as (f, bytes_read):
+        for line in f:
+            feed(line)
+            if parser.in_target_section:
+                seen_sections.add(parser.current_section)
+            elif stop_early and seen_sections >= all_sections:
+                break
+        return bytes_read()
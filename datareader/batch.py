@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""Process-pool batch mode for running extract_data over a folder."""
+import os
+import time
+import itertools
+import collections
+import multiprocessing
+
+from datareader.prefetch import reading_ahead
+
+# 文件数少于该值时直接串行处理（进程池的启动开销不划算）
+PARALLEL_MIN_FILES = 8
+
+# 并行时每个工作进程排队的文件数（路径边取边提交，不需要事先知道文件总数）
+PARALLEL_QUEUE_DEPTH = 4
+
+
+def _timed_call(job):
+    """Run one job in a worker and return (result, seconds spent)."""
+    func, filepath = job
+    start = time.perf_counter()
+    result = func(filepath)
+    return result, time.perf_counter() - start
+
+
+class BatchReport(object):
+    """Timing summary of one batch run."""
+
+    def __init__(self, mode='serial', workers=1, file_count=0, wall_time=0.0, busy_time=0.0, caller_time=0.0):
+        self.mode = mode
+        self.workers = workers
+        self.file_count = file_count
+        # 从取第一个路径到最后一个结果处理完的时间（含调用方写 sheet 的时间，工作进程此时仍在提取）
+        self.wall_time = wall_time
+        # 各文件 extract_data 耗时之和
+        self.busy_time = busy_time
+        # 调用方处理结果（写 sheet 等）的时间
+        self.caller_time = caller_time
+        # 串行提取时的预读统计（datareader.prefetch.ReadAhead，未预读时为 None）
+        self.prefetch = None
+
+    @property
+    def serial_estimate(self):
+        """Time a serial run would take: every extraction plus the caller's work, one after another."""
+        return self.busy_time + self.caller_time
+
+    @property
+    def speedup(self):
+        if self.wall_time <= 0:
+            return 1.0
+        return self.serial_estimate / self.wall_time
+
+    def as_dict(self):
+        return {'mode': self.mode, 'workers': self.workers, 'file_count': self.file_count,
+                'wall_time': self.wall_time, 'busy_time': self.busy_time, 'caller_time': self.caller_time,
+                'serial_estimate': self.serial_estimate, 'speedup': self.speedup,
+                'prefetch': self.prefetch.as_dict() if self.prefetch is not None else None}
+
+    def format(self):
+        text = ("Batch: %d file(s) in %s mode with %d worker(s), wall %.2fs (extract %.2fs, write %.2fs), "
+                "serial estimate %.2fs, speedup x%.2f"
+                % (self.file_count, self.mode, self.workers, self.wall_time, self.busy_time,
+                   self.caller_time, self.serial_estimate, self.speedup))
+        if self.prefetch is not None:
+            text += "\n  " + self.prefetch.format()
+        return text
+
+
+def resolve_workers(workers=None):
+    """Return the worker count to use (None or <= 0 means all CPU cores)."""
+    if not workers or workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def _iter_serial(func, filepaths, report):
+    for filepath in filepaths:
+        result, elapsed = _timed_call((func, filepath))
+        report.busy_time += elapsed
+        report.file_count += 1
+        yield result
+
+
+def _iter_timed(results, report):
+    """Yield results, setting report.wall_time (first path to last result) and report.caller_time."""
+    start = time.perf_counter()
+    try:
+        for result in results:
+            resumed = time.perf_counter()
+            yield result
+            report.caller_time += time.perf_counter() - resumed
+    finally:
+        report.wall_time = time.perf_counter() - start
+
+
+def iter_batch(func, filepaths, workers=None, min_parallel=PARALLEL_MIN_FILES, report=None, read_ahead=None):
+    """Yield func(filepath) for every file in input order, filling report as it goes.
+
+    func must be a module-level function so it can be sent to worker processes.
+    filepaths can be a list or an iterator whose paths are still being found
+    (datareader.discover.SourceStream); paths are taken from it only as
+    they are dispatched, so extraction starts with the first ones.
+    Small folders, or a single worker, fall back to the serial path. Results
+    are yielded one at a time so the caller never holds the whole folder.
+    On the serial path, read_ahead(filepaths) (e.g. a partial of
+    datareader.prefetch.ReadAhead) fetches the next files while one is parsed
+    (not for a single file); worker processes already overlap their reads.
+    report.wall_time runs from the first path to the last result and
+    includes the time the caller spends on each result while the workers
+    carry on; that time is also kept as report.caller_time.
+    """
+    if report is None:
+        report = BatchReport()
+    return _iter_timed(_iter_batch(func, filepaths, workers, min_parallel, report, read_ahead), report)
+
+
+def _iter_batch(func, filepaths, workers, min_parallel, report, read_ahead):
+    workers = resolve_workers(workers)
+    # 先取出 min_parallel 个路径决定串行还是并行；取不满时路径已全部给出
+    filepaths = iter(filepaths)
+    head = list(itertools.islice(filepaths, max(min_parallel, 2)))
+    complete = len(head) < max(min_parallel, 2)
+    if complete:
+        workers = min(workers, max(len(head), 1))
+    filepaths = itertools.chain(head, filepaths)
+
+    if workers <= 1 or (complete and len(head) < min_parallel):
+        report.mode, report.workers = 'serial', 1
+        # 只有一个文件时没有可以与解析重叠的读取，不启动预读线程
+        if read_ahead is None or (complete and len(head) < 2):
+            for result in _iter_serial(func, filepaths, report):
+                yield result
+            return
+        filepaths, ahead = itertools.tee(filepaths)
+        report.prefetch = read_ahead(ahead)
+        with reading_ahead(report.prefetch):
+            for result in _iter_serial(func, filepaths, report):
+                yield result
+        return
+
+    report.mode, report.workers = 'parallel', workers
+    # 路径在主进程中逐个取出并提交，最多 workers * PARALLEL_QUEUE_DEPTH 个文件在处理中；
+    # 按提交顺序取回结果，写入工作簿时顺序确定
+    pool = multiprocessing.Pool(processes=workers)
+    in_flight = collections.deque()
+    try:
+        for filepath in filepaths:
+            in_flight.append(pool.apply_async(_timed_call, ((func, filepath),)))
+            if len(in_flight) >= workers * PARALLEL_QUEUE_DEPTH:
+                yield _collect(in_flight.popleft(), report)
+        while in_flight:
+            yield _collect(in_flight.popleft(), report)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def _collect(async_result, report):
+    result, elapsed = async_result.get()
+    report.busy_time += elapsed
+    report.file_count += 1
+    return result
+
+
+def iter_paired(keys, results):
+    """zip(keys, results) that runs results on to StopIteration once keys are used up.
+
+    zip() stops at the end of keys without asking results for more, which
+    leaves the generators under it suspended after their last yield. Driving
+    results to its end lets every layer finish normally, so iter_batch
+    closes and joins its pool (or shuts down its read-ahead) right after the
+    last file instead of when the generators are garbage collected.
+    """
+    results = iter(results)
+    for key, result in zip(keys, results):
+        yield key, result
+    for _ in results:
+        pass
+
+
+def run_batch(func, filepaths, workers=None, min_parallel=PARALLEL_MIN_FILES):
+    """Apply func to every file and return (results in input order, BatchReport)."""
+    report = BatchReport()
+    results = list(iter_batch(func, filepaths, workers, min_parallel, report))
+    return results, report
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Persistent on-disk cache of extract_data results keyed on file fingerprint."""
+import os
+import json
+import time
+import sqlite3
+import zipfile
+import hashlib
+import collections
+
+from datareader.archive import container_path, split_source
+
+# 超过该天数未被使用的缓存条目会被清除
+CACHE_MAX_AGE_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extract_cache (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    data TEXT NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+def make_signature(*parts):
+    """Hash the configuration (target sections, patterns, options) that shapes the results."""
+    sha = hashlib.sha1()
+    for part in parts:
+        sha.update(repr(part).encode('utf-8'))
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def file_digest(filepath, block_size=1024 * 1024):
+    """SHA-1 of the file content."""
+    sha = hashlib.sha1()
+    with open(container_path(filepath), 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class ExtractionCache(object):
+    """SQLite-backed cache mapping a log file to its parsed section data.
+
+    An entry is valid when the signature matches and either size and mtime
+    are unchanged, or the size is unchanged and the content hash still
+    matches (e.g. the file was only touched or copied).
+
+    A zip member is fingerprinted by its uncompressed size and CRC-32 from
+    the zip directory, with the zip's mtime: members are not re-read, and
+    changing one member of a bundle does not invalidate the others. The
+    directory of each zip is read once per run (again if the zip changes).
+    """
+
+    def __init__(self, db_path, signature):
+        self.db_path = db_path
+        self.signature = signature
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        # is_fresh() 为过期文件在提取之前记下的 (size, mtime_ns, digest)，由 store() 取用
+        self._pending = {}
+        # zip 包路径 -> (mtime_ns, {成员名: (解压后大小, CRC-32)})
+        self._zip_entries = {}
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute(_SCHEMA)
+
+    def _key(self, filepath):
+        return os.path.abspath(filepath)
+
+    def _zip_entry(self, container, mtime_ns, member):
+        entries = self._zip_entries.get(container)
+        if entries is None or entries[0] != mtime_ns:
+            with zipfile.ZipFile(container) as zf:
+                entries = self._zip_entries[container] = (
+                    mtime_ns, dict((info.filename, (info.file_size, info.CRC)) for info in zf.infolist()))
+        return entries[1][member]
+
+    def _stat(self, filepath):
+        """(size, mtime_ns) of filepath (member size and zip mtime for a zip member)."""
+        container, member = split_source(filepath)
+        st = os.stat(container)
+        if member is None:
+            return st.st_size, st.st_mtime_ns
+        return self._zip_entry(container, st.st_mtime_ns, member)[0], st.st_mtime_ns
+
+    def _digest(self, filepath, mtime_ns):
+        """Content hash of filepath: SHA-1 of a file, the CRC-32 from the zip directory for a member."""
+        container, member = split_source(filepath)
+        if member is None:
+            return file_digest(filepath)
+        return 'crc32:%08x' % self._zip_entry(container, mtime_ns, member)[1]
+
+    def is_fresh(self, filepath):
+        """Check (and count) whether filepath can be served from the cache.
+
+        For a stale file the fingerprint is taken here, before it is
+        extracted, and kept for store(): a file that changes while it is
+        being parsed is then stored under its old fingerprint and parsed
+        again on the next run.
+        """
+        key = self._key(filepath)
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, digest, signature FROM extract_cache WHERE path = ?",
+            (key,)).fetchone()
+        size, mtime_ns = self._stat(filepath)
+        digest = None
+        fresh = False
+        if row is not None and row[3] == self.signature:
+            if size == row[0] and mtime_ns == row[1]:
+                fresh = True
+            elif size == row[0]:
+                digest = self._digest(filepath, mtime_ns)
+                if digest == row[2]:
+                    # 内容未变（只是 mtime 变了），更新 mtime 以便下次走快速路径
+                    self._conn.execute("UPDATE extract_cache SET mtime_ns = ? WHERE path = ?",
+                                       (mtime_ns, key))
+                    fresh = True
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if digest is None:
+                digest = self._digest(filepath, mtime_ns)
+            self._pending[key] = (size, mtime_ns, digest)
+        return fresh
+
+    def load(self, filepath):
+        """Return the cached data for filepath (call is_fresh() first)."""
+        key = self._key(filepath)
+        row = self._conn.execute("SELECT data FROM extract_cache WHERE path = ?", (key,)).fetchone()
+        self._conn.execute("UPDATE extract_cache SET last_used = ? WHERE path = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def store(self, filepath, data):
+        """Save freshly extracted data for filepath under the fingerprint is_fresh() took."""
+        key = self._key(filepath)
+        fingerprint = self._pending.pop(key, None)
+        if fingerprint is None:
+            size, mtime_ns = self._stat(filepath)
+            fingerprint = (size, mtime_ns, self._digest(filepath, mtime_ns))
+        size, mtime_ns, digest = fingerprint
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extract_cache "
+            "(path, size, mtime_ns, digest, signature, data, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, size, mtime_ns, digest, self.signature, json.dumps(data), time.time()))
+
+    def evict(self, max_age_days=CACHE_MAX_AGE_DAYS):
+        """Drop entries for deleted files, other signatures or not used for max_age_days."""
+        cutoff = time.time() - max_age_days * 86400
+        stale = []
+        for path, signature, last_used in self._conn.execute(
+                "SELECT path, signature, last_used FROM extract_cache"):
+            if signature != self.signature or last_used < cutoff or not os.path.isfile(container_path(path)):
+                stale.append((path,))
+        self._conn.executemany("DELETE FROM extract_cache WHERE path = ?", stale)
+        self.evicted += len(stale)
+        return len(stale)
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evicted': self.evicted}
+
+    def format(self):
+        return "Cache: %d hit(s), %d miss(es), %d stale entr%s evicted" % (
+            self.hits, self.misses, self.evicted, 'y' if self.evicted == 1 else 'ies')
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+def iter_cached(func, filepaths, cache, batch_iter):
+    """Yield results for filepaths in order, serving fresh files from cache.
+
+    Only the stale or new files are passed to batch_iter(func, paths), which is
+    normally datareader.batch.iter_batch with the caller's worker settings.
+    filepaths may be an iterator that is still growing: each path is checked
+    when it is reached, either by this generator or by batch_iter asking for
+    the next stale path, so cached files are served while the rest is found.
+    """
+    filepaths = iter(filepaths)
+    # 已检查、尚未返回的路径（按顺序）：(路径, 是否新鲜)；以及尚未交给 batch_iter 的过期路径
+    checked = collections.deque()
+    stale = collections.deque()
+
+    def advance():
+        # 检查下一个路径；没有更多路径时返回 False
+        for filepath in filepaths:
+            fresh = cache.is_fresh(filepath)
+            checked.append((filepath, fresh))
+            if not fresh:
+                stale.append(filepath)
+            return True
+        return False
+
+    def stale_paths():
+        while stale or advance():
+            if stale:
+                yield stale.popleft()
+
+    results = batch_iter(func, stale_paths())
+    while checked or advance():
+        filepath, fresh = checked.popleft()
+        if fresh:
+            data = cache.load(filepath)
+        else:
+            data = next(results)
+            cache.store(filepath, data)
+        yield data
+    # 所有过期路径都已交出：继续迭代到结束，使 batch_iter 正常关闭进程池和预读线程
+    for _ in results:
+        pass
+
+
+def open_cache(db_path, signature):
+    """Open the cache, or return None (with a warning) if the folder is not writable."""
+    try:
+        return ExtractionCache(db_path, signature)
+    except sqlite3.Error as e:
+        print("  Warning: Extraction cache disabled (%s): %s" % (db_path, str(e)))
+        return None
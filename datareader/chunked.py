@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Parse one large log on several processes, split into chunks at target section headers.
+
+A target section header resets the parser whatever its state before: the
+open section is saved (together with an unfinished CH group in
+temp_channel_data) and a new one starts. Closing a parser at the end of a
+chunk saves the open section in exactly the same way. So when every chunk
+starts at a header line, each chunk is parsed by a fresh parser and the
+section lists are concatenated in file order; no CH group spans a chunk
+edge. Plain numbered boundaries ('8.1.4 ...') are not used as split points,
+because a target section that has no data yet continues across them.
+
+With stop_early, each chunk records where its parser left a target section
+and which sections it had seen by then. The results are cut at the first such
+point where every target section has been seen, as in the serial read.
+
+With section_index, the header offsets from the log's sidecar index
+(datareader.section_index) are used for the split points and handed to the
+chunks, so neither the parent nor the workers search the bytes for headers.
+"""
+import os
+import mmap
+import collections
+import multiprocessing
+
+from datareader.archive import is_plain_file
+from datareader.batch import resolve_workers
+from datareader.mmap_reader import MappedSectionReader
+from datareader.section_index import offsets_between
+
+# 拆分后每块的目标大小
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _parsers(parser):
+    """The single parsers inside parser (a CombinedParser holds several)."""
+    return getattr(parser, 'parsers', [parser])
+
+
+def new_reader(parser, section_index=False):
+    """The MappedSectionReader the scripts use for parser."""
+    return MappedSectionReader(parser.scanner, data_literal_sets=getattr(parser, 'data_literal_sets', None),
+                               section_index=section_index)
+
+
+def use_chunks(source, min_bytes, workers=None):
+    """True if source is a plain file of at least min_bytes and this process may start a pool of workers."""
+    if min_bytes <= 0 or resolve_workers(workers) <= 1 or not is_plain_file(source):
+        return False
+    # 批处理的工作进程（守护进程）中不能再创建进程池
+    if multiprocessing.current_process().daemon:
+        return False
+    return os.path.getsize(source) >= min_bytes
+
+
+def split_points(mm, parser, chunk_bytes=CHUNK_BYTES, headers=None):
+    """Start offsets of the chunks: 0, then the first header line after every chunk_bytes.
+
+    A split line must start a target section for every parser inside parser,
+    otherwise a parser whose targets it does not match would carry its state
+    across the split. headers are the target header offsets from the section
+    index, if any.
+    """
+    reader = new_reader(parser)
+    scanners = [p.scanner for p in _parsers(parser)]
+    encoding = reader.encoding
+    size = len(mm)
+    points = [0]
+    pos = mm.find(b'\n', chunk_bytes) + 1 if chunk_bytes < size else 0
+    while pos > 0:
+        line_start = reader._next_header(mm, pos, headers=headers)
+        if line_start < 0:
+            break
+        line_end = mm.find(b'\n', line_start) + 1 or size
+        line_stripped = mm[line_start:line_end].decode(encoding).strip()
+        if all(scanner.match_section(line_stripped) is not None for scanner in scanners):
+            points.append(line_start)
+            pos = mm.find(b'\n', line_start + chunk_bytes) + 1 if line_start + chunk_bytes < size else 0
+        else:
+            pos = line_end if line_end < size else 0
+    return points
+
+
+def _parse_chunk(job):
+    """Worker: parse bytes start..end of filepath with a fresh parser.
+
+    Returns (closed result, sections seen, [(offset, sections seen, section counts) at each
+    section exit], (lines fed, data lines, statistics seconds)).
+    """
+    new_parser, filepath, start, end, record_leaves, headers = job
+    parser = new_parser()
+    reader = new_reader(parser)
+    leaves = []
+
+    def on_leave(pos, seen_sections):
+        leaves.append((pos, frozenset(seen_sections), [len(p.all_section_data) for p in _parsers(parser)]))
+
+    with open(filepath, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            seen_sections = reader.feed_buffer(mm, parser, stop_early=False, start=start, end=end,
+                                               on_leave=on_leave if record_leaves else None, headers=headers)
+        finally:
+            mm.close()
+    result = parser.close()
+    return result, seen_sections, leaves, (parser.lines_fed, parser.data_lines, getattr(parser, 'stats_time', 0.0))
+
+
+class ChunkedRun(object):
+    """Counters of a chunked parse; stands in for the parser in datareader.metrics.record_extract."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.lines_fed = 0
+        self.data_lines = 0
+        self.stats_time = 0.0
+
+    def add(self, counters):
+        lines_fed, data_lines, stats_time = counters
+        self.chunks += 1
+        self.lines_fed += lines_fed
+        self.data_lines += data_lines
+        self.stats_time += stats_time
+
+
+def parse_chunked(filepath, new_parser, workers=None, chunk_bytes=CHUNK_BYTES, stop_early=False,
+                  section_index=False):
+    """Parse filepath in chunks on a process pool; return (result, ChunkedRun, bytes scanned).
+
+    new_parser() must be a module-level callable returning a fresh parser
+    (e.g. MeasValParser). The result is what parser.close() returns after a
+    serial read of the whole file.
+    """
+    probe = new_parser()
+    all_sections = set(probe.scanner.titles)
+    with open(filepath, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            size = len(mm)
+            headers = new_reader(probe, section_index).index_headers(filepath, mm)
+            points = split_points(mm, probe, chunk_bytes, headers)
+        finally:
+            mm.close()
+    bounds = list(zip(points, points[1:] + [size]))
+    jobs = [(new_parser, filepath, start, end, stop_early,
+             offsets_between(headers, start, end) if headers is not None else None) for start, end in bounds]
+
+    run = ChunkedRun()
+    parts = [[] for _ in _parsers(probe)]
+    seen_sections = set()
+    scanned = 0
+    stopped = False
+    processes = min(resolve_workers(workers), len(jobs))
+    pool = multiprocessing.Pool(processes=processes)
+    # 按顺序提交，最多同时排队 2 倍进程数的块；提前停止时不再提交，只等待已提交的块
+    pending = collections.deque()
+    next_job = 0
+    try:
+        while pending or (not stopped and next_job < len(jobs)):
+            while not stopped and next_job < len(jobs) and len(pending) < 2 * processes:
+                pending.append((bounds[next_job], pool.apply_async(_parse_chunk, (jobs[next_job],))))
+                next_job += 1
+            (start, end), async_result = pending.popleft()
+            result, chunk_seen, leaves, counters = async_result.get()
+            if stopped:
+                continue
+            run.add(counters)
+            chunk_parts = result if len(parts) > 1 else [result]
+            # 与串行读取相同：离开某个目标章节时，如果所有目标章节都已出现，就在此处停止
+            for pos, leave_seen, counts in leaves:
+                if seen_sections | leave_seen >= all_sections:
+                    chunk_parts = [part[:count] for part, count in zip(chunk_parts, counts)]
+                    end = pos
+                    stopped = True
+                    break
+            for part, chunk_part in zip(parts, chunk_parts):
+                part.extend(chunk_part)
+            scanned += end - start
+            seen_sections |= chunk_seen
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return (parts if len(parts) > 1 else parts[0]), run, scanned
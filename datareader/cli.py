@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Non-interactive command line shared by the extractor scripts."""
+import os
+import glob
+import argparse
+
+from datareader.archive import list_sources, expand_file
+from datareader.discover import SourceWalker, SourceStream, parse_date, first_source
+
+OUTPUT_FORMATS = ('xlsx', 'csv', 'tsv')
+
+
+def build_arg_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('inputs', nargs='+',
+                        help="folders (all logs inside), .txt/.txt.gz/.txt.xz files, zip bundles "
+                             "or glob patterns such as 'logs/**/*.txt'")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='also search the subfolders of input folders; logs are extracted as they are found')
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help="only logs in input folders matching this name or relative path pattern, "
+                             "e.g. '*_final.txt' or '2026-07-*/ST01/*' (repeatable)")
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help='skip files and folders in input folders matching this pattern (repeatable)')
+    parser.add_argument('--since', type=parse_date, metavar='YYYY-MM-DD',
+                        help='skip folders and files in input folders whose name holds an earlier date')
+    parser.add_argument('--until', type=parse_date, metavar='YYYY-MM-DD',
+                        help='skip folders and files in input folders whose name holds a later date')
+    parser.add_argument('-o', '--output',
+                        help='output file (.xlsx, .csv or .tsv unless -f is given) or directory; a path ending '
+                             'in a separator is always a directory (default: the first input folder)')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS,
+                        help='output format (default: taken from the --output extension, else xlsx)')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='worker processes (default: BATCH_WORKERS, 1 = serial)')
+    parser.add_argument('--prefetch', type=int, metavar='N',
+                        help='serial mode: read the next N files ahead while one is parsed '
+                             '(default: PREFETCH_DEPTH, 0 = off)')
+    parser.add_argument('--no-cache', action='store_true', help='do not use the extraction cache')
+    parser.add_argument('--no-metrics', action='store_true', help='do not write the .metrics.json file')
+    parser.add_argument('--trace-memory', action='store_true', help='record tracemalloc peaks per file (slower)')
+    parser.add_argument('--profile', action='store_true', help='record cProfile hot spots per file in the metrics')
+    parser.add_argument('--shard-sheets', type=int, metavar='N',
+                        help='xlsx only: split sheets over workbooks of at most N sheets, saved in parallel, '
+                             'with the output file as an index (default: SHARD_MAX_SHEETS, 0 = one workbook)')
+    parser.add_argument('--store', metavar='DB',
+                        help='also add the readings to this results database (default: RESULTS_DB)')
+    parser.add_argument('--limits', metavar='FILE',
+                        help='check the readings against this limits table and write an out-of-limits report '
+                             '(default: LIMITS_FILE)')
+    return parser
+
+
+def iter_inputs(inputs, walker=None):
+    """Sources of folders, files and glob patterns in input order, without duplicates.
+
+    Folders are searched with walker (a datareader.discover.SourceWalker)
+    if given, else only the files directly inside are listed. Zip bundles
+    expand into their .txt members (see datareader.archive).
+    """
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = walker.walk(item) if walker is not None else list_sources(item)
+        elif os.path.isfile(item):
+            matches = expand_file(item) if item.lower().endswith('.zip') else [item]
+        else:
+            matches = []
+            for filepath in sorted(p for p in glob.glob(item, recursive=True) if os.path.isfile(p)):
+                matches.extend(expand_file(filepath))
+            if not matches:
+                print("  Warning: No files match '%s'" % item)
+        for filepath in matches:
+            key = os.path.abspath(filepath)
+            if key not in seen:
+                seen.add(key)
+                yield filepath
+
+
+def expand_inputs(inputs):
+    """Expand folders, files and glob patterns into a list of log sources (see iter_inputs)."""
+    return list(iter_inputs(inputs))
+
+
+def discover_inputs(args):
+    """(walker, sources) of the command line inputs.
+
+    Without -r/--include/--exclude/--since/--until, sources is the list of
+    expand_inputs() and walker is None. Otherwise the input folders are
+    walked on a background thread and sources is a SourceStream that yields
+    the logs as they are found, while the first ones are already extracted.
+    """
+    if not (args.recursive or args.include or args.exclude or args.since or args.until):
+        return None, expand_inputs(args.inputs)
+    walker = SourceWalker(args.include, args.exclude, args.since, args.until, recursive=args.recursive)
+    return walker, SourceStream(iter_inputs(args.inputs, walker))
+
+
+def describe_sources(sources):
+    """'Found N .txt file(s).' for a list; a SourceStream is still being searched."""
+    if isinstance(sources, SourceStream):
+        return "Searching the inputs, extracting logs as they are found."
+    return "Found %d .txt file(s)." % len(sources)
+
+
+def default_output_dir(inputs, filepaths):
+    """The first input folder, or the folder of the first input file."""
+    if os.path.isdir(inputs[0]):
+        return inputs[0]
+    return os.path.dirname(first_source(filepaths)) or os.curdir
+
+
+def is_directory_output(output):
+    """True if --output names a directory: an existing one, or any path ending in a separator."""
+    return os.path.isdir(output) or output.endswith(tuple(sep for sep in (os.sep, os.altsep) if sep))
+
+
+def resolve_output(output, output_format, default_dir, default_filename):
+    """Return (output file, format) from the --output / --format options.
+
+    A directory output (see is_directory_output) is created if needed and
+    gets default_filename with the format's extension. Otherwise the format
+    comes from the file extension, which must be one of OUTPUT_FORMATS
+    unless --format is given; raises ValueError if it is not.
+    """
+    if output is not None and is_directory_output(output):
+        if not os.path.isdir(output):
+            os.makedirs(output)
+        default_dir, output = output, None
+    if output is None:
+        output_format = output_format or 'xlsx'
+        filename = '%s.%s' % (os.path.splitext(default_filename)[0], output_format)
+        return os.path.join(default_dir, filename), output_format
+    if output_format is None:
+        ext = os.path.splitext(output)[1].lower().lstrip('.')
+        if ext not in OUTPUT_FORMATS:
+            raise ValueError("cannot tell the output format from '%s': use a .%s file name, a directory "
+                             "ending in '%s', or -f" % (output, ', .'.join(OUTPUT_FORMATS), os.sep))
+        output_format = ext
+    return output, output_format
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""Compact columnar storage for Readback readings with vectorized group-by reductions.
+
+Readings are stored as typed arrays (stdlib array module), one row per channel
+reading: section id, group id, channel, VAL, ANGLE, DG, OANG (channel and DG as
+64-bit integers). When NumPy is
+installed the reductions run over zero-copy views of those arrays; otherwise a
+pure Python fallback gives the same results. NumPy is imported on the first
+reduction, so importing this module stays cheap.
+"""
+from array import array
+
+from datareader.readback_parse import parse_group, parse_lines
+
+# NumPy 是可选依赖，第一次归约时才导入（None 表示没有安装）
+np = None
+_np_checked = False
+
+# 行数少于该值时用纯 Python 归约：一个章节通常只有几个数据组，NumPy 每次调用的固定开销比归约本身还大
+NUMPY_MIN_ROWS = 2048
+
+# 输出字段名 -> 列属性名
+_FLOAT_FIELDS = {'VAL': 'val', 'ANGLE': 'angle', 'OANG': 'oang'}
+_INT_FIELDS = {'DG': 'dg'}
+
+# array 类型码 -> NumPy dtype（用于零拷贝视图）
+_NUMPY_TYPES = {'d': 'float64', 'i': 'intc', 'q': 'int64'}
+
+
+def _fits_int64(value):
+    return -2 ** 63 <= value < 2 ** 63
+
+
+def _numpy():
+    """NumPy, imported on first use, or None when it is not installed."""
+    global np, _np_checked
+    if not _np_checked:
+        _np_checked = True
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+
+def numpy_view(data):
+    """Zero-copy NumPy view of a typed array (call _numpy() first)."""
+    return np.frombuffer(data, dtype=_NUMPY_TYPES[data.typecode])
+
+
+class ReadbackColumns(object):
+    """Typed-array store of Readback readings for any number of sections and files.
+
+    Rows of one group are contiguous and sorted by channel, so a group id
+    identifies a contiguous segment (this is what the reductions rely on).
+    """
+
+    def __init__(self):
+        self.section_names = []
+        self.section_sources = []
+        self.group_section = array('i')
+        self.section_id = array('i')
+        self.group_id = array('i')
+        self.channel = array('q')
+        self.val = array('d')
+        self.angle = array('d')
+        self.dg = array('q')
+        self.oang = array('d')
+
+    def __len__(self):
+        return len(self.channel)
+
+    @property
+    def group_count(self):
+        return len(self.group_section)
+
+    def add_section(self, section_name, source=''):
+        """Register a section and return its id."""
+        self.section_names.append(section_name)
+        self.section_sources.append(source)
+        return len(self.section_names) - 1
+
+    def add_group(self, section_id, dataset):
+        """Append one CH group ({'CH3': {'VAL':..,'ANGLE':..,'DG':..,'OANG':..}, ...}).
+
+        Raises OverflowError, without adding anything, if a channel number or
+        DG does not fit in 64 bits.
+        """
+        labels = sorted(dataset.keys(), key=lambda x: int(x[2:]))
+        rows = [dataset[ch_label] for ch_label in labels]
+        # 先转换整数列：超出范围时在修改任何列之前抛出 OverflowError
+        channel = array('q', [int(ch_label[2:]) for ch_label in labels])
+        dg = array('q', [ch_data['DG'] for ch_data in rows])
+        group_id = len(self.group_section)
+        self.group_section.append(section_id)
+        self.section_id.extend(array('i', [section_id]) * len(rows))
+        self.group_id.extend(array('i', [group_id]) * len(rows))
+        self.channel.extend(channel)
+        self.val.extend(array('d', [ch_data['VAL'] for ch_data in rows]))
+        self.angle.extend(array('d', [ch_data['ANGLE'] for ch_data in rows]))
+        self.dg.extend(dg)
+        self.oang.extend(array('d', [ch_data['OANG'] for ch_data in rows]))
+        return group_id
+
+    def _add_group_fitting(self, section_id, dataset):
+        """add_group() without the channels whose channel number or DG does not fit in 64 bits."""
+        try:
+            self.add_group(section_id, dataset)
+        except OverflowError:
+            # 与格式错误的数字一样，只跳过这些通道
+            fitting = dict((ch_label, ch_data) for ch_label, ch_data in dataset.items()
+                           if _fits_int64(int(ch_label[2:])) and _fits_int64(ch_data['DG']))
+            print("  Warning: Could not store channel(s) %s: value out of 64-bit range"
+                  % ', '.join(sorted(set(dataset) - set(fitting))))
+            dataset = fitting
+            if dataset:
+                self.add_group(section_id, dataset)
+
+    def add_lines(self, section_id, lines, pattern, fallback=None):
+        """Parse 'Readback values' lines straight into the columns, one CH group per line with channels.
+
+        Numbers are converted in bulk (datareader.readback_parse.parse_lines).
+        Lines whose channels are not in ascending order, and batches with a
+        malformed number or an integer that does not fit in 64 bits, go
+        through the per-line dict path instead, so the result is the same as
+        add_group() on each parsed line. fallback(line)
+        returns the CH group of a line with a malformed number (e.g. without
+        the bad channels); by default such a line is skipped. Channels whose
+        channel number or DG does not fit in 64 bits are skipped like
+        malformed ones. Returns the number of CH groups added.
+        """
+        lines = list(lines)
+        group_count = len(self.group_section)
+        try:
+            counts, channel, val, angle, dg, oang = parse_lines(pattern, lines)
+        except (ValueError, OverflowError):
+            for line in lines:
+                dataset = parse_group(pattern, line)
+                if dataset is None and fallback is not None:
+                    dataset = fallback(line)
+                if dataset:
+                    self._add_group_fitting(section_id, dataset)
+            return len(self.group_section) - group_count
+        start = 0
+        for count in counts:
+            end = start + count
+            group_channels = channel[start:end]
+            if all(a < b for a, b in zip(group_channels, group_channels[1:])):
+                group_id = len(self.group_section)
+                self.group_section.append(section_id)
+                self.section_id.extend(array('i', [section_id]) * count)
+                self.group_id.extend(array('i', [group_id]) * count)
+                self.channel.extend(group_channels)
+                self.val.extend(val[start:end])
+                self.angle.extend(angle[start:end])
+                self.dg.extend(dg[start:end])
+                self.oang.extend(oang[start:end])
+            else:
+                # 通道未按升序排列（或有重复）时按字典方式处理：后出现的通道覆盖先出现的，再按通道号排序
+                dataset = {}
+                for i in range(start, end):
+                    dataset['CH{}'.format(channel[i])] = {'VAL': val[i], 'ANGLE': angle[i], 'DG': dg[i],
+                                                          'OANG': oang[i]}
+                self.add_group(section_id, dataset)
+            start = end
+        return len(self.group_section) - group_count
+
+    @classmethod
+    def from_sections(cls, section_data_list, source=''):
+        """Build columns from the extract_data result of one file."""
+        columns = cls()
+        for section_info in section_data_list:
+            section_id = columns.add_section(section_info['section_name'], source)
+            for dataset in section_info['data']:
+                columns.add_group(section_id, dataset)
+        return columns
+
+    @classmethod
+    def from_datasets(cls, section_datasets, section_name=''):
+        """Build columns from the CH groups of a single section."""
+        columns = cls()
+        section_id = columns.add_section(section_name)
+        for dataset in section_datasets:
+            columns.add_group(section_id, dataset)
+        return columns
+
+    def extend(self, other):
+        """Append all sections and groups of other (e.g. the next file)."""
+        section_offset = len(self.section_names)
+        group_offset = len(self.group_section)
+        self.section_names.extend(other.section_names)
+        self.section_sources.extend(other.section_sources)
+        self.group_section.extend(array('i', [s + section_offset for s in other.group_section]))
+        self.section_id.extend(array('i', [s + section_offset for s in other.section_id]))
+        self.group_id.extend(array('i', [g + group_offset for g in other.group_id]))
+        for name in ('channel', 'val', 'angle', 'dg', 'oang'):
+            getattr(self, name).extend(getattr(other, name))
+
+    def column(self, name):
+        """Return a column as a NumPy view (or the raw array without NumPy)."""
+        data = getattr(self, name)
+        if _numpy() is None:
+            return data
+        return numpy_view(data)
+
+    def field_column(self, field):
+        """Column for an output field name such as 'VAL' or 'DG'."""
+        return self.column(_FLOAT_FIELDS.get(field) or _INT_FIELDS[field])
+
+    def field_array(self, field):
+        """Raw typed array of an output field name (plain Python values when indexed)."""
+        return getattr(self, _FLOAT_FIELDS.get(field) or _INT_FIELDS[field])
+
+    def group_reduce(self, field, channels=None):
+        """Per-group (count, avg, max, min) of field, optionally restricted to channels.
+
+        Returns four lists indexed by group id; avg/max/min are None for groups
+        without a matching reading. Stores of fewer than NUMPY_MIN_ROWS rows
+        are reduced in pure Python. Sums are accumulated in channel order, so
+        the averages equal sum(values) / len(values) over the sorted channels.
+        max/min of an integer field such as DG are ints.
+        """
+        group_count = self.group_count
+        if group_count == 0:
+            return [], [], [], []
+        if len(self) < NUMPY_MIN_ROWS or _numpy() is None:
+            return self._group_reduce_python(field, channels)
+
+        raw = self.field_column(field)
+        values = raw.astype(np.float64)
+        if raw.dtype.kind == 'i':
+            # 整数字段（DG）的最大/最小值直接按整数比较，超过 2**53 的值也不失精度
+            extremes, lowest, highest = raw, np.iinfo(raw.dtype).min, np.iinfo(raw.dtype).max
+        else:
+            extremes, lowest, highest = values, -np.inf, np.inf
+        group_ids = self.column('group_id')
+        if channels is None:
+            mask = np.ones(len(values), dtype=bool)
+        else:
+            mask = np.isin(self.column('channel'), list(channels))
+        counts = np.bincount(group_ids[mask], minlength=group_count)
+        sums = np.bincount(group_ids[mask], weights=values[mask], minlength=group_count)
+        maxs = np.full(group_count, lowest, dtype=extremes.dtype)
+        mins = np.full(group_count, highest, dtype=extremes.dtype)
+        if len(values):
+            # 每组的行是连续的，用 reduceat 按组求最大/最小（不参与的行用该类型的最小/最大值占位）
+            starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+            segment_groups = group_ids[starts]
+            maxs[segment_groups] = np.maximum.reduceat(np.where(mask, extremes, lowest), starts)
+            mins[segment_groups] = np.minimum.reduceat(np.where(mask, extremes, highest), starts)
+        present = counts > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avgs = sums / counts
+        to_list = lambda data: [v if ok else None for v, ok in zip(data.tolist(), present.tolist())]
+        to_field = to_list
+        if raw.dtype.kind == 'i':
+            # 整数字段（DG）的最大/最小值与逐值计算一样保持为 int
+            to_field = lambda data: [int(v) if v is not None else None for v in to_list(data)]
+        return counts.tolist(), to_list(avgs), to_field(maxs), to_field(mins)
+
+    def _group_reduce_python(self, field, channels):
+        values = self.field_array(field)
+        grouped = [[] for _ in range(self.group_count)]
+        for group_id, channel, value in zip(self.group_id, self.channel, values):
+            if channels is None or channel in channels:
+                grouped[group_id].append(value)
+        counts = [len(g) for g in grouped]
+        avgs = [sum(g) / len(g) if g else None for g in grouped]
+        maxs = [max(g) if g else None for g in grouped]
+        mins = [min(g) if g else None for g in grouped]
+        return counts, avgs, maxs, mins
+
+    def iter_groups(self, section_id=None):
+        """Yield (section id, CH group dict) in storage order."""
+        current_group = None
+        dataset = None
+        for i in range(len(self.channel)):
+            group_id = self.group_id[i]
+            if group_id != current_group:
+                if dataset is not None and (section_id is None or self.group_section[current_group] == section_id):
+                    yield self.group_section[current_group], dataset
+                current_group = group_id
+                dataset = {}
+            dataset['CH{}'.format(self.channel[i])] = {
+                'VAL': self.val[i], 'ANGLE': self.angle[i], 'DG': self.dg[i], 'OANG': self.oang[i]}
+        if dataset is not None and (section_id is None or self.group_section[current_group] == section_id):
+            yield self.group_section[current_group], dataset
+
+    def datasets(self, section_id=None):
+        """CH group dicts in storage order, of one section or of all of them."""
+        return [dataset for _, dataset in self.iter_groups(section_id)]
+
+    def to_sections(self):
+        """Rebuild the extract_data structure (list of {'section_name', 'data'})."""
+        sections = [{'section_name': name, 'data': []} for name in self.section_names]
+        for section_id, dataset in self.iter_groups():
+            sections[section_id]['data'].append(dataset)
+        return sections
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Run several section parsers over a log in one pass.
+
+CombinedParser looks like a single parser to MappedSectionReader and to the
+text-mode read loop: every relevant line is decoded once and fed to each
+parser, which keeps its own state machine (and its own section quirks).
+"""
+import pickle
+import tempfile
+
+from datareader.scanner import SectionScanner
+
+
+class CombinedParser(object):
+    """Feeds each line to several parsers (e.g. MeasValParser and ReadbackParser)."""
+
+    def __init__(self, parsers):
+        self.parsers = list(parsers)
+        # 读取器使用所有解析器目标章节的并集来跳转，数据行满足任一解析器的预过滤即需解码
+        target_sections = []
+        for parser in self.parsers:
+            for pattern in parser.scanner.target_sections:
+                if pattern not in target_sections:
+                    target_sections.append(pattern)
+        self.scanner = SectionScanner(target_sections)
+        self.data_literal_sets = [parser.scanner.data_literals for parser in self.parsers]
+
+    @property
+    def in_target_section(self):
+        return any(parser.in_target_section for parser in self.parsers)
+
+    @property
+    def current_section(self):
+        for parser in self.parsers:
+            if parser.in_target_section:
+                return parser.current_section
+        return None
+
+    @property
+    def lines_fed(self):
+        return max(parser.lines_fed for parser in self.parsers)
+
+    @property
+    def data_lines(self):
+        return sum(parser.data_lines for parser in self.parsers)
+
+    @property
+    def stats_time(self):
+        return sum(getattr(parser, 'stats_time', 0.0) for parser in self.parsers)
+
+    def feed(self, line_u):
+        for parser in self.parsers:
+            parser.feed(line_u)
+
+    def close(self):
+        """Close every parser; return their results in parser order."""
+        return [parser.close() for parser in self.parsers]
+
+
+class ResultSpool(object):
+    """Holds one side of paired results in a temporary file until it is written.
+
+    split() passes the first item of each pair through (e.g. to the first
+    workbook writer) while pickling the second; replay() then yields the
+    second items in the same order for the next writer.
+    """
+
+    def __init__(self):
+        self._spool = tempfile.TemporaryFile()
+        self.count = 0
+
+    def split(self, pairs):
+        for first, second in pairs:
+            pickle.dump(second, self._spool, pickle.HIGHEST_PROTOCOL)
+            self.count += 1
+            yield first
+
+    def replay(self):
+        spool, self._spool = self._spool, None
+        try:
+            spool.seek(0)
+            for _ in range(self.count):
+                yield pickle.load(spool)
+        finally:
+            spool.close()
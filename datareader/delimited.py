@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""Streaming CSV/TSV output: rows go straight from the extractor to disk."""
+import csv
+
+# 输出格式 -> 分隔符
+DELIMITERS = {'csv': ',', 'tsv': '\t'}
+
+
+def write_delimited(output_file, named_rows, delimiter=','):
+    """Write (filename, rows) pairs one after another into one delimited file.
+
+    Rows are written as they are produced, so no workbook and no flattened
+    row list is held in memory; the caller's parsed data of the current file
+    is. Returns the number of source files written.
+    """
+    file_count = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        for _, rows in named_rows:
+            writer.writerows(rows)
+            file_count += 1
+    return file_count
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Recursive discovery of log sources in large folder trees.
+
+SourceWalker walks a folder (optionally its whole date/station/serial tree)
+with os.scandir: the entry type comes from the directory listing, so no
+file is stat'ed. Entries of a folder are visited in name order, depth
+first, so the order of the sources is the same on every run.
+
+- include / exclude are glob patterns. A pattern with a '/' matches the
+  path relative to the walked folder ('2026-07-*/ST01/*'), one without
+  matches the entry name ('*_retest.txt'). Excluded folders are not
+  entered. include only applies to files (a zip bundle by its own name).
+- since / until (dates, until included) prune folders and files whose name
+  holds a date ('2026-07-15', '20260715', '2026_07_15'), a month
+  ('2026-07') or a year ('2026') that is entirely outside the range.
+  Entries without a date in their name are kept.
+- SourceWalker.source_name() names a source by its path relative to the
+  walked folder, so logs of the same name in different folders stay apart.
+
+SourceStream runs the walk on a background thread and hands the sources
+over as they are found, so extraction starts before the walk is finished.
+"""
+import os
+import re
+import queue
+import fnmatch
+import datetime
+import threading
+
+from datareader.archive import container_path, expand_file, source_name
+
+# 后台遍历时最多缓存的待处理源数
+STREAM_BUFFER = 1024
+
+# 名称中的日期：完整日期（前后不能紧接数字），或整个名称为年月/年份
+_DAY = re.compile(r'(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)')
+_MONTH = re.compile(r'^(\d{4})[-_.]?(\d{2})$')
+_YEAR = re.compile(r'^(\d{4})$')
+
+# 认为是年份的范围（避免把序列号当作日期）
+_YEARS = (1990, 2100)
+
+
+def parse_date(text):
+    """'YYYY-MM-DD' -> datetime.date (ValueError if malformed)."""
+    return datetime.datetime.strptime(text, '%Y-%m-%d').date()
+
+
+def _date(year, month, day):
+    if not _YEARS[0] <= year <= _YEARS[1]:
+        return None
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def name_period(name):
+    """(first day, last day) of the date, month or year in a folder or file name, or None."""
+    for match in _DAY.finditer(name):
+        day = _date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        if day is not None:
+            return day, day
+    match = _MONTH.match(name)
+    if match:
+        first = _date(int(match.group(1)), int(match.group(2)), 1)
+        if first is not None:
+            following = first.replace(year=first.year + 1, month=1) if first.month == 12 \
+                else first.replace(month=first.month + 1)
+            return first, following - datetime.timedelta(days=1)
+    match = _YEAR.match(name)
+    if match:
+        first = _date(int(match.group(1)), 1, 1)
+        if first is not None:
+            return first, first.replace(month=12, day=31)
+    return None
+
+
+def _matches(patterns, relpath, name):
+    for pattern in patterns:
+        if fnmatch.fnmatch(relpath if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+class SourceWalker(object):
+    """Finds the log sources below a folder (see the module docstring), counting what it visits.
+
+    since / until are datetime.date objects or 'YYYY-MM-DD' strings.
+    """
+
+    def __init__(self, include=None, exclude=None, since=None, until=None, recursive=True):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.since = parse_date(since) if isinstance(since, str) else since
+        self.until = parse_date(until) if isinstance(until, str) else until
+        self.recursive = recursive
+        self.folders = 0
+        self.files = 0
+        self.sources = 0
+        self.pruned = 0
+        self.errors = 0
+        # 已遍历的文件夹（按顺序），source_name() 据此给出相对路径
+        self.roots = []
+
+    def _in_range(self, name):
+        if self.since is None and self.until is None:
+            return True
+        period = name_period(name)
+        if period is None:
+            return True
+        first, last = period
+        return (self.since is None or last >= self.since) and (self.until is None or first <= self.until)
+
+    def _entries(self, folder):
+        """Entries of folder sorted by name ([] with a warning if it cannot be listed)."""
+        self.folders += 1
+        try:
+            with os.scandir(folder) as it:
+                return sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            self.errors += 1
+            print("  Warning: Cannot list folder '%s': %s" % (folder, str(e)))
+            return []
+
+    def walk(self, root):
+        """Yield the sources below root in name order, depth first (the counters add up over walks)."""
+        self.roots.append(root)
+        prefix = len(os.path.join(root, ''))
+        stack = [iter(self._entries(root))]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                continue
+            relpath = entry.path[prefix:].replace(os.sep, '/')
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                self.errors += 1
+                continue
+            if is_dir:
+                if not self.recursive:
+                    continue
+                if _matches(self.exclude, relpath, entry.name) or not self._in_range(entry.name):
+                    self.pruned += 1
+                    continue
+                stack.append(iter(self._entries(entry.path)))
+            elif is_file:
+                self.files += 1
+                if (self.include and not _matches(self.include, relpath, entry.name)) \
+                        or _matches(self.exclude, relpath, entry.name) or not self._in_range(entry.name):
+                    continue
+                for source in expand_file(entry.path):
+                    self.sources += 1
+                    yield source
+
+    def source_name(self, source):
+        """source_name() of a source relative to the first walked folder it is in ('ST01/log.txt')."""
+        path = os.path.abspath(container_path(source))
+        for root in self.roots:
+            if path.startswith(os.path.join(os.path.abspath(root), '')):
+                return source_name(source, root)
+        return source_name(source)
+
+    def as_dict(self):
+        return {'folders': self.folders, 'files': self.files, 'sources': self.sources, 'pruned': self.pruned,
+                'errors': self.errors}
+
+    def format(self):
+        return ("Discovery: %d log(s) in %d file(s) under %d folder(s), %d folder(s) pruned, %d error(s)"
+                % (self.sources, self.files, self.folders, self.pruned, self.errors))
+
+
+class SourceStream(object):
+    """Iterates sources produced on a background thread (at most buffer ahead of the consumer).
+
+    The first source is waited for on creation (first is None if there is
+    none). An exception raised by the producer is raised again in the
+    consumer. The stream can be iterated once.
+    """
+
+    _DONE = object()
+
+    def __init__(self, sources, buffer=STREAM_BUFFER):
+        self._queue = queue.Queue(maxsize=max(buffer, 1))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, args=(sources,), name='datareader-discover')
+        self._thread.daemon = True
+        self._thread.start()
+        self._finished = False
+        self.first = self._get()
+
+    def _produce(self, sources):
+        item = self._DONE
+        try:
+            for source in sources:
+                if not self._put(source):
+                    return
+        except BaseException as e:
+            item = e
+        self._put(item)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self):
+        if self._finished:
+            return None
+        item = self._queue.get()
+        if item is self._DONE:
+            self._finished = True
+            return None
+        if isinstance(item, BaseException):
+            self._finished = True
+            raise item
+        return item
+
+    def __iter__(self):
+        if self.first is None:
+            return
+        yield self.first
+        while True:
+            source = self._get()
+            if source is None:
+                break
+            yield source
+        self._thread.join()
+
+    def close(self):
+        """Stop the producer (when the consumer gives up early)."""
+        self._stop.set()
+
+
+def first_source(sources):
+    """The first source of a list or a SourceStream, or None if there is none."""
+    if isinstance(sources, SourceStream):
+        return sources.first
+    return sources[0] if sources else None
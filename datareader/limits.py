@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""Limit checks of the extracted readings against a table of spec limits.
+
+The limits table is a CSV/TSV file (or the first sheet of an .xlsx file)
+with a header row and one limit per row:
+
+    Section,CH_Label,Field,Low,High,Tool
+    8.4 60Hz Verification2,*,VAL,49.5,60.5,
+    8.4 60Hz Verification2,CH5,VAL,50,59,
+    8.1.3 P3Y CTVT Cali 10A,*,OANG,-0.9,0.9,readback
+
+Section is the section name as written in the output (spaces are
+normalized). CH_Label '*' or blank applies to every channel of the section;
+a row for one channel takes precedence over it. A blank Low or High is
+unbounded. Tool (optional column) limits a row to 'measval' or 'readback'.
+Empty lines and lines starting with '#' are skipped.
+
+Readings are collected into typed arrays (limit id, value, CH group,
+channel/field) as the files are written and compared in chunks of
+CHUNK_ROWS readings: with NumPy as array comparisons and bincounts,
+otherwise in a pure Python loop with the same results. NumPy is imported
+when the first chunk is compared, so loading this module stays cheap. Besides the chunk,
+only the counts per limit and per file, the position of each CH group and
+the out-of-limit readings (up to MAX_REPORTED) are kept.
+"""
+import os
+import csv
+from array import array
+
+from datareader.columnar import _numpy, numpy_view
+from datareader.delimited import write_delimited, DELIMITERS
+from datareader.xlsx_stream import ColumnWidthTracker, StreamingWorkbook
+
+# 限值表必需的列（Tool 列可选）
+LIMIT_COLUMNS = ('Section', 'CH_Label', 'Field', 'Low', 'High')
+# 表示"所有通道/所有工具"的单元格
+ANY = ('', '*')
+
+# 每次批量比较的读数个数
+CHUNK_ROWS = 1000000
+# 最多报告的超限读数行数（其余只计数）
+MAX_REPORTED = 100000
+
+SUMMARY_HEADERS = ['Section', 'CH_Label', 'Field', 'Low', 'High', 'Checked', 'Failed', 'Fail_%', 'Result']
+FILE_HEADERS = ['Source_File', 'Checked', 'Failed', 'Result']
+FAILURE_HEADERS = ['Source_File', 'Section', 'CH_Group', 'CH_Label', 'Field', 'Value', 'Low', 'High', 'Excess']
+
+# 报告的 sheet 名（CSV/TSV 输出时为文件名后缀）
+SUMMARY_SHEET_NAME = 'Limit_Summary'
+FILES_SHEET_NAME = 'Limit_Files'
+FAILURES_SHEET_NAME = 'Out_Of_Limits'
+
+
+def section_key(section_name):
+    """Section name with runs of whitespace collapsed, as used for matching."""
+    return ' '.join(section_name.split())
+
+
+def limits_path(output_file, suffix='limits'):
+    """'out/ALL.xlsx' -> 'out/ALL.limits.xlsx'"""
+    root, ext = os.path.splitext(output_file)
+    return '%s.%s%s' % (root, suffix, ext)
+
+
+def _channel(text):
+    if text in ANY:
+        return None
+    try:
+        return int(text.upper().replace('CH', '', 1))
+    except ValueError:
+        raise ValueError("bad CH_Label '%s'" % text)
+
+
+def _bound(text, default):
+    if text == '':
+        return default
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError("bad limit '%s'" % text)
+
+
+_UNBOUNDED = (float('inf'), float('-inf'))
+
+
+def _bound_cell(bound):
+    # 无界的一侧在报告中留空
+    return '' if bound in _UNBOUNDED else bound
+
+
+class LimitTable(object):
+    """Spec limits keyed on (section, channel or None for all channels, field)."""
+
+    def __init__(self):
+        self.limits = []
+        self.low = array('d')
+        self.high = array('d')
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.limits)
+
+    def add(self, section, channel, field, low, high):
+        """Add a limit and return its id."""
+        section = section_key(section)
+        if not section or not field:
+            raise ValueError("Section and Field are required")
+        if low > high:
+            raise ValueError("Low %r is above High %r" % (low, high))
+        key = (section, channel, field)
+        if key in self._ids:
+            raise ValueError("duplicate limit for %s %s %s" % (section, 'CH%d' % channel if channel is not None
+                                                                else '*', field))
+        limit_id = self._ids[key] = len(self.limits)
+        self.limits.append(key)
+        self.low.append(low)
+        self.high.append(high)
+        return limit_id
+
+    def lookup(self, section, channel, field):
+        """Id of the limit for one reading (the channel's own, else the section's), or -1."""
+        section = section_key(section)
+        limit_id = self._ids.get((section, channel, field))
+        if limit_id is None:
+            limit_id = self._ids.get((section, None, field), -1)
+        return limit_id
+
+
+def _read_rows(path):
+    """Cell text rows of a CSV/TSV file or of the first sheet of an .xlsx file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xlsx':
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in wb.worksheets[0].iter_rows(values_only=True):
+                yield ['' if value is None else str(value) for value in row]
+        finally:
+            wb.close()
+        return
+    delimiter = DELIMITERS['tsv'] if ext in ('.tsv', '.txt') else DELIMITERS['csv']
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f, delimiter=delimiter):
+            yield row
+
+
+def load_limits(path, tool=None):
+    """Read a limits table; rows for another tool than tool are skipped. Raises ValueError on bad rows."""
+    table = LimitTable()
+    columns = None
+    for line_number, row in enumerate(_read_rows(path), 1):
+        cells = [cell.strip() for cell in row]
+        if not any(cells) or cells[0].startswith('#'):
+            continue
+        if columns is None:
+            columns = dict((name.lower(), index) for index, name in enumerate(cells))
+            missing = [name for name in LIMIT_COLUMNS if name.lower() not in columns]
+            if missing:
+                raise ValueError("%s: missing column(s) %s" % (path, ', '.join(missing)))
+            continue
+        values = dict((name, cells[index] if index < len(cells) else '') for name, index in columns.items())
+        row_tool = values.get('tool', '').lower()
+        if tool is not None and row_tool not in ANY and row_tool != tool:
+            continue
+        try:
+            table.add(values['section'], _channel(values['ch_label']), values['field'].upper(),
+                      _bound(values['low'], float('-inf')), _bound(values['high'], float('inf')))
+        except ValueError as e:
+            raise ValueError("%s line %d: %s" % (path, line_number, str(e)))
+    if columns is None:
+        raise ValueError("%s: no header row" % path)
+    return table
+
+
+class LimitChecker(object):
+    """Checks every reading of the given fields against a LimitTable, in bulk.
+
+    add_file() only appends the readings that have a limit to the current
+    chunk; a full chunk is evaluated at once and then dropped.
+    """
+
+    def __init__(self, table, fields, chunk_rows=CHUNK_ROWS, max_reported=MAX_REPORTED):
+        self.table = table
+        self.fields = list(fields)
+        self.chunk_rows = max(chunk_rows, 1)
+        self.max_reported = max_reported
+        self.checked = [0] * len(table)
+        self.failed = [0] * len(table)
+        self.files = []
+        self.file_checked = []
+        self.file_failed = []
+        # 超限读数：(CH 组序号, 通道*字段数+字段序号, 读数, 限值 id)
+        self.failures = []
+        self.failed_total = 0
+        # 每个章节（按出现顺序）的名称和文件序号，每个 CH 组的章节序号和组内序号
+        self._section_names = []
+        self._section_file = array('i')
+        self._group_section = array('i')
+        self._group_index = array('i')
+        # (章节名, CH 组的通道标签) -> (要取的 (通道标签, 字段), 限值 id, 通道*字段数+字段序号)
+        self._routes = {}
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self._limit = array('i')
+        self._value = array('d')
+        self._group = array('i')
+        self._cell = array('i')
+
+    def _route(self, section_name, ch_labels):
+        """The readings of a CH group with these channels that have a limit, cached per section and channels."""
+        key = (section_name, ch_labels)
+        route = self._routes.get(key)
+        if route is None:
+            fetch, limit_ids, cells = [], array('i'), array('i')
+            for ch_label in ch_labels:
+                channel = int(ch_label[2:])
+                for field_index, field in enumerate(self.fields):
+                    limit_id = self.table.lookup(section_name, channel, field)
+                    if limit_id >= 0:
+                        fetch.append((ch_label, field))
+                        limit_ids.append(limit_id)
+                        cells.append(channel * len(self.fields) + field_index)
+            route = self._routes[key] = (fetch, limit_ids, cells)
+        return route
+
+    def add_file(self, filename, section_data_list):
+        """Add the readings of one file (a list of {'section_name': ..., 'data': [CH groups]}).
+
+        The readings of a CH group are appended to the chunk in one go; a group
+        with a missing or empty value is added one reading at a time instead.
+        """
+        file_id = len(self.files)
+        self.files.append(filename)
+        self.file_checked.append(0)
+        self.file_failed.append(0)
+        for section_info in section_data_list:
+            section_name = section_info['section_name']
+            section_id = len(self._section_names)
+            self._section_names.append(section_name)
+            self._section_file.append(file_id)
+            for ch_group, dataset in enumerate(section_info['data']):
+                group_id = len(self._group_section)
+                self._group_section.append(section_id)
+                self._group_index.append(ch_group)
+                fetch, limit_ids, cells = self._route(section_name, tuple(dataset))
+                if not fetch:
+                    continue
+                try:
+                    readings = array('d', [dataset[ch_label][field] for ch_label, field in fetch])
+                except (KeyError, TypeError):
+                    self._add_readings(group_id, dataset, fetch, limit_ids, cells)
+                    continue
+                self._limit.extend(limit_ids)
+                self._value.extend(readings)
+                self._group.extend(array('i', [group_id]) * len(readings))
+                self._cell.extend(cells)
+            if len(self._value) >= self.chunk_rows:
+                self._evaluate()
+
+    def _add_readings(self, group_id, dataset, fetch, limit_ids, cells):
+        for (ch_label, field), limit_id, cell in zip(fetch, limit_ids, cells):
+            reading = dataset[ch_label].get(field)
+            if reading is None or reading == '':
+                continue
+            self._limit.append(limit_id)
+            self._value.append(reading)
+            self._group.append(group_id)
+            self._cell.append(cell)
+
+    def _report(self, rows):
+        """Keep the chunk rows rows (out of limits, in order) up to max_reported."""
+        self.failed_total += len(rows)
+        room = self.max_reported - len(self.failures)
+        for row in rows[:max(room, 0)]:
+            self.failures.append((self._group[row], self._cell[row], self._value[row], self._limit[row]))
+
+    def _evaluate(self):
+        """Compare the readings of the current chunk with their limits and start a new chunk."""
+        if not self._value:
+            return
+        if _numpy() is None:
+            self._evaluate_python()
+        else:
+            self._evaluate_numpy()
+        self._new_chunk()
+
+    def _evaluate_numpy(self):
+        np = _numpy()
+        limit = numpy_view(self._limit)
+        value = numpy_view(self._value)
+        # NaN 不在任何区间内，也算超限
+        passed = (value >= numpy_view(self.table.low)[limit]) & (value <= numpy_view(self.table.high)[limit])
+        failed = ~passed
+        file_ids = numpy_view(self._section_file)[numpy_view(self._group_section)[numpy_view(self._group)]]
+        for totals, counts in ((self.checked, np.bincount(limit, minlength=len(self.table))),
+                               (self.failed, np.bincount(limit[failed], minlength=len(self.table))),
+                               (self.file_checked, np.bincount(file_ids, minlength=len(self.files))),
+                               (self.file_failed, np.bincount(file_ids[failed], minlength=len(self.files)))):
+            for index in np.flatnonzero(counts).tolist():
+                totals[index] += int(counts[index])
+        rows = np.flatnonzero(failed).tolist()
+        del limit, value, passed, failed, file_ids
+        self._report(rows)
+
+    def _evaluate_python(self):
+        low, high = self.table.low, self.table.high
+        section_file, group_section = self._section_file, self._group_section
+        rows = []
+        for row, (limit_id, reading, group_id) in enumerate(zip(self._limit, self._value, self._group)):
+            file_id = section_file[group_section[group_id]]
+            self.checked[limit_id] += 1
+            self.file_checked[file_id] += 1
+            if not low[limit_id] <= reading <= high[limit_id]:
+                self.failed[limit_id] += 1
+                self.file_failed[file_id] += 1
+                rows.append(row)
+        self._report(rows)
+
+    def finish(self):
+        """Evaluate the readings not checked yet."""
+        self._evaluate()
+
+    def summary_rows(self):
+        """Header row followed by one row per limit, in table order."""
+        self.finish()
+        yield SUMMARY_HEADERS
+        for limit_id, (section, channel, field) in enumerate(self.table.limits):
+            checked, failed = self.checked[limit_id], self.failed[limit_id]
+            result = 'FAIL' if failed else ('PASS' if checked else 'NO DATA')
+            yield [section, '*' if channel is None else 'CH%d' % channel, field,
+                   _bound_cell(self.table.low[limit_id]), _bound_cell(self.table.high[limit_id]),
+                   checked, failed, round(100.0 * failed / checked, 3) if checked else '', result]
+
+    def file_rows(self):
+        """Header row followed by one row per file, in the order they were added."""
+        self.finish()
+        yield FILE_HEADERS
+        for filename, checked, failed in zip(self.files, self.file_checked, self.file_failed):
+            yield [filename, checked, failed, 'FAIL' if failed else ('PASS' if checked else 'NO DATA')]
+
+    def failure_rows(self):
+        """Header row followed by the reported out-of-limit readings (CH_Group 1 = first group of the section)."""
+        self.finish()
+        yield FAILURE_HEADERS
+        field_count = len(self.fields)
+        for group_id, cell, reading, limit_id in self.failures:
+            section_id = self._group_section[group_id]
+            channel, field_index = divmod(cell, field_count)
+            low, high = self.table.low[limit_id], self.table.high[limit_id]
+            if reading > high:
+                excess = reading - high
+            elif reading < low:
+                excess = reading - low
+            else:
+                excess = ''
+            yield [self.files[self._section_file[section_id]], self._section_names[section_id],
+                   self._group_index[group_id] + 1, 'CH%d' % channel, self.fields[field_index], reading,
+                   _bound_cell(low), _bound_cell(high), excess]
+
+    def as_dict(self):
+        self.finish()
+        return {'limits': len(self.table), 'files': len(self.files), 'checked': sum(self.checked),
+                'failed': self.failed_total, 'reported': len(self.failures),
+                'failed_limits': sum(1 for failed in self.failed if failed),
+                'failed_files': sum(1 for failed in self.file_failed if failed)}
+
+    def format(self):
+        counts = self.as_dict()
+        text = ("Limits: %d reading(s) checked against %d limit(s), %d out of limits "
+                "(%d limit(s) and %d of %d file(s) failed)"
+                % (counts['checked'], counts['limits'], counts['failed'], counts['failed_limits'],
+                   counts['failed_files'], counts['files']))
+        if counts['reported'] < counts['failed']:
+            text += ", first %d listed" % counts['reported']
+        return text
+
+
+def iter_checked(checker, named_results):
+    """Yield (filename, data) pairs unchanged, adding each file to checker on the way."""
+    for filename, data in named_results:
+        checker.add_file(filename, data)
+        yield filename, data
+
+
+def write_report(checker, output_file, output_format):
+    """Write the limit report next to output_file and return its path (None if it could not be written).
+
+    xlsx: '<output>.limits.xlsx' with the summary, file and out-of-limit
+    sheets; csv/tsv: the out-of-limit rows in '<output>.limits.csv' and the
+    summaries in '<output>.limit_summary.csv' and '<output>.limit_files.csv'.
+    """
+    tables = [(SUMMARY_SHEET_NAME, checker.summary_rows()), (FILES_SHEET_NAME, checker.file_rows()),
+              (FAILURES_SHEET_NAME, checker.failure_rows())]
+    report_file = limits_path(output_file)
+    try:
+        if output_format == 'xlsx':
+            wb = StreamingWorkbook()
+            for sheet_name, rows in tables:
+                ws = wb.create_sheet(title=sheet_name)
+                widths = ColumnWidthTracker()
+                for row in rows:
+                    ws.append(row)
+                    widths.observe(row)
+                widths.apply(ws)
+            wb.save(report_file)
+        else:
+            delimiter = DELIMITERS[output_format]
+            write_delimited(limits_path(output_file, 'limit_summary'), tables[:1], delimiter)
+            write_delimited(limits_path(output_file, 'limit_files'), tables[1:2], delimiter)
+            write_delimited(report_file, tables[2:], delimiter)
+    except Exception as e:
+        print("\nError: Failed to write limit report '%s'. Reason: %s\n" % (report_file, str(e)))
+        return None
+    print("  Limit report written to '%s'." % report_file)
+    return report_file
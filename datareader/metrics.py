@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Per-stage run metrics, written as a JSON file next to the output.
+
+Workers run extract_data through measure_call(), which returns the data
+together with a per-file metrics dict (wall time, bytes and lines read,
+section and data-line hits, optional tracemalloc peak and cProfile top
+functions). RunMetrics collects those dicts in the main process, times the
+write and save stages and saves everything with save().
+"""
+import os
+import json
+import time
+import platform
+import tracemalloc
+import contextlib
+
+from datareader.archive import source_name, source_size
+
+# cProfile 结果中保留的函数个数（按累计时间排序）
+PROFILE_TOP = 15
+
+
+def metrics_path(output_file):
+    """'out/ALL.xlsx' -> 'out/ALL.metrics.json'"""
+    return os.path.splitext(output_file)[0] + '.metrics.json'
+
+
+def _profile_top(profile, limit=PROFILE_TOP):
+    import pstats
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': '%s:%d(%s)' % (os.path.basename(filename), line, name),
+                     'calls': calls, 'tottime': tottime, 'cumtime': cumtime})
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:limit]
+
+
+def record_extract(metrics, filepath, parser, bytes_scanned, seconds, sections):
+    """Fill in the counters of one extract_data call (parser.lines_fed/data_lines/stats_time)."""
+    stats_time = getattr(parser, 'stats_time', 0.0)
+    metrics.update({
+        'bytes': source_size(filepath),
+        'bytes_scanned': bytes_scanned,
+        'lines_read': parser.lines_fed,
+        'sections': sections,
+        'data_lines': parser.data_lines,
+    })
+    # 统计在解析过程中计算，从读取时间中分出来单独记录
+    metrics['stages']['extract_data'] = seconds - stats_time
+    if stats_time:
+        metrics['stages']['calculate_statistics'] = stats_time
+
+
+def measure_call(func, filepath, trace_memory=False, profile=False):
+    """Run func(filepath, metrics) and return (result, metrics) for one file.
+
+    func fills in its own counters (bytes, lines, hits, stage times) in the
+    metrics dict; this wrapper adds the wall time, the tracemalloc peak and
+    the cProfile summary when requested.
+    """
+    metrics = {'file': source_name(filepath), 'path': os.path.abspath(filepath), 'cached': False,
+               'stages': {}}
+    profiler = None
+    if profile:
+        # 只在需要时导入 cProfile/pstats，缩短普通运行的启动时间
+        import cProfile
+        profiler = cProfile.Profile()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            result = profiler.runcall(func, filepath, metrics)
+        else:
+            result = func(filepath, metrics)
+        metrics['seconds'] = time.perf_counter() - start
+        if trace_memory:
+            metrics['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    if profiler is not None:
+        metrics['profile'] = _profile_top(profiler)
+    return result, metrics
+
+
+class RunMetrics(object):
+    """Metrics of one batch run (all files, all stages)."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.started = time.time()
+        self._start = time.perf_counter()
+        # 源文件的绝对路径 -> 该文件的指标；同名日志（不同文件夹或 zip 成员）各有一条
+        self.files = {}
+        self.stages = {}
+        # 输出中使用的文件名 -> 源文件路径（见 name_file()）
+        self._paths = {}
+
+    def file_metrics(self, filename):
+        """Per-file dict of a source path or output name; files served from the cache only get write stages."""
+        key = self._paths.get(filename, filename)
+        entry = self.files.get(key)
+        if entry is None:
+            entry = self.files[key] = {'file': filename, 'path': key, 'cached': True, 'stages': {}}
+        return entry
+
+    def name_file(self, filepath, name):
+        """Record name as the output name of filepath and return it.
+
+        Stages timed under name are then added to filepath's entry. Names are
+        taken just before each file is written, so a name shared by two
+        files times the one being written.
+        """
+        self._paths[name] = os.path.abspath(filepath)
+        self.file_metrics(name)['file'] = name
+        return name
+
+    def add_file(self, metrics):
+        metrics = dict(metrics)
+        # 'file' 只是日志文件名，保留 name_file() 记下的输出名
+        filename = metrics.pop('file')
+        entry = self.files.get(metrics['path'])
+        if entry is None:
+            entry = self.files[metrics['path']] = {'file': filename}
+        entry.update(metrics)
+        for stage, seconds in metrics['stages'].items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_stage(self, stage, seconds, filename=None):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        if filename is not None:
+            stages = self.file_metrics(filename)['stages']
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def timed_iter(self, iterable, stage, filename=None):
+        """Yield from iterable, adding the time until it is exhausted (including the consumer's work) to stage."""
+        start = time.perf_counter()
+        try:
+            for item in iterable:
+                yield item
+        finally:
+            self.add_stage(stage, time.perf_counter() - start, filename)
+
+    @contextlib.contextmanager
+    def timed(self, stage, filename=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - start, filename)
+
+    def wrap_batch(self, batch_iter):
+        """Wrap batch_iter(func, paths) so that func's (data, metrics) results are recorded and data yielded."""
+        def run(func, filepaths):
+            for data, metrics in batch_iter(func, filepaths):
+                self.add_file(metrics)
+                yield data
+        return run
+
+    def save(self, path, **extra):
+        """Write the metrics JSON; extra keys (batch report, cache counts, ...) are added at top level."""
+        totals = {}
+        for entry in self.files.values():
+            for key in ('bytes', 'bytes_scanned', 'lines_read', 'sections', 'data_lines'):
+                if key in entry:
+                    totals[key] = totals.get(key, 0) + entry[key]
+        saved = {
+            'tool': self.tool,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_time': time.perf_counter() - self._start,
+            'python': platform.python_version(),
+            'stages': self.stages,
+            'totals': totals,
+            'files': list(self.files.values()),
+        }
+        saved.update(extra)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, indent=2)
+        except OSError as e:
+            print("  Warning: Could not write metrics file '%s': %s" % (path, str(e)))
+            return False
+        return True
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""Memory-mapped extraction: jump between target sections with byte searches.
+
+Outside target sections the file is never decoded; the combined header regex
+runs directly over the mmap. Inside a section only lines that can change the
+parser state (section headers/boundaries and data-line candidates) are decoded
+and fed to the parser, so the parser output is the same as a full text read.
+Lines must end with '\\n' or '\\r\\n' (bare '\\r' line endings are not split).
+With section_index, the target headers are taken from a sidecar index of the
+log (datareader.section_index) instead of searching the bytes between them.
+"""
+import os
+import re
+import mmap
+from bisect import bisect_left
+
+from datareader.section_index import header_offsets
+
+# str 模式下 strip() 会去掉的 ASCII 空白字符
+_ASCII_SPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+
+# 正则转义到字节模式的替换（不匹配换行，且把所有非 ASCII 字节都视为可能匹配，保证结果是超集）
+_BYTE_CLASSES = {
+    's': b'[\t\x0b\x0c\r \x1c-\x1f\x80-\xff]',
+    'd': b'[0-9\x80-\xff]',
+    'w': b'[0-9A-Za-z_\x80-\xff]',
+    'S': b'[^\n]',
+    'D': b'[^\n]',
+    'W': b'[^\n]',
+}
+
+
+def _to_bytes_pattern(pattern):
+    """Translate a TARGET_SECTIONS regex to a bytes regex matching a superset of its lines.
+
+    Returns None for patterns using constructs that are not translated
+    (character classes or inline flags); the caller then falls back to the
+    literal gate.
+    """
+    if '[' in pattern or '(?' in pattern:
+        return None
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped in _BYTE_CLASSES:
+                out.append(_BYTE_CLASSES[escaped])
+            elif escaped.isalnum():
+                return None
+            else:
+                out.append(b'\\' + escaped.encode('utf-8'))
+            i += 2
+            continue
+        if char == '.':
+            out.append(b'[^\n]')
+        else:
+            out.append(char.encode('utf-8'))
+        i += 1
+    return b''.join(out)
+
+
+def compile_header_search(scanner):
+    """Return a compiled bytes regex finding candidate target headers, or None."""
+    parts = []
+    for pattern in scanner.target_sections:
+        translated = _to_bytes_pattern(pattern)
+        if translated is None:
+            return None
+        parts.append(b'(?:' + translated + b')')
+    if not parts:
+        return None
+    return re.compile(b'|'.join(parts))
+
+
+class MappedSectionReader(object):
+    """Feeds a parser (MeasValParser/ReadbackParser) from an mmap of the log."""
+
+    def __init__(self, scanner, encoding='utf-8', data_literal_sets=None, section_index=False):
+        self.scanner = scanner
+        self.encoding = encoding
+        self.section_index = section_index
+        self.header_search = compile_header_search(scanner)
+        self.header_gate = scanner.header_gate.encode(encoding)
+        # 数据行候选：包含其中任意一组的全部字面量（默认只有扫描器自己的一组）
+        if data_literal_sets is None:
+            data_literal_sets = [scanner.data_literals]
+        self.data_literal_sets = [[literal.encode(encoding) for literal in literals]
+                                  for literals in data_literal_sets]
+        self.lines_decoded = 0
+        self.bytes_scanned = 0
+
+    def _is_relevant(self, line):
+        """True if the line could change the parser state and must be decoded."""
+        lead = line.lstrip(_ASCII_SPACE)[:1]
+        # 可能是章节边界行（数字开头，或非 ASCII 字符开头）
+        if lead and (lead.isdigit() or lead >= b'\x80'):
+            return True
+        if self.header_gate in line:
+            if self.header_search is None or self.header_search.search(line):
+                return True
+        for literals in self.data_literal_sets:
+            for literal in literals:
+                if literal not in line:
+                    break
+            else:
+                return True
+        return False
+
+    def _next_header(self, mm, pos, end=None, headers=None):
+        """Return the start offset of the next line that may hold a target header (before end), or -1.
+
+        headers is a sorted list of header line offsets from the section index.
+        """
+        if end is None:
+            end = len(mm)
+        if headers is not None:
+            i = bisect_left(headers, pos)
+            return headers[i] if i < len(headers) and headers[i] < end else -1
+        if self.header_search is not None:
+            match = self.header_search.search(mm, pos, end)
+            if match is None:
+                return -1
+            hit = match.start()
+        elif self.header_gate:
+            hit = mm.find(self.header_gate, pos, end)
+            if hit < 0:
+                return -1
+        else:
+            return pos
+        return mm.rfind(b'\n', 0, hit) + 1
+
+    def index_headers(self, filepath, buf):
+        """Target header offsets of filepath from its section index, or None when not indexed."""
+        if not self.section_index or not len(buf):
+            return None
+        return header_offsets(filepath, buf, self.scanner, self.encoding)
+
+    def feed_file(self, filepath, parser, stop_early=False, data=None):
+        """Feed the relevant lines of filepath to parser (the caller calls parser.close()).
+
+        With stop_early, reading stops once every target section has been
+        seen and the parser has left the last one. data is the file's content
+        when it is already in memory (prefetched).
+        """
+        if data is not None:
+            self.feed_buffer(data, parser, stop_early, headers=self.index_headers(filepath, data))
+            return
+        if os.path.getsize(filepath) == 0:
+            return
+        with open(filepath, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self.feed_buffer(mm, parser, stop_early, headers=self.index_headers(filepath, mm))
+            finally:
+                mm.close()
+
+    def feed_buffer(self, buf, parser, stop_early=False, start=0, end=None, on_leave=None, headers=None):
+        """Same as feed_file for a log already in memory (an mmap or bytes, e.g. a prefetched file).
+
+        start/end restrict the read to a range of whole lines (see
+        datareader.chunked). on_leave(pos, seen_sections) is called each time
+        the parser leaves a target section, where the stop_early check runs.
+        headers (sorted offsets of the target header lines, see index_headers)
+        replaces the byte search for the next header. Returns the set of
+        target sections seen.
+        """
+        size = len(buf) if end is None else end
+        if size <= start:
+            return set()
+        encoding = self.encoding
+        feed = parser.feed
+        is_relevant = self._is_relevant
+        find = buf.find
+        seen_sections = set()
+        all_sections = set(self.scanner.titles)
+
+        pos = start
+        scanned = size - start
+        while True:
+            # 在目标章节之外，直接用字节搜索跳到下一个可能的章节标题
+            line_start = self._next_header(buf, pos, size, headers)
+            if line_start < 0:
+                break
+            pos = line_start
+            line = b''
+            # 逐行处理，直到解析器离开目标章节
+            while pos < size:
+                line_end = find(b'\n', pos, size)
+                line_end = size if line_end < 0 else line_end + 1
+                line = buf[pos:line_end]
+                pos = line_end
+                if not is_relevant(line):
+                    continue
+                self.lines_decoded += 1
+                feed(line.decode(encoding))
+                if parser.in_target_section:
+                    seen_sections.add(parser.current_section)
+                else:
+                    if on_leave is not None:
+                        on_leave(pos, seen_sections)
+                    break
+            if not line or pos >= size:
+                break
+            if stop_early and seen_sections >= all_sections:
+                scanned = pos - start
+                break
+        self.bytes_scanned += scanned
+        return seen_sections
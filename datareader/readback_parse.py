@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Bulk conversion of 'Readback values' lines (ch: Val: Ang: DG: OAng: per channel).
+
+parse_group() turns one line into the CH group dict used by the scripts in a
+single comprehension: one findall for the whole line, no per-channel try/except
+and cached 'CHn' labels. parse_lines() converts a batch of lines straight into
+typed arrays (one map() per field over the whole batch) for columnar consumers
+such as ReadbackColumns.
+"""
+import itertools
+from array import array
+
+
+class _ChannelLabels(dict):
+    """channel number -> 'CHn', filled on first use."""
+
+    def __missing__(self, ch_num):
+        label = self[ch_num] = 'CH{}'.format(ch_num)
+        return label
+
+
+CHANNEL_LABELS = _ChannelLabels()
+
+
+def parse_group(pattern, line):
+    """CH group dict of one line ({'CH3': {'VAL':..,'ANGLE':..,'DG':..,'OANG':..}, ...}).
+
+    pattern has five groups (ch, Val, Ang, DG, OAng). Returns None if any
+    number is malformed, so the caller can fall back to a per-channel loop
+    that skips only the bad channels.
+    """
+    labels = CHANNEL_LABELS
+    try:
+        return {labels[int(ch)]: {'VAL': float(val), 'ANGLE': float(ang), 'DG': int(dg), 'OANG': float(oang)}
+                for ch, val, ang, dg, oang in pattern.findall(line)}
+    except ValueError:
+        return None
+
+
+def parse_lines(pattern, lines):
+    """Convert a batch of lines into typed arrays in bulk.
+
+    Returns (counts, channel, val, angle, dg, oang): counts[i] is the number of
+    channels found on the i-th line that had any (lines without channels are
+    skipped), the other arrays hold one entry per channel reading in line
+    order. Channels and DG are 64-bit integers. Raises ValueError if any number
+    in the batch is malformed, OverflowError if an integer does not fit.
+    """
+    counts = array('i')
+    tokens = []
+    findall = pattern.findall
+    for line in lines:
+        matches = findall(line)
+        if matches:
+            counts.append(len(matches))
+            tokens.extend(itertools.chain.from_iterable(matches))
+    return (counts,
+            array('q', map(int, tokens[0::5])),
+            array('d', map(float, tokens[1::5])),
+            array('d', map(float, tokens[2::5])),
+            array('q', map(int, tokens[3::5])),
+            array('d', map(float, tokens[4::5])))
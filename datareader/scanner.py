@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Single-pass compiled matcher for target sections, section boundaries and data lines."""
+import re
+
+# 类似 "8.1.3 xxx" 或 "8.4 xxx" 的章节起始行
+BOUNDARY_PATTERN = re.compile(r'^\d+\.\d+(?:\.\d+)?\s')
+
+# 正则中会终止字面量前缀的元字符
+_REGEX_META = set('.^$*+?{}[]|()')
+
+
+def section_title(pattern):
+    """Turn a TARGET_SECTIONS regex into the display title used in the output."""
+    return pattern.replace(r'\s+', ' ').replace(r'\.', '.')
+
+
+def literal_prefix(pattern):
+    """Return the literal text every match of pattern must start with ('' if none)."""
+    if '|' in pattern:
+        return ''
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                prefix.append(pattern[i + 1])
+                i += 2
+                continue
+            break
+        if char in _REGEX_META:
+            break
+        prefix.append(char)
+        i += 1
+    # 后面紧跟量词时最后一个字符是可选的
+    if i < len(pattern) and pattern[i] in '*?{' and prefix:
+        prefix.pop()
+    return ''.join(prefix)
+
+
+def _common_prefix(texts):
+    if not texts:
+        return ''
+    first, last = min(texts), max(texts)
+    size = 0
+    while size < len(first) and first[size] == last[size]:
+        size += 1
+    return first[:size]
+
+
+class SectionScanner(object):
+    """Compiled TARGET_SECTIONS, boundary rule and data-line prefilter.
+
+    match_section() keeps the original semantics (first pattern in list order
+    that is found anywhere in the stripped line) but only runs the per-pattern
+    loop on lines that already passed the literal gate and the combined regex.
+    """
+
+    def __init__(self, target_sections, data_literals=()):
+        self.target_sections = list(target_sections)
+        self.titles = [section_title(p) for p in self.target_sections]
+        self.patterns = [re.compile(p) for p in self.target_sections]
+        self.combined = re.compile('|'.join('(?:%s)' % p for p in self.target_sections) or r'(?!)')
+        prefixes = [literal_prefix(p) for p in self.target_sections]
+        # 所有章节标题都带有字面量前缀时，用其公共前缀做最便宜的预过滤
+        if prefixes and all(prefixes):
+            self.header_literals = tuple(sorted(set(prefixes)))
+            self.header_gate = _common_prefix(self.header_literals)
+        else:
+            self.header_literals = ()
+            self.header_gate = ''
+        self.data_literals = tuple(data_literals)
+
+    def match_section(self, line_stripped):
+        """Return the index of the target section found in the line, or None."""
+        if self.header_gate not in line_stripped:
+            return None
+        if not self.combined.search(line_stripped):
+            return None
+        for i, pattern in enumerate(self.patterns):
+            if pattern.search(line_stripped):
+                return i
+        return None
+
+    def is_boundary(self, line_stripped):
+        """True for lines starting a numbered section such as '8.1.4 ...'."""
+        return line_stripped[:1].isdigit() and BOUNDARY_PATTERN.match(line_stripped) is not None
+
+    def maybe_data(self, line):
+        """Cheap check that the line contains every literal a data line needs."""
+        for literal in self.data_literals:
+            if literal not in line:
+                return False
+        return True
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Sidecar index of the section headers of a log, for repeated runs with other sections.
+
+The first mmap read of a plain log records in a hidden JSON file next to it
+('.<log name>.sections.json'):
+- the offset, length and stripped text of every numbered header line
+  ('8.1.3 ...', '  8.4 ...');
+- the offsets of other lines mentioning a section number followed by a space
+  ('see 8.4 60Hz Verification1'), grouped by the last parts of the number.
+  A number seen on more than MENTION_LIMIT lines (e.g. a reading such as
+  '1.25 V') is kept without offsets.
+
+Later reads, with any TARGET_SECTIONS starting with a section number, pick
+the lines that match the scanner from the index and jump straight to them
+instead of searching the bytes in between. As a target section can only
+start on one of these lines, the parser output is the same as a full read.
+If a target number is one of the common ones, the index is not used for
+that read. The index is rebuilt when the log's size or mtime changes; when
+the folder is not writable it is only kept for the current read.
+"""
+import os
+import re
+import json
+from bisect import bisect_left
+
+from datareader.scanner import BOUNDARY_PATTERN
+
+# 索引文件格式版本（格式变化时递增，旧索引会被重建）
+INDEX_VERSION = 1
+
+# 同一个章节编号在超过该行数中出现时只记录"常见"，不保存位置
+MENTION_LIMIT = 64
+
+# 可能是编号章节行的行首（字节模式的超集：ASCII 数字后跟 '.'，或非 ASCII 字符，例如全角空格/数字）；
+# 以 '\n' 开头的形式可以用字面量前缀快速搜索
+_HEADER_START = b'[\t\x0b\x0c\r \x1c-\x1f]*(?:[0-9]+[.\x80-\xff]|[\x80-\xff])'
+_FIRST_HEADER = re.compile(_HEADER_START)
+_NEXT_HEADER = re.compile(b'\n' + _HEADER_START)
+
+# 行中后跟空白的章节编号（最多三段，最后一段最多两位数字）：先找 '.' 加一两位数字加空白，再向前取出整个编号；
+# 非 ASCII 行用 str 模式（Unicode 数字和空白）
+_MENTION_END = re.compile(b'\\.[0-9]{1,2}[\t\x0b\x0c\r \x1c-\x1f]')
+_MENTION_TAIL = re.compile(b'(?:[0-9]+\\.){1,2}[0-9]{1,2}$')
+_MENTION_TEXT = re.compile(r'(?:\d+\.){1,2}\d{1,2}(?=[^\S\n])')
+_NON_ASCII = re.compile(b'[\x80-\xff]')
+
+# 检查非 ASCII 字符时每次取出的块大小
+_ASCII_BLOCK = 8 * 1024 * 1024
+
+# 以章节编号开头的 TARGET_SECTIONS 正则（例如 r'8\.1\.3\s+P3Y'），最后一段最多两位数字
+_NUMBERED_PATTERN = re.compile(r'^(\d+)\\\.(\d{1,2})(?:\\\.(\d{1,2}))?\\s(?![*?{])')
+
+
+def index_path(filepath):
+    """'logs/run1.txt' -> 'logs/.run1.txt.sections.json'"""
+    folder, name = os.path.split(filepath)
+    return os.path.join(folder, '.%s.sections.json' % name)
+
+
+def section_numbers(scanner):
+    """The leading section number of each target section as a list of parts, or None if one has none."""
+    numbers = []
+    for pattern in scanner.target_sections:
+        match = _NUMBERED_PATTERN.match(pattern)
+        if match is None or '|' in pattern:
+            return None
+        numbers.append([part for part in match.groups() if part is not None])
+    return numbers or None
+
+
+def _mentions(parts, number):
+    """True if a mention key (last parts of a number) can contain the section number number."""
+    if len(parts) < len(number) or parts[len(parts) - len(number) + 1:] != number[1:]:
+        return False
+    # 第一段可以是更长数字的结尾（search 也会在 '18.4' 中找到 '8.4'）
+    return parts[len(parts) - len(number)].endswith(number[0])
+
+
+def _line_bounds(buf, pos, size):
+    line_start = buf.rfind(b'\n', 0, pos) + 1
+    line_end = buf.find(b'\n', pos)
+    return line_start, (size if line_end < 0 else line_end + 1)
+
+
+def build_index(buf, encoding='utf-8'):
+    """Return (headers, mentions) of buf: [[offset, length, stripped text], ...] and {key: [offset, ...] or None}."""
+    size = len(buf)
+    headers = []
+    starts = [0] if _FIRST_HEADER.match(buf) else []
+    starts.extend(match.start() + 1 for match in _NEXT_HEADER.finditer(buf))
+    for line_start in starts:
+        line_end = buf.find(b'\n', line_start)
+        line_end = size if line_end < 0 else line_end + 1
+        line_stripped = buf[line_start:line_end].decode(encoding, 'replace').strip()
+        if line_stripped[:1].isdigit() and BOUNDARY_PATTERN.match(line_stripped):
+            headers.append([line_start, line_end - line_start, line_stripped])
+    header_starts = set(offset for offset, _, _ in headers)
+
+    mentions = {}
+
+    def add(key, line_start):
+        offsets = mentions.setdefault(key, [])
+        if offsets is None or (offsets and offsets[-1] == line_start):
+            return
+        if len(offsets) >= MENTION_LIMIT:
+            mentions[key] = None
+        else:
+            offsets.append(line_start)
+
+    for match in _MENTION_END.finditer(buf):
+        end = match.end() - 1
+        line_start = buf.rfind(b'\n', 0, end) + 1
+        tail = _MENTION_TAIL.search(buf[max(line_start, end - 64):end])
+        if tail is not None and line_start not in header_starts:
+            add(tail.group().decode('ascii'), line_start)
+    # 含非 ASCII 字符的行按解码后的文本再找一遍（Unicode 数字和空白）；纯 ASCII 的块直接跳过
+    for block_start in range(0, size, _ASCII_BLOCK):
+        block_end = min(block_start + _ASCII_BLOCK, size)
+        if buf[block_start:block_end].isascii():
+            continue
+        pos = block_start
+        while True:
+            match = _NON_ASCII.search(buf, pos, block_end)
+            if match is None:
+                break
+            line_start, line_end = _line_bounds(buf, match.start(), size)
+            pos = line_end
+            if line_start in header_starts:
+                continue
+            for text_match in _MENTION_TEXT.finditer(buf[line_start:line_end].decode(encoding, 'replace')):
+                add(text_match.group(), line_start)
+    for key, offsets in mentions.items():
+        if offsets is not None:
+            offsets.sort()
+    return headers, mentions
+
+
+def load_index(filepath, size):
+    """(headers, mentions) of a sidecar index still matching filepath (size bytes), or None."""
+    try:
+        st = os.stat(filepath)
+        with open(index_path(filepath), 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (saved.get('version') != INDEX_VERSION or saved.get('size') != size or st.st_size != size
+            or saved.get('mtime_ns') != st.st_mtime_ns):
+        return None
+    return saved['headers'], saved['mentions']
+
+
+def save_index(filepath, index, size):
+    """Write the sidecar index of filepath; False if the log changed meanwhile or the folder is read-only."""
+    headers, mentions = index
+    try:
+        st = os.stat(filepath)
+        if st.st_size != size:
+            return False
+        path = index_path(filepath)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'size': size, 'mtime_ns': st.st_mtime_ns,
+                       'headers': headers, 'mentions': mentions}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        return False
+    return True
+
+
+def header_offsets(filepath, buf, scanner, encoding='utf-8'):
+    """Sorted offsets of the lines in buf (the content of filepath) starting a target section of scanner.
+
+    Loads the sidecar index, or builds and saves it on the first read.
+    Returns None if the index cannot be used with this scanner.
+    """
+    numbers = section_numbers(scanner)
+    if numbers is None:
+        return None
+    index = load_index(filepath, len(buf))
+    if index is None:
+        index = build_index(buf, encoding)
+        save_index(filepath, index, len(buf))
+    headers, mentions = index
+    match_section = scanner.match_section
+    offsets = set(offset for offset, _, line_stripped in headers if match_section(line_stripped) is not None)
+    size = len(buf)
+    for key, key_offsets in mentions.items():
+        parts = key.split('.')
+        if not any(_mentions(parts, number) for number in numbers):
+            continue
+        if key_offsets is None:
+            return None
+        for line_start in key_offsets:
+            line_end = buf.find(b'\n', line_start)
+            line_end = size if line_end < 0 else line_end + 1
+            if match_section(buf[line_start:line_end].decode(encoding, 'replace').strip()) is not None:
+                offsets.add(line_start)
+    return sorted(offsets)
+
+
+def offsets_between(offsets, start, end):
+    """The offsets in start..end (end excluded)."""
+    return offsets[bisect_left(offsets, start):bisect_left(offsets, end)]
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""Local HTTP/JSON query service over extracted readings and statistics.
+
+    python -m datareader serve [--port 8765] [--root DIR] [--cache-files 32]
+
+Endpoints (GET, JSON responses; file and folder paths are relative to --root):
+    /files?folder=DIR                       logs in a folder
+    /sections?tool=measval&file=F           target sections found in a log
+    /readings?tool=readback&file=F[&section=S][&channel=CH5][&field=VAL]
+                                            [section, section_index, ch_group, channel, field, value] rows
+    /statistics?file=F[&section=S][&stat_group=VAL_All][&metric=avg]
+                                            Readback statistics rows (calculate_statistics)
+    /status                                 cache counters
+
+Parsed files stay in an LRU cache keyed on the file's size and mtime, so
+repeated queries are answered from memory; a changed log is parsed again.
+Concurrent requests for a file that is being parsed wait for that parse
+instead of starting their own.
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+import importlib
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from datareader.archive import container_path, source_exists, source_name, list_sources
+from datareader.store import iter_readings, iter_statistics
+
+# 默认端口和缓存的文件数
+DEFAULT_PORT = 8765
+CACHE_FILES = 32
+
+# 查询用的提取脚本（选定后才导入）
+TOOLS = {
+    'measval': ('Dataread_MeasVAL', ('VAL', 'ANGLE')),
+    'readback': ('Datareader_ReadBack_statistic', ('VAL', 'ANGLE', 'DG', 'OANG')),
+}
+
+READING_COLUMNS = ['section', 'section_index', 'ch_group', 'channel', 'field', 'value']
+STATISTIC_COLUMNS = ['section', 'section_index', 'ch_group', 'stat_group', 'metric', 'value']
+
+
+class QueryError(Exception):
+    """A request that cannot be answered; status is the HTTP status code."""
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+def tool_module(tool):
+    if tool not in TOOLS:
+        raise QueryError(400, "unknown tool '%s' (use %s)" % (tool, ' or '.join(sorted(TOOLS))))
+    return importlib.import_module(TOOLS[tool][0])
+
+
+def fingerprint(source):
+    """(size, mtime_ns) of the file holding source."""
+    st = os.stat(container_path(source))
+    return st.st_size, st.st_mtime_ns
+
+
+class _Flight(object):
+    """One parse in progress; requests for the same file wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache(object):
+    """LRU cache of extract_data results keyed on (tool, path), valid while the file's fingerprint is unchanged.
+
+    load(tool, source) parses one file. Only one parse per (tool, path,
+    fingerprint) runs at a time; other callers wait for its result.
+    """
+
+    def __init__(self, load, max_files=CACHE_FILES):
+        self.load = load
+        self.max_files = max(max_files, 1)
+        self._lock = threading.Lock()
+        # (tool, 绝对路径) -> (fingerprint, 提取结果)，按最近使用排序
+        self._entries = OrderedDict()
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.evicted = 0
+
+    def get(self, tool, source):
+        key = (tool, os.path.abspath(source))
+        current = fingerprint(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == current:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(key + (current,))
+            if flight is None:
+                if entry is not None:
+                    # 文件已修改，丢弃旧结果
+                    del self._entries[key]
+                    self.stale += 1
+                self.misses += 1
+                flight = self._flights[key + (current,)] = _Flight()
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self.load(tool, source)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key + (current,)]
+                if flight.error is None:
+                    self._entries[key] = (current, flight.result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_files:
+                        self._entries.popitem(last=False)
+                        self.evicted += 1
+            flight.done.set()
+        return flight.result
+
+    def as_dict(self):
+        with self._lock:
+            files = len(self._entries)
+        return {'files': files, 'max_files': self.max_files, 'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced, 'stale': self.stale, 'evicted': self.evicted}
+
+
+def extract(tool, source):
+    """Parse source with the tool's extract_data: always a full read, and no section index is written.
+
+    The service answers queries about whole logs in folders it does not
+    own, so the scripts' MMAP_STOP_EARLY and USE_SECTION_INDEX settings
+    are not used.
+    """
+    return tool_module(tool).extract_data(source, stop_early=False, section_index=False)
+
+
+class QueryService(object):
+    """Answers the queries of the HTTP handler from a ResultCache; paths are confined to root."""
+
+    def __init__(self, root='.', max_files=CACHE_FILES, load=extract):
+        self.root = os.path.realpath(root)
+        self.cache = ResultCache(load, max_files)
+
+    def _path(self, params, name):
+        value = params.get(name)
+        if not value:
+            raise QueryError(400, "missing parameter '%s'" % name)
+        path = os.path.join(self.root, value)
+        real = os.path.realpath(container_path(path))
+        if os.path.commonpath([self.root, real]) != self.root:
+            raise QueryError(403, "'%s' is outside the served folder" % value)
+        return path
+
+    def _data(self, params, tool=None):
+        tool = tool or params.get('tool', 'measval')
+        tool_module(tool)
+        source = self._path(params, 'file')
+        if not source_exists(source):
+            raise QueryError(404, "no such log: %s" % params['file'])
+        return tool, source, self.cache.get(tool, source)
+
+    def files(self, params):
+        folder = self._path(params, 'folder')
+        if not os.path.isdir(folder):
+            raise QueryError(404, "no such folder: %s" % params['folder'])
+        return {'folder': params['folder'],
+                'files': [os.path.relpath(source, self.root) for source in list_sources(folder)]}
+
+    def sections(self, params):
+        tool, source, data = self._data(params)
+        return {'tool': tool, 'file': source_name(source),
+                'sections': [{'section': info['section_name'], 'section_index': index,
+                              'ch_groups': len(info['data'])} for index, info in enumerate(data)]}
+
+    def readings(self, params):
+        tool, source, data = self._data(params)
+        section = params.get('section')
+        channel = params.get('channel')
+        if channel is not None:
+            try:
+                channel = int(channel.upper().replace('CH', ''))
+            except ValueError:
+                raise QueryError(400, "bad channel '%s'" % params['channel'])
+        fields = TOOLS[tool][1]
+        if params.get('field'):
+            field = params['field'].upper()
+            if field not in fields:
+                raise QueryError(400, "unknown field '%s' for %s (use %s)" % (field, tool, ', '.join(fields)))
+            fields = (field,)
+        rows = [list(row) for row in iter_readings(data, fields)
+                if (section is None or row[0] == section) and (channel is None or row[3] == channel)]
+        return {'tool': tool, 'file': source_name(source), 'columns': READING_COLUMNS, 'rows': rows}
+
+    def statistics(self, params):
+        if params.get('tool', 'readback') != 'readback':
+            raise QueryError(400, "statistics are only calculated by the readback tool")
+        tool, source, data = self._data(params, 'readback')
+        module = tool_module(tool)
+        section = params.get('section')
+        stat_group = params.get('stat_group')
+        metric = params.get('metric')
+        rows = [list(row) for row in iter_statistics(data, module.section_statistics,
+                                                     [group[0] for group in module.STAT_GROUPS],
+                                                     module.STAT_METRICS)
+                if (section is None or row[0] == section) and (stat_group is None or row[3] == stat_group)
+                and (metric is None or row[4] == metric)]
+        return {'tool': tool, 'file': source_name(source), 'columns': STATISTIC_COLUMNS, 'rows': rows}
+
+    def status(self, params):
+        return {'root': self.root, 'cache': self.cache.as_dict()}
+
+    def handle(self, path, params):
+        """JSON-serialisable answer for one request path; raises QueryError."""
+        handler = {'/files': self.files, '/sections': self.sections, '/readings': self.readings,
+                   '/statistics': self.statistics, '/status': self.status}.get(path.rstrip('/') or '/')
+        if handler is None:
+            raise QueryError(404, "unknown endpoint '%s'" % path)
+        return handler(params)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET requests -> QueryService.handle (the server's service attribute)."""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict((name, values[-1]) for name, values in parse_qs(url.query).items())
+        try:
+            status, body = 200, self.server.service.handle(url.path, params)
+        except QueryError as e:
+            status, body = e.status, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': '%s: %s' % (type(e).__name__, str(e))}
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    """A threading HTTP server answering with service (port 0 picks a free port)."""
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve extracted readings and statistics as JSON over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port (default %d)' % DEFAULT_PORT)
+    parser.add_argument('--root', default='.', help='folder the file paths of requests are relative to '
+                                                    '(default: current folder); nothing outside it is served')
+    parser.add_argument('--cache-files', type=int, default=CACHE_FILES,
+                        help='parsed files kept in memory (default %d)' % CACHE_FILES)
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error('no such folder: %s' % args.root)
+
+    server = make_server(QueryService(args.root, args.cache_files), args.host, args.port)
+    print("Serving %s on http://%s:%d/ (Ctrl+C to stop)" % (os.path.abspath(args.root), args.host,
+                                                             server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Sharded workbook output: sheets are split over several workbooks saved in parallel.
+
+Results are pickled into a spool file per shard as they arrive. When a shard
+reaches its sheet limit or its estimated size (the spooled bytes), it is
+handed to a worker process that builds and saves that workbook while the
+next shard is being filled. An index workbook links every source file to
+its shard and sheet.
+"""
+import os
+import time
+import pickle
+import tempfile
+import multiprocessing
+
+from datareader.batch import resolve_workers
+from datareader.xlsx_stream import ColumnWidthTracker
+
+INDEX_SHEET_NAME = 'Index'
+INDEX_HEADERS = ['Source_File', 'Workbook', 'Sheet']
+
+# Excel 工作表名称的最大长度
+SHEET_NAME_MAX_LEN = 31
+
+
+class SheetNameRegistry(object):
+    """Unique sheet names for one workbook, with the same suffix rule as before but O(1) claims."""
+
+    def __init__(self, sanitize, max_len=SHEET_NAME_MAX_LEN):
+        self.sanitize = sanitize
+        self.max_len = max_len
+        self._used = set()
+        # 已冲突过的名称 -> 下一个要尝试的后缀编号
+        self._next_suffix = {}
+
+    def __contains__(self, name):
+        return name in self._used
+
+    def claim(self, base):
+        """Return a free sheet name for base (sanitized, '_1', '_2', ... on collision) and reserve it.
+
+        The name is shortened to make room for the suffix, and numbering goes
+        on from the last suffix given for the same name, so a collision
+        resolves in one step.
+        """
+        sheet_name = self.sanitize(base)
+        original_sheet_name = sheet_name
+        counter = self._next_suffix.get(original_sheet_name, 1)
+        while sheet_name in self._used:
+            suffix = "_{}".format(counter)
+            sheet_name = self.sanitize(original_sheet_name[:self.max_len - len(suffix)] + suffix)
+            counter += 1
+            # 防止无限循环（虽然极不可能）
+            if counter > 1000:
+                sheet_name = self.sanitize("File_{}".format(counter))
+        if counter > 1:
+            self._next_suffix[original_sheet_name] = counter
+        self._used.add(sheet_name)
+        return sheet_name
+
+
+def shard_path(output_file, number):
+    """'out/ALL.xlsx', 3 -> 'out/ALL_part003.xlsx'"""
+    root, ext = os.path.splitext(output_file)
+    return '%s_part%03d%s' % (root, number, ext)
+
+
+def _iter_spool(spool_path, count):
+    with open(spool_path, 'rb') as spool:
+        for _ in range(count):
+            yield pickle.load(spool)
+
+
+def _write_shard(job):
+    """Worker: replay a spool into writer(output_file, named_results); return (sheets, seconds)."""
+    writer, output_file, spool_path, count = job
+    start = time.perf_counter()
+    try:
+        written = writer(output_file, _iter_spool(spool_path, count))
+    finally:
+        os.remove(spool_path)
+    return written, time.perf_counter() - start
+
+
+class _Shard(object):
+
+    def __init__(self, path, spool_dir):
+        self.path = path
+        fd, self.spool_path = tempfile.mkstemp(suffix='.shard', dir=spool_dir)
+        self.spool = os.fdopen(fd, 'wb')
+        self.count = 0
+
+    def add(self, filename, file_data):
+        pickle.dump((filename, file_data), self.spool, pickle.HIGHEST_PROTOCOL)
+        self.count += 1
+
+    @property
+    def size(self):
+        return self.spool.tell()
+
+
+def write_sharded(writer, output_file, named_results, sanitize, max_sheets, max_bytes=None, workers=None,
+                  metrics=None):
+    """Write (filename, data) pairs into shards of at most max_sheets sheets (and about max_bytes of data).
+
+    writer(output_file, named_results) is the script's write_workbook; it
+    must be a module-level function so it can run in a worker process.
+    Returns (sheets written, index entries [(filename, shard file, sheet name)]);
+    sheets written is 0 if any shard failed to save.
+    """
+    spool_dir = os.path.dirname(os.path.abspath(output_file))
+    pool = multiprocessing.Pool(processes=resolve_workers(workers))
+    pending = []
+    entries = []
+    shard = None
+    registry = None
+    try:
+        for filename, file_data in named_results:
+            if shard is None:
+                shard = _Shard(shard_path(output_file, len(pending) + 1), spool_dir)
+                registry = SheetNameRegistry(sanitize)
+            # 与 write_workbook 相同的命名规则，索引中的 sheet 名与分片中的一致
+            entries.append((filename, os.path.basename(shard.path),
+                            registry.claim(os.path.splitext(filename)[0])))
+            shard.add(filename, file_data)
+            if shard.count >= max_sheets or (max_bytes and shard.size >= max_bytes):
+                shard.spool.close()
+                pending.append(pool.apply_async(_write_shard, ((writer, shard.path, shard.spool_path, shard.count),)))
+                shard = None
+        if shard is not None:
+            shard.spool.close()
+            pending.append(pool.apply_async(_write_shard, ((writer, shard.path, shard.spool_path, shard.count),)))
+            shard = None
+        pool.close()
+        written = 0
+        failed = False
+        for result in pending:
+            sheets, seconds = result.get()
+            if metrics is not None:
+                metrics.add_stage('write_shard', seconds)
+            if not sheets:
+                failed = True
+            written += sheets
+    except BaseException:
+        pool.terminate()
+        if shard is not None:
+            shard.spool.close()
+            os.remove(shard.spool_path)
+        raise
+    finally:
+        pool.join()
+    return (0 if failed else written), entries
+
+
+def write_index(index_file, entries, add_sheets=None):
+    """Save a workbook listing every source file with a link to its shard sheet.
+
+    add_sheets(wb) may append more sheets (e.g. the fleet summary). Returns
+    True on success.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+    wb = Workbook()
+    ws = wb.active
+    ws.title = INDEX_SHEET_NAME
+    widths = ColumnWidthTracker()
+    ws.append(INDEX_HEADERS)
+    widths.observe(INDEX_HEADERS)
+    link_font = Font(color='0563C1', underline='single')
+    for row_idx, (filename, shard_file, sheet_name) in enumerate(entries, 2):
+        row = [filename, shard_file, sheet_name]
+        ws.append(row)
+        widths.observe(row)
+        cell = ws.cell(row=row_idx, column=3)
+        cell.hyperlink = "%s#'%s'!A1" % (shard_file, sheet_name.replace("'", "''"))
+        cell.font = link_font
+    widths.apply(ws, len(INDEX_HEADERS))
+    if add_sheets is not None:
+        add_sheets(wb)
+    try:
+        wb.save(index_file)
+    except Exception as e:
+        print("\nError: Failed to save index workbook '%s'. Reason: %s\n" % (index_file, str(e)))
+        return False
+    return True
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Configurable channel-group statistics computed in one streaming pass.
+
+A statistics config is a list of channel groups (name, field, channels) and a
+list of metrics. Every reading of a CH group is routed once to the
+accumulators of the groups containing its channel; each accumulator keeps
+Welford running moments plus min/max, and the raw values only when a
+percentile metric is requested. For a whole section stored in
+datareader.columnar.ReadbackColumns, the accumulators are filled straight
+from the typed columns, or replaced by vectorized group-by reductions when
+only avg/max/min/range are requested.
+"""
+import re
+import math
+
+# 统计量名称 -> 表头后缀；pNN 表示百分位数（如 p50、p95）
+METRIC_LABELS = {'avg': 'Avg', 'max': 'Max', 'min': 'Min', 'std': 'Std', 'range': 'Range'}
+_PERCENTILE = re.compile(r'^p(\d{1,2}(?:\.\d+)?|100)$')
+# 可以直接由按组归约（ReadbackColumns.group_reduce）得到的统计量
+_REDUCED_METRICS = ('avg', 'max', 'min', 'range')
+
+
+class RunningStat(object):
+    """Welford accumulator for one channel group."""
+
+    __slots__ = ('count', 'total', 'mean', 'm2', 'min', 'max', 'values')
+
+    def __init__(self, keep_values=False):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.values = [] if keep_values else None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.values is not None:
+            self.values.append(value)
+
+    def merge(self, other):
+        """Combine another accumulator into this one (Chan et al. parallel update)."""
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.total, self.mean, self.m2 = other.count, other.total, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+        else:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+            self.mean += delta * other.count / count
+            self.count = count
+            self.total += other.total
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        if self.values is not None and other.values is not None:
+            self.values.extend(other.values)
+
+    def metric(self, name):
+        """Value of one metric, or '' when the group has no (or too few) readings."""
+        if not self.count:
+            return ''
+        if name == 'avg':
+            # 与原先的 sum(values) / len(values) 结果逐位一致
+            return self.total / self.count
+        if name == 'max':
+            return self.max
+        if name == 'min':
+            return self.min
+        if name == 'range':
+            return self.max - self.min
+        if name == 'std':
+            # 样本标准差（n - 1）
+            return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else ''
+        return percentile(self.values, float(_PERCENTILE.match(name).group(1)))
+
+
+def percentile(values, q):
+    """q-th percentile with linear interpolation between closest ranks (NumPy's default)."""
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lower = int(math.floor(pos))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+class StatsEngine(object):
+    """Statistics for a declared set of channel groups and metrics.
+
+    groups is a list of (name, field, channels) where field is 'VAL', 'ANGLE',
+    'DG' or 'OANG' and channels is an iterable of channel numbers, or None for
+    all channels. metrics is a list of names from METRIC_LABELS or pNN.
+    """
+
+    def __init__(self, groups, metrics):
+        for metric in metrics:
+            if metric not in METRIC_LABELS and not _PERCENTILE.match(metric):
+                raise ValueError("Unknown statistics metric: %r" % (metric,))
+        self.groups = [(name, field, None if channels is None else frozenset(channels))
+                       for name, field, channels in groups]
+        self.metrics = list(metrics)
+        self.keep_values = any(_PERCENTILE.match(m) for m in self.metrics)
+        self.headers = ['%s_%s' % (name, METRIC_LABELS.get(metric, metric.upper()))
+                        for name, _, _ in self.groups for metric in self.metrics]
+        self._routes = {}
+
+    def _route(self, ch_num):
+        """(group index, field) pairs a channel contributes to, cached per channel."""
+        route = self._routes.get(ch_num)
+        if route is None:
+            route = self._routes[ch_num] = [
+                (index, field) for index, (_, field, channels) in enumerate(self.groups)
+                if channels is None or ch_num in channels]
+        return route
+
+    def new_accumulators(self):
+        return [RunningStat(self.keep_values) for _ in self.groups]
+
+    def update(self, accumulators, dataset):
+        """Add one CH group ({'CH3': {'VAL':..,...}, ...}) in channel order."""
+        for ch_label in sorted(dataset.keys(), key=lambda x: int(x[2:])):
+            ch_data = dataset[ch_label]
+            for index, field in self._route(int(ch_label[2:])):
+                accumulators[index].add(ch_data[field])
+
+    def row(self, accumulators):
+        """Metric values in header order."""
+        return [acc.metric(metric) for acc in accumulators for metric in self.metrics]
+
+    def summarize(self, dataset):
+        """Statistics row of a single CH group."""
+        accumulators = self.new_accumulators()
+        self.update(accumulators, dataset)
+        return self.row(accumulators)
+
+    def accumulate(self, columns):
+        """Accumulators of every CH group in columns (datareader.columnar.ReadbackColumns).
+
+        The Welford updates read the typed columns directly; rows of a group
+        are stored in channel order, so the results equal update() on the
+        group's dict.
+        """
+        accumulators = [self.new_accumulators() for _ in range(columns.group_count)]
+        values = dict((field, columns.field_array(field)) for _, field, _ in self.groups)
+        for row, (group_id, ch_num) in enumerate(zip(columns.group_id, columns.channel)):
+            group_accumulators = accumulators[group_id]
+            for index, field in self._route(ch_num):
+                group_accumulators[index].add(values[field][row])
+        return accumulators
+
+    def reduce(self, columns):
+        """Statistics rows of every CH group in columns, with the same values as summarize().
+
+        avg, max, min and range come from the vectorized group-by reductions
+        of the columns; std and percentiles from accumulate().
+        """
+        if any(metric not in _REDUCED_METRICS for metric in self.metrics):
+            return [self.row(accumulators) for accumulators in self.accumulate(columns)]
+        reduced = [columns.group_reduce(field, channels) for _, field, channels in self.groups]
+        rows = []
+        for group_id in range(columns.group_count):
+            row = []
+            for counts, avgs, maxs, mins in reduced:
+                for metric in self.metrics:
+                    if not counts[group_id]:
+                        row.append('')
+                    elif metric == 'avg':
+                        row.append(avgs[group_id])
+                    elif metric == 'max':
+                        row.append(maxs[group_id])
+                    elif metric == 'min':
+                        row.append(mins[group_id])
+                    else:
+                        row.append(maxs[group_id] - mins[group_id])
+            rows.append(row)
+        return rows
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Indexed SQLite store of extracted readings and statistics for queries across runs.
+
+Every run can add its results to one long-lived database (RESULTS_DB in the
+scripts, or --store on the command line). Readings are stored one value per
+row, keyed on source file, section, CH group and channel; Readback statistics
+are keyed on source file, section and statistics group. A source whose file
+and extractor configuration are unchanged since it was stored is skipped.
+
+Query from the command line:
+    python -m datareader.store results.sqlite3 --tool measval --section "8.4 60Hz Verification2" \
+        --channel CH5 --field VAL --since 2026-07-01
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+from datareader.archive import container_path, source_name
+from datareader.batch import iter_paired
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    log_time REAL NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    stored REAL NOT NULL,
+    UNIQUE (tool, path)
+);
+CREATE TABLE IF NOT EXISTS readings (
+    source_id INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    section_index INTEGER NOT NULL,
+    ch_group INTEGER NOT NULL,
+    channel INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statistics (
+    source_id INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    section_index INTEGER NOT NULL,
+    ch_group INTEGER NOT NULL,
+    stat_group TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sources_time ON sources (tool, log_time);
+CREATE INDEX IF NOT EXISTS readings_key ON readings (section, channel, field, source_id);
+CREATE INDEX IF NOT EXISTS readings_source ON readings (source_id);
+CREATE INDEX IF NOT EXISTS statistics_key ON statistics (section, stat_group, metric, source_id);
+CREATE INDEX IF NOT EXISTS statistics_source ON statistics (source_id);
+"""
+
+# 查询结果的列
+HISTORY_HEADERS = ['log_time', 'source', 'count', 'avg', 'min', 'max']
+
+
+def iter_readings(section_data_list, fields):
+    """(section, section_index, ch_group, channel, field, value) rows of parsed section data.
+
+    section_data_list is the extract_data result of either script (a list of
+    {'section_name': ..., 'data': [{'CH0': {'VAL': ..}, ..}, ..]}); empty or
+    None values are skipped.
+    """
+    for section_index, section_info in enumerate(section_data_list):
+        section_name = section_info['section_name']
+        for ch_group, dataset in enumerate(section_info['data']):
+            for ch_label, ch_data in dataset.items():
+                channel = int(ch_label[2:])
+                for field in fields:
+                    value = ch_data.get(field)
+                    if value is not None and value != '':
+                        yield section_name, section_index, ch_group, channel, field, value
+
+
+def iter_statistics(section_data_list, stats_rows, group_names, metrics):
+    """(section, section_index, ch_group, stat_group, metric, value) rows of statistics.
+
+    stats_rows(section_info) returns one row per CH group in StatsEngine.headers
+    order; '' (no values in the group) is skipped.
+    """
+    for section_index, section_info in enumerate(section_data_list):
+        section_name = section_info['section_name']
+        for ch_group, row in enumerate(stats_rows(section_info)):
+            column = 0
+            for group_name in group_names:
+                for metric in metrics:
+                    value = row[column]
+                    column += 1
+                    if value != '':
+                        yield section_name, section_index, ch_group, group_name, metric, value
+
+
+class ResultsStore(object):
+    """SQLite database of readings and statistics from many runs.
+
+    add() replaces everything stored for (tool, source) in one transaction with
+    bulk executemany inserts; sources are timestamped with the mtime of their
+    file (the zip for archive members), which is the log_time used by queries.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.added = 0
+        self.unchanged = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _source(self, tool, filepath):
+        return self._conn.execute(
+            "SELECT id, size, mtime_ns, signature FROM sources WHERE tool = ? AND path = ?",
+            (tool, os.path.abspath(filepath))).fetchone()
+
+    def is_current(self, tool, filepath, signature):
+        """True if filepath is stored for tool with the same size, mtime and signature."""
+        row = self._source(tool, filepath)
+        if row is None:
+            return False
+        st = os.stat(container_path(filepath))
+        return row[1] == st.st_size and row[2] == st.st_mtime_ns and row[3] == signature
+
+    def add(self, tool, filepath, signature, readings, statistics=()):
+        """Replace whatever is stored for (tool, filepath) with these readings and statistics rows."""
+        start = time.perf_counter()
+        st = os.stat(container_path(filepath))
+        with self._conn:
+            row = self._source(tool, filepath)
+            if row is not None:
+                self._conn.execute("DELETE FROM readings WHERE source_id = ?", (row[0],))
+                self._conn.execute("DELETE FROM statistics WHERE source_id = ?", (row[0],))
+                self._conn.execute("DELETE FROM sources WHERE id = ?", (row[0],))
+            source_id = self._conn.execute(
+                "INSERT INTO sources (tool, path, name, log_time, size, mtime_ns, signature, stored) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (tool, os.path.abspath(filepath), source_name(filepath), st.st_mtime, st.st_size,
+                 st.st_mtime_ns, signature, time.time())).lastrowid
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO readings (source_id, section, section_index, ch_group, channel, field, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", ((source_id,) + r for r in readings))
+            self._conn.executemany(
+                "INSERT INTO statistics (source_id, section, section_index, ch_group, stat_group, metric, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", ((source_id,) + r for r in statistics))
+            self.rows += self._conn.total_changes - before
+        self.added += 1
+        self.seconds += time.perf_counter() - start
+
+    def update(self, tool, filepath, signature, data, to_rows):
+        """Add data unless filepath is already current; to_rows(data) returns (readings, statistics)."""
+        if self.is_current(tool, filepath, signature):
+            self.unchanged += 1
+            return False
+        self.add(tool, filepath, signature, *to_rows(data))
+        return True
+
+    def _history(self, table, column, key, tool, section, field, since, until):
+        sql = ("SELECT s.log_time, s.name, COUNT(*), AVG(t.value), MIN(t.value), MAX(t.value) "
+               "FROM %s t JOIN sources s ON s.id = t.source_id "
+               "WHERE t.section = ? AND t.%s = ? AND t.%s = ? AND s.tool = ?" % (
+                   table, column, 'field' if table == 'readings' else 'metric'))
+        params = [section, key, field, tool]
+        if since is not None:
+            sql += " AND s.log_time >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND s.log_time < ?"
+            params.append(until)
+        sql += " GROUP BY s.id ORDER BY s.log_time"
+        return self._conn.execute(sql, params).fetchall()
+
+    def channel_history(self, tool, section, channel, field, since=None, until=None):
+        """Per-source (log_time, name, count, avg, min, max) of one channel field, oldest first.
+
+        since / until are Unix timestamps (log file mtime).
+        """
+        return self._history('readings', 'channel', channel, tool, section, field, since, until)
+
+    def statistic_history(self, section, stat_group, metric, since=None, until=None, tool='readback'):
+        """Per-source (log_time, name, count, avg, min, max) of one statistics column, oldest first."""
+        return self._history('statistics', 'stat_group', stat_group, tool, section, metric, since, until)
+
+    def as_dict(self):
+        return {'path': os.path.abspath(self.db_path), 'added': self.added, 'unchanged': self.unchanged,
+                'rows': self.rows, 'seconds': self.seconds}
+
+    def format(self):
+        return "Results store: %d file(s) added (%d rows, %.2fs), %d unchanged" % (
+            self.added, self.rows, self.seconds, self.unchanged)
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+def open_store(db_path):
+    """Open the results store, or return None (with a warning) if it cannot be opened."""
+    try:
+        return ResultsStore(db_path)
+    except sqlite3.Error as e:
+        print("  Warning: Results store disabled (%s): %s" % (db_path, str(e)))
+        return None
+
+
+def iter_stored(store, tool, signature, filepaths, results, to_rows):
+    """Yield results unchanged, adding each one to store on the way.
+
+    to_rows(data) returns (readings, statistics) row iterables for one file;
+    it is only called for sources that are not already current in the store.
+    """
+    for filepath, data in iter_paired(filepaths, results):
+        store.update(tool, filepath, signature, data, to_rows)
+        yield data
+
+
+def _parse_date(text):
+    return time.mktime(time.strptime(text, '%Y-%m-%d'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the history of a channel or statistics column.')
+    parser.add_argument('db', help='results database (RESULTS_DB / --store of the extractor scripts)')
+    parser.add_argument('--tool', default='measval', choices=('measval', 'readback'))
+    parser.add_argument('--section', required=True, help="section name, e.g. '8.4 60Hz Verification2'")
+    parser.add_argument('--channel', help='channel, e.g. CH5 or 5')
+    parser.add_argument('--field', default='VAL', help='VAL, ANGLE, DG or OANG (default VAL)')
+    parser.add_argument('--stat-group', help="statistics group instead of a channel, e.g. 'VAL_All' (readback)")
+    parser.add_argument('--metric', default='avg', help='statistics metric with --stat-group (default avg)')
+    parser.add_argument('--since', type=_parse_date, help='first log date, YYYY-MM-DD')
+    parser.add_argument('--until', type=_parse_date, help='log date to stop before, YYYY-MM-DD')
+    args = parser.parse_args(argv)
+    if (args.channel is None) == (args.stat_group is None):
+        parser.error('give exactly one of --channel and --stat-group')
+    if not os.path.isfile(args.db):
+        parser.error('no such database: %s' % args.db)
+
+    store = ResultsStore(args.db)
+    if args.channel is not None:
+        channel = int(args.channel.upper().replace('CH', ''))
+        rows = store.channel_history(args.tool, args.section, channel, args.field.upper(), args.since, args.until)
+    else:
+        rows = store.statistic_history(args.section, args.stat_group, args.metric, args.since, args.until,
+                                       tool=args.tool)
+    store.close()
+
+    print('\t'.join(HISTORY_HEADERS))
+    for log_time, name, count, avg, low, high in rows:
+        print('%s\t%s\t%d\t%r\t%r\t%r' % (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(log_time)),
+                                         name, count, avg, low, high))
+    return 0 if rows else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Folder-wide summary of every section, channel and field across all files.
+
+Each (section, channel, field) key keeps a RunningStat (count, mean, std,
+min, max) and a QuantileSketch for approximate percentiles, so memory does
+not grow with the number of files or readings. Both are mergeable: partial
+summaries built from disjoint sets of files (per worker, per run) combine
+with merge() into the same result as a single pass.
+"""
+import os
+import math
+
+from datareader.stats import RunningStat, METRIC_LABELS, _PERCENTILE
+
+# 百分位数草图的相对误差（0.01 表示返回值与真实分位数的相对误差不超过 1%）
+SKETCH_RELATIVE_ACCURACY = 0.01
+# 每个符号方向最多保留的桶数，超出时合并最小量级的桶（只影响极小量级的精度）
+SKETCH_MAX_BINS = 2048
+
+
+def summary_path(output_file):
+    """'out/ALL.csv' -> 'out/ALL.summary.csv' (summary of CSV/TSV output)"""
+    root, ext = os.path.splitext(output_file)
+    return root + '.summary' + ext
+
+
+class QuantileSketch(object):
+    """DDSketch-style quantile sketch with logarithmic buckets.
+
+    A value x > 0 goes to bucket ceil(log(x) / log(gamma)); every value in a
+    bucket is within relative_accuracy of the bucket's representative value,
+    so quantiles carry that relative error. Negative values use a mirrored
+    set of buckets. Merging adds bucket counts, which is exact.
+    """
+
+    __slots__ = ('relative_accuracy', 'gamma', '_log_gamma', 'max_bins', 'positive', 'negative', 'zeros',
+                 'count', 'min', 'max')
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY, max_bins=SKETCH_MAX_BINS):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def _key(self, magnitude):
+        return int(math.ceil(math.log(magnitude) / self._log_gamma))
+
+    def _collapse(self, bins):
+        # 合并量级最小的桶，使桶数不超过 max_bins
+        keys = sorted(bins)
+        excess = len(keys) - self.max_bins
+        if excess > 0:
+            target = keys[excess]
+            for key in keys[:excess]:
+                bins[target] += bins.pop(key)
+
+    def add(self, value):
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value > 0:
+            bins = self.positive
+            magnitude = value
+        elif value < 0:
+            bins = self.negative
+            magnitude = -value
+        else:
+            self.zeros += 1
+            return
+        key = self._key(magnitude)
+        bins[key] = bins.get(key, 0) + 1
+        if len(bins) > self.max_bins:
+            self._collapse(bins)
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same relative accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if not other.count:
+            return
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+            if len(bins) > self.max_bins:
+                self._collapse(bins)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Approximate q-th percentile (0..100), or '' for an empty sketch."""
+        if not self.count:
+            return ''
+        rank = (self.count - 1) * q / 100.0
+        seen = 0
+        # 按数值从小到大：负数（量级从大到小）、零、正数（量级从小到大）
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(-self._value(key), self.min)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self._value(key), self.max)
+        return self.max
+
+
+class FleetSummary(object):
+    """Cross-file aggregates per (section, channel, field).
+
+    metrics are names from stats.METRIC_LABELS plus 'count' and pNN
+    (approximate, from the sketch).
+    """
+
+    def __init__(self, fields, metrics):
+        for metric in metrics:
+            if metric != 'count' and metric not in METRIC_LABELS and not _PERCENTILE.match(metric):
+                raise ValueError("Unknown summary metric: %r" % (metric,))
+        self.fields = list(fields)
+        self.metrics = list(metrics)
+        self.headers = ['Section', 'CH_Label', 'Field', 'Files'] + [
+            'Count' if metric == 'count' else METRIC_LABELS.get(metric, metric.upper()) for metric in self.metrics]
+        self.files = 0
+        self._sections = {}
+        # (section, channel, field) -> [RunningStat, QuantileSketch, 文件数, 最后一个计入的文件序号]
+        self._entries = {}
+
+    def _entry(self, section, channel, field):
+        key = (section, channel, field)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._sections.setdefault(section, len(self._sections))
+            entry = self._entries[key] = [RunningStat(), QuantileSketch(), 0, None]
+        return entry
+
+    def add_file(self, section_data_list):
+        """Add the readings of one file (a list of {'section_name': ..., 'data': [CH groups]})."""
+        self.files += 1
+        file_index = self.files
+        fields = self.fields
+        for section_info in section_data_list:
+            section_name = section_info['section_name']
+            for dataset in section_info['data']:
+                for ch_label, ch_data in dataset.items():
+                    channel = int(ch_label[2:])
+                    for field in fields:
+                        value = ch_data.get(field)
+                        if value is None or value == '':
+                            continue
+                        entry = self._entry(section_name, channel, field)
+                        entry[0].add(value)
+                        entry[1].add(value)
+                        if entry[3] != file_index:
+                            entry[2] += 1
+                            entry[3] = file_index
+
+    def merge(self, other):
+        """Combine a summary of other (disjoint) files into this one."""
+        for section in sorted(other._sections, key=other._sections.get):
+            self._sections.setdefault(section, len(self._sections))
+        for (section, channel, field), (stat, sketch, files, _) in other._entries.items():
+            entry = self._entry(section, channel, field)
+            entry[0].merge(stat)
+            entry[1].merge(sketch)
+            entry[2] += files
+            entry[3] = None
+        self.files += other.files
+
+    def _metric(self, stat, sketch, metric):
+        if metric == 'count':
+            return stat.count
+        match = _PERCENTILE.match(metric)
+        if match:
+            return sketch.quantile(float(match.group(1)))
+        return stat.metric(metric)
+
+    def iter_rows(self):
+        """Data rows (without the header) by section order of appearance, channel and field."""
+        sections = self._sections
+        field_order = dict((field, index) for index, field in enumerate(self.fields))
+        for key in sorted(self._entries, key=lambda k: (sections[k[0]], k[1], field_order.get(k[2], 0))):
+            section, channel, field = key
+            stat, sketch, files, _ = self._entries[key]
+            yield [section, 'CH%d' % channel, field, files] + [self._metric(stat, sketch, metric)
+                                                               for metric in self.metrics]
+
+    def rows(self):
+        """Header row followed by the data rows."""
+        yield self.headers
+        for row in self.iter_rows():
+            yield row
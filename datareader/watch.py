@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Watch mode: follow growing .txt logs and parse only the appended bytes.
+
+Each followed file keeps its byte offset and the parser state (in-section
+flag, current section, partial CH groups) between polls. Both are saved in
+a JSON checkpoint so a restarted watcher resumes where it stopped.
+"""
+import io
+import os
+import json
+import time
+
+# 每次读取追加内容的块大小
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class LogFollower(object):
+    """Follows one log file, feeding complete new lines to its parser."""
+
+    def __init__(self, filepath, parser_factory, checkpoint=None):
+        self.filepath = filepath
+        self.parser_factory = parser_factory
+        self.parser = parser_factory()
+        self.offset = 0
+        self.file_id = None
+        if checkpoint:
+            self.offset = checkpoint['offset']
+            self.file_id = checkpoint['file_id']
+            self.parser.set_state(checkpoint['state'])
+
+    def _reset(self):
+        self.parser = self.parser_factory()
+        self.offset = 0
+
+    def poll(self):
+        """Parse lines appended since the last poll; return the number of bytes consumed."""
+        try:
+            st = os.stat(self.filepath)
+        except OSError:
+            return 0
+        file_id = [st.st_dev, st.st_ino]
+        # 文件被截断或被替换（日志轮转）时从头开始
+        if st.st_size < self.offset or (self.file_id is not None and file_id != self.file_id):
+            self._reset()
+        self.file_id = file_id
+        if st.st_size == self.offset:
+            return 0
+
+        consumed = 0
+        feed = self.parser.feed
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            pending = b''
+            while True:
+                block = f.read(READ_BLOCK_SIZE)
+                if not block:
+                    break
+                block = pending + block
+                # 只处理完整的行，最后不完整的一行留到下次
+                cut = block.rfind(b'\n') + 1
+                pending = block[cut:]
+                if not cut:
+                    continue
+                text = io.TextIOWrapper(io.BytesIO(block[:cut]), encoding='utf-8')
+                for line in text:
+                    feed(line)
+                consumed += cut
+        self.offset += consumed
+        return consumed
+
+    def snapshot(self):
+        """Section data including the still-open section, without disturbing the parser."""
+        parser = self.parser_factory()
+        parser.set_state(self.parser.get_state())
+        return parser.close()
+
+    def checkpoint(self):
+        return {'offset': self.offset, 'file_id': self.file_id, 'state': self.parser.get_state()}
+
+
+class FolderWatcher(object):
+    """Polls a folder for new or growing .txt logs."""
+
+    def __init__(self, folder_path, parser_factory, checkpoint_path, signature, interval=2.0):
+        self.folder_path = folder_path
+        self.parser_factory = parser_factory
+        self.checkpoint_path = checkpoint_path
+        self.signature = signature
+        self.interval = interval
+        self.followers = {}
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not os.path.isfile(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (ValueError, OSError) as e:
+            print("  Warning: Ignoring unreadable watch checkpoint '%s': %s" % (self.checkpoint_path, str(e)))
+            return
+        # 章节或匹配规则变了，旧的状态不可用
+        if saved.get('signature') != self.signature:
+            return
+        for filename, checkpoint in saved.get('files', {}).items():
+            filepath = os.path.join(self.folder_path, filename)
+            if os.path.isfile(filepath):
+                self.followers[filename] = LogFollower(filepath, self.parser_factory, checkpoint)
+
+    def save_checkpoint(self):
+        saved = {
+            'signature': self.signature,
+            'files': dict((name, follower.checkpoint()) for name, follower in self.followers.items()),
+        }
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def poll(self):
+        """Poll every .txt file once; return the names of files that changed."""
+        names = set(f for f in os.listdir(self.folder_path)
+                    if f.lower().endswith('.txt') and os.path.isfile(os.path.join(self.folder_path, f)))
+        changed = [name for name in self.followers if name not in names]
+        for name in changed:
+            del self.followers[name]
+        for name in sorted(names):
+            follower = self.followers.get(name)
+            if follower is None:
+                follower = self.followers[name] = LogFollower(
+                    os.path.join(self.folder_path, name), self.parser_factory)
+            consumed = follower.poll()
+            if consumed:
+                print("  %s: +%d bytes" % (name, consumed))
+                changed.append(name)
+        return changed
+
+    def snapshots(self):
+        """(filepath, section data) for every followed file, in file name order."""
+        return [(self.followers[name].filepath, self.followers[name].snapshot())
+                for name in sorted(self.followers)]
+
+    def run(self, on_update):
+        """Poll until Ctrl+C, calling on_update(snapshots) whenever a log changed."""
+        print("Watching '%s' every %.1fs (press Ctrl+C to stop)..." % (self.folder_path, self.interval))
+        first = True
+        try:
+            while True:
+                changed = self.poll()
+                if changed or first:
+                    on_update(self.snapshots())
+                    self.save_checkpoint()
+                first = False
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            self.save_checkpoint()
+            print("\nStopped watching '%s'.\n" % self.folder_path)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Streaming Excel output built on openpyxl's write-only workbook.
+
+openpyxl is imported when a workbook is actually built, so runs writing
+CSV/TSV (or nothing) never pay for loading it.
+"""
+import pickle
+import tempfile
+
+# 列宽上限（与原来的自动列宽规则一致：最长内容 + 2，最大 50）
+MAX_COLUMN_WIDTH = 50
+
+
+class ColumnWidthTracker(object):
+    """Tracks the longest value per column while rows are emitted."""
+
+    def __init__(self):
+        self.max_lengths = {}
+
+    def observe(self, row, start_column=1):
+        max_lengths = self.max_lengths
+        for col_idx, value in enumerate(row, start_column):
+            if value:
+                try:
+                    cell_len = len(str(value))
+                except Exception:
+                    cell_len = 0
+                if cell_len > max_lengths.get(col_idx, 0):
+                    max_lengths[col_idx] = cell_len
+
+    def apply(self, sheet, column_count=None):
+        """Set the column widths of sheet (columns 1..column_count, default: all seen)."""
+        from openpyxl.utils import get_column_letter
+        if column_count is None:
+            column_count = max(self.max_lengths) if self.max_lengths else 0
+        for col_idx in range(1, column_count + 1):
+            width = min(self.max_lengths.get(col_idx, 0) + 2, MAX_COLUMN_WIDTH)
+            sheet.column_dimensions[get_column_letter(col_idx)].width = width
+
+
+class StreamingSheet(object):
+    """Append-only sheet that spools rows to a temporary file.
+
+    openpyxl's write-only sheets need column widths before the first row,
+    so rows are pickled to disk as they are produced and replayed into the
+    write-only sheet when the sheet is closed. Only one row is held in memory.
+    Closing also finishes the sheet's XML, which releases openpyxl's temporary
+    file, so a workbook of thousands of sheets holds at most one file open.
+    """
+
+    def __init__(self, workbook, title):
+        self._ws = workbook.create_sheet(title=title)
+        self.column_dimensions = self._ws.column_dimensions
+        self._spool = tempfile.TemporaryFile()
+        self.row_count = 0
+
+    @property
+    def title(self):
+        return self._ws.title
+
+    def append(self, row):
+        pickle.dump(list(row), self._spool, pickle.HIGHEST_PROTOCOL)
+        self.row_count += 1
+
+    def close(self):
+        """Replay the spooled rows into the write-only sheet and finish it."""
+        if self._spool is None:
+            return
+        spool, self._spool = self._spool, None
+        try:
+            spool.seek(0)
+            for _ in range(self.row_count):
+                self._ws.append(pickle.load(spool))
+        finally:
+            spool.close()
+        self._ws.close()
+
+
+class StreamingWorkbook(object):
+    """Write-only workbook with the create_sheet()/save() calls used by the scripts.
+
+    Opening a new sheet closes the previous one, so at most one spool and one
+    sheet file are open.
+    """
+
+    def __init__(self):
+        from openpyxl import Workbook
+        self._wb = Workbook(write_only=True)
+        self.worksheets = []
+
+    def create_sheet(self, title):
+        if self.worksheets:
+            self.worksheets[-1].close()
+        sheet = StreamingSheet(self._wb, title)
+        self.worksheets.append(sheet)
+        return sheet
+
+    def save(self, filename):
+        for sheet in self.worksheets:
+            sheet.close()
+        self._wb.save(filename)
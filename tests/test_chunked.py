@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Chunked parsing of one log (datareader.chunked) gives the same result as a serial read."""
+import os
+import sys
+import mmap
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import Dataread_MeasVAL as measval
+import Datareader_Combined as combined
+import Datareader_ReadBack_statistic as readback
+from datareader.chunked import parse_chunked, split_points, new_reader
+from loggen import write_sample_log
+
+PARSERS = [measval.MeasValParser, readback.ReadbackParser, combined.new_parser]
+
+# 手写的边界情况：第一个标题之前的数据、没有数据的目标章节跨过普通编号行、重复出现的章节、
+# 写到一半就被下一个标题打断的 CH 数据组、文件末尾没有换行
+EDGE_CASE_LOG = u"""[INFO] Meas VAL Check<<C>> CH0: 1.0 V
+[INFO] Readback values ch: 0 Val: 1.0 Ang: 0.1 DG: 1 OAng: 0.2
+8.1.3 P3Y CTVT Cali 10A
+8.1.4 P3Y CTVT Cali 5A
+[INFO] Meas VAL Check<<C>> CH0: 57.1 V
+[INFO] Meas ANGLE Check<<C>> CH0: 0.01 deg
+[INFO] Meas VAL Check<<C>> CH1: 57.2 V
+[INFO] Readback values ch: 0 Val: 57.1 Ang: 0.01 DG: 2 OAng: 0.5 ch: 1 Val: 57.2 Ang: 0.02 DG: 2 OAng: 0.4
+8.4 60Hz Verification2
+[INFO] Meas VAL Check<<C>> CH5: 60.5 V
+[INFO] Meas ANGLE Check<<C>> CH5: 0.02 deg
+8.4 50Hz Verification2
+[INFO] Meas VAL Check<<C>> CH2: 50.1 V
+[INFO] Readback values ch: 2 Val: 50.1 Ang: 0.03 DG: 1 OAng: 0.1
+8.2 Relay Self Test
+[INFO] Meas VAL Check<<C>> CH2: 9.9 V
+8.1.6 P3Y CTVT Cali 1A
+[INFO] Readback values ch: 3 Val: 1.1 Ang: 0.04 DG: 0 OAng: 0.2
+8.4 60Hz Verification1
+[INFO] Meas VAL Check<<C>> CH3: 60.1 V
+[INFO] Meas ANGLE Check<<C>> CH3: 0.03 deg
+8.4 60Hz Verification2
+[INFO] Meas VAL Check<<C>> CH5: 61.5 V
+[INFO] Readback values ch: 5 Val: 61.5 Ang: 0.05 DG: 3 OAng: 0.3
+8.3 Burn In
+8.1.3 P3Y CTVT Cali 10A
+[INFO] Meas VAL Check<<C>> CH0: 58.1 V
+[INFO] Meas ANGLE Check<<C>> CH0: 0.05 deg
+[INFO] Readback values ch: 0 Val: 58.1 Ang: 0.05 DG: 2 OAng: 0.6"""
+
+
+@pytest.fixture(scope='module')
+def sample_log(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('chunked') / 'sample.txt')
+    write_sample_log(path, 0.25, target_share=0.4, channels=6, seed=7, groups=3)
+    return path
+
+
+@pytest.fixture(scope='module')
+def edge_case_log(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('chunked') / 'edge.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(EDGE_CASE_LOG)
+    return path
+
+
+def serial_read(path, new_parser, stop_early):
+    parser = new_parser()
+    new_reader(parser).feed_file(path, parser, stop_early=stop_early)
+    return parser.close()
+
+
+def chunk_count(path, new_parser, chunk_bytes):
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return len(split_points(mm, new_parser(), chunk_bytes))
+        finally:
+            mm.close()
+
+
+@pytest.mark.parametrize('stop_early', [False, True])
+@pytest.mark.parametrize('chunk_bytes', [1, 2048, 16384])
+@pytest.mark.parametrize('new_parser', PARSERS)
+def test_chunked_equals_serial(sample_log, new_parser, chunk_bytes, stop_early):
+    assert chunk_count(sample_log, new_parser, chunk_bytes) > 1
+    expected = serial_read(sample_log, new_parser, stop_early)
+    result, run, scanned = parse_chunked(sample_log, new_parser, workers=2, chunk_bytes=chunk_bytes,
+                                         stop_early=stop_early)
+    assert result == expected
+    if not stop_early:
+        assert scanned == os.path.getsize(sample_log)
+
+
+@pytest.mark.parametrize('stop_early', [False, True])
+@pytest.mark.parametrize('new_parser', PARSERS)
+def test_chunked_equals_serial_edge_cases(edge_case_log, new_parser, stop_early):
+    # chunk_bytes=1：每个目标章节标题都是一个拆分点
+    assert chunk_count(edge_case_log, new_parser, 1) > 5
+    expected = serial_read(edge_case_log, new_parser, stop_early)
+    result = parse_chunked(edge_case_log, new_parser, workers=2, chunk_bytes=1, stop_early=stop_early)[0]
+    assert result == expected
+
+
+def test_stop_early_drops_repeated_sections(edge_case_log):
+    full = serial_read(edge_case_log, measval.MeasValParser, False)
+    early = serial_read(edge_case_log, measval.MeasValParser, True)
+    assert len(early) < len(full)
+    assert full[:len(early)] == early
+    result = parse_chunked(edge_case_log, measval.MeasValParser, workers=2, chunk_bytes=1, stop_early=True)[0]
+    assert result == early
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""ReadbackColumns keeps DG values that do not fit in 32 bits."""
+import pytest
+
+import Datareader_ReadBack_statistic as readback
+from datareader import columnar
+from datareader.chunked import new_reader
+from datareader.columnar import ReadbackColumns
+
+BIG_DG = [2 ** 31, 2 ** 40 + 1, 2 ** 33, 2 ** 63 - 1]
+
+
+def read_log(path):
+    parser = readback.ReadbackParser()
+    new_reader(parser).feed_file(path, parser)
+    return parser.close()
+
+
+def test_large_dg_is_read_like_int(tmp_path):
+    path = str(tmp_path / 'big_dg.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(u'8.1.3 P3Y CTVT Cali 10A\n')
+        for dg in BIG_DG:
+            f.write(u'[INFO] Readback values ch: 0 Val: 1.5 Ang: 0.1 DG: %d OAng: 0.2 '
+                    u'ch: 1 Val: 2.5 Ang: 0.2 DG: 3 OAng: 0.1\n' % dg)
+    sections = read_log(path)
+    assert [group['CH0']['DG'] for group in sections[0]['data']] == BIG_DG
+    assert all(group['CH1']['DG'] == 3 for group in sections[0]['data'])
+
+
+@pytest.mark.parametrize('min_rows', [0, columnar.NUMPY_MIN_ROWS])
+def test_large_dg_max_min_are_exact(monkeypatch, min_rows):
+    monkeypatch.setattr(columnar, 'NUMPY_MIN_ROWS', min_rows)
+    columns = ReadbackColumns.from_datasets(
+        [{'CH0': {'VAL': 1.0, 'ANGLE': 0.0, 'DG': dg, 'OANG': 0.0},
+          'CH1': {'VAL': 1.0, 'ANGLE': 0.0, 'DG': dg - 1, 'OANG': 0.0}} for dg in BIG_DG])
+    counts, _, maxs, mins = columns.group_reduce('DG')
+    assert counts == [2] * len(BIG_DG)
+    assert maxs == BIG_DG
+    assert mins == [dg - 1 for dg in BIG_DG]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""SourceWalker names walked logs by their path relative to the walked folder."""
+import os
+import zipfile
+
+from datareader.archive import source_name
+from datareader.discover import SourceWalker
+
+
+def touch(path):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write('8.2 Relay Self Test\n')
+
+
+def test_walked_names_are_relative_to_the_root(tmp_path):
+    root = str(tmp_path / 'archive')
+    for station in ('ST01', 'ST02'):
+        touch(os.path.join(root, '2026-07-15', station, 'log.txt'))
+    touch(os.path.join(root, 'top.txt'))
+    os.makedirs(os.path.join(root, '2026-07-16'))
+    with zipfile.ZipFile(os.path.join(root, '2026-07-16', 'bundle.zip'), 'w') as zf:
+        zf.writestr('ST03/log.txt', '8.2 Relay Self Test\n')
+
+    walker = SourceWalker()
+    names = [walker.source_name(source) for source in walker.walk(root)]
+    assert names == ['2026-07-15/ST01/log.txt', '2026-07-15/ST02/log.txt', '2026-07-16/log.txt', 'top.txt']
+    assert len(set(names)) == len(names)
+
+
+def test_sources_outside_the_walked_folders_keep_their_name(tmp_path):
+    other = str(tmp_path / 'other' / 'ST01' / 'log.txt.gz')
+    touch(str(tmp_path / 'archive' / 'log.txt'))
+    walker = SourceWalker()
+    list(walker.walk(str(tmp_path / 'archive')))
+    assert walker.source_name(other) == source_name(other) == 'log.txt'
+    assert source_name(other, str(tmp_path)) == 'other/ST01/log.txt'
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""SheetNameRegistry gives unique, identifying Excel sheet names."""
+from datareader.app import sanitize_sheet_name
+from datareader.shards import SheetNameRegistry
+
+
+def test_short_names_keep_the_suffix_rule():
+    registry = SheetNameRegistry(sanitize_sheet_name)
+    names = [registry.claim(base) for base in ['log', 'log', 'log_1', 'log', 'Fleet_Summary']]
+    assert names == ['log', 'log_1', 'log_1_1', 'log_2', 'Fleet_Summary']
+
+
+def test_long_names_keep_their_suffix():
+    registry = SheetNameRegistry(sanitize_sheet_name)
+    names = [registry.claim('Station_Calibration_Report_Long_%04d' % i) for i in range(500)]
+    assert len(set(names)) == len(names)
+    assert all(len(name) <= 31 for name in names)
+    assert names[1] == 'Station_Calibration_Report_Lo_1'
+    assert names[-1].endswith('_499')
+    assert not any(name.startswith('File_') for name in names)
+
+
+def test_deep_tree_names_keep_the_log_name():
+    # SourceWalker.source_name() 给出的相对路径（去掉扩展名后作为 sheet 名）
+    bases = ['2026-07-%02d/ST%02d/SN1234567%d/log_%03d' % (day, station, serial, log)
+             for day in (15, 16) for station in (1, 2) for serial in range(3) for log in range(40)]
+    registry = SheetNameRegistry(sanitize_sheet_name)
+    names = [registry.claim(base) for base in bases]
+    assert len(set(names)) == len(names)
+    assert names[0] == 'ST01_SN12345670_log_000'
+    for base, name in zip(bases, names):
+        assert len(name) <= 31
+        assert base.rsplit('/', 1)[1] in name
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""FleetSummary / QuantileSketch: merging partial summaries gives the single-pass result."""
+import random
+
+import pytest
+
+from datareader.summary import FleetSummary, QuantileSketch
+
+FIELDS = ('VAL', 'ANGLE')
+METRICS = ['count', 'avg', 'std', 'min', 'max', 'range', 'p5', 'p50', 'p95']
+SECTIONS = ['8.1.3 P3Y CTVT Cali 10A', '8.4 50Hz Verification2', '8.4 60Hz Verification2']
+
+
+def make_file(rng, channels=12):
+    """extract_data-style result of one log with random readings (some sections and channels missing)."""
+    sections = []
+    for section_name in SECTIONS:
+        if rng.random() < 0.2:
+            continue
+        groups = []
+        for _ in range(rng.randint(1, 4)):
+            groups.append(dict(('CH%d' % ch, {'VAL': rng.uniform(-60.0, 60.0), 'ANGLE': rng.gauss(0.0, 0.05)})
+                               for ch in range(channels) if rng.random() > 0.1))
+        sections.append({'section_name': section_name, 'data': groups})
+    return sections
+
+
+def single_pass(files):
+    summary = FleetSummary(FIELDS, METRICS)
+    for section_data_list in files:
+        summary.add_file(section_data_list)
+    return summary
+
+
+def merged(files, parts):
+    """Summaries of consecutive slices of files, merged in order."""
+    total = FleetSummary(FIELDS, METRICS)
+    size = (len(files) + parts - 1) // parts
+    for start in range(0, len(files), size):
+        total.merge(single_pass(files[start:start + size]))
+    return total
+
+
+def assert_same_rows(expected, actual):
+    expected_rows = list(expected.rows())
+    actual_rows = list(actual.rows())
+    assert len(actual_rows) == len(expected_rows)
+    assert actual_rows[0] == expected_rows[0]
+    headers = expected_rows[0]
+    for expected_row, actual_row in zip(expected_rows[1:], actual_rows[1:]):
+        for header, want, got in zip(headers, expected_row, actual_row):
+            if header in ('Avg', 'Std', 'Range'):
+                # 合并时求和顺序不同，只允许舍入误差
+                assert got == pytest.approx(want, rel=1e-12, abs=1e-12), (expected_row[:3], header)
+            else:
+                assert got == want, (expected_row[:3], header)
+
+
+@pytest.mark.parametrize('parts', [2, 3, 7])
+def test_merge_equals_single_pass(parts):
+    rng = random.Random(parts)
+    files = [make_file(rng) for _ in range(20)]
+    expected = single_pass(files)
+    actual = merged(files, parts)
+    assert actual.files == expected.files == len(files)
+    assert_same_rows(expected, actual)
+
+
+def test_merge_keeps_section_order_of_first_appearance():
+    first = [{'section_name': SECTIONS[2], 'data': [{'CH0': {'VAL': 1.0, 'ANGLE': 0.0}}]}]
+    second = [{'section_name': SECTIONS[0], 'data': [{'CH0': {'VAL': 2.0, 'ANGLE': 0.0}}]},
+              {'section_name': SECTIONS[2], 'data': [{'CH1': {'VAL': 3.0, 'ANGLE': 0.0}}]}]
+    assert_same_rows(single_pass([first, second]), merged([first, second], 2))
+
+
+def test_merge_with_empty_summary():
+    rng = random.Random(1)
+    files = [make_file(rng) for _ in range(5)]
+    expected = single_pass(files)
+    actual = FleetSummary(FIELDS, METRICS)
+    actual.merge(FleetSummary(FIELDS, METRICS))
+    actual.merge(single_pass(files))
+    actual.merge(FleetSummary(FIELDS, METRICS))
+    assert_same_rows(expected, actual)
+
+
+def test_sketch_merge_is_exact():
+    rng = random.Random(2)
+    values = [rng.uniform(-5.0, 5.0) for _ in range(5000)] + [0.0] * 10
+    whole = QuantileSketch()
+    parts = [QuantileSketch() for _ in range(4)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 4].add(value)
+    combined = QuantileSketch()
+    for part in parts:
+        combined.merge(part)
+    for q in (0, 1, 5, 25, 50, 75, 95, 99, 100):
+        assert combined.quantile(q) == whole.quantile(q)
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(3)
+    values = sorted(rng.lognormvariate(0.0, 1.0) for _ in range(10001))
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    for q in (5, 50, 95):
+        exact = values[int((len(values) - 1) * q / 100.0)]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+
+
+def test_sketch_merge_rejects_other_accuracy():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""StreamingWorkbook writes more sheets than the process may have files open."""
+import pytest
+
+openpyxl = pytest.importorskip('openpyxl')
+resource = pytest.importorskip('resource')
+
+from datareader.xlsx_stream import StreamingWorkbook
+
+SHEETS = 400
+
+
+@pytest.fixture
+def few_open_files():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    limit = 256 if hard == resource.RLIM_INFINITY else min(256, hard)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+    try:
+        yield limit
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_many_sheets_keep_one_file_open(tmp_path, few_open_files):
+    assert SHEETS > few_open_files
+    output_file = str(tmp_path / 'many.xlsx')
+    wb = StreamingWorkbook()
+    for i in range(SHEETS):
+        ws = wb.create_sheet(title='log_%03d' % i)
+        if i % 3:
+            ws.append(['log_%03d' % i, i])
+        ws.column_dimensions['A'].width = 12
+    wb.save(output_file)
+
+    workbook = openpyxl.load_workbook(output_file, read_only=True)
+    assert len(workbook.sheetnames) == SHEETS
+    assert list(workbook['log_001'].values) == [('log_001', 1)]
+    assert list(workbook['log_000'].values) == []